@@ -0,0 +1,91 @@
+from datetime import date, timedelta
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.models.forecast import OccupancyForecast
+from app.utils.auth import get_db
+from app.utils.forecast import HORIZON_DAYS, store_forecast
+from app.utils.room_status import property_today
+from app.utils.stay_metrics import stay_metrics
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+# Longest range a single request may cover
+MAX_RANGE_DAYS = 5 * 366
+
+
+@router.get("/stay-metrics")
+def get_stay_metrics(
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    group_by: Literal["day", "week", "month", "room_type"] = Query("day"),
+    db: Session = Depends(get_db),
+):
+    """
+    Occupancy, ADR, RevPAR and length of stay for the nights from..to
+    (inclusive), per day, ISO week, month or room type, with totals.
+    """
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (to_date - from_date).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"The range may cover at most {MAX_RANGE_DAYS} days")
+    return stay_metrics(db, from_date, to_date, group_by)
+
+
+def _occupancy(rooms: int, capacity: int) -> float:
+    return round(rooms * 100.0 / capacity, 2) if capacity else 0.0
+
+
+@router.get("/forecast")
+def get_forecast(
+    days: int = Query(HORIZON_DAYS, ge=1, le=HORIZON_DAYS),
+    room_type: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Occupancy forecast for the next `days` nights per room type, with the
+    pickup it rests on: rooms on the books now and, for the same night last
+    year, on the books at the same lead time and finally sold. Served from
+    tonight's precomputed rows; computed now if they are missing.
+    """
+    as_of = property_today()
+    # Any of tonight's rows will do: an unknown room_type must not trigger a rebuild
+    stored = db.query(OccupancyForecast.id).filter(OccupancyForecast.as_of == as_of)
+    if not db.query(stored.exists()).scalar():
+        store_forecast(db, as_of)
+    query = db.query(OccupancyForecast).filter(
+        OccupancyForecast.as_of == as_of,
+        OccupancyForecast.stay_date < as_of + timedelta(days=days),
+    )
+    if room_type:
+        query = query.filter(OccupancyForecast.room_type == room_type)
+    rows = query.order_by(OccupancyForecast.room_type, OccupancyForecast.stay_date).all()
+
+    room_types = {}
+    totals = {}
+    for row in rows:
+        entry = room_types.setdefault(row.room_type, {"room_type": row.room_type, "capacity": row.capacity, "nights": []})
+        entry["nights"].append({
+            "date": row.stay_date,
+            "on_the_books": row.on_the_books,
+            "on_the_books_last_year": row.on_the_books_last_year,
+            "actual_last_year": row.actual_last_year,
+            "forecast": row.forecast,
+            "occupancy": _occupancy(row.on_the_books, row.capacity),
+            "forecast_occupancy": _occupancy(row.forecast, row.capacity),
+        })
+        total = totals.setdefault(row.stay_date, {"date": row.stay_date, "capacity": 0, "on_the_books": 0, "on_the_books_last_year": 0, "actual_last_year": 0, "forecast": 0})
+        for field in ("capacity", "on_the_books", "on_the_books_last_year", "actual_last_year", "forecast"):
+            total[field] += getattr(row, field)
+    for total in totals.values():
+        total["occupancy"] = _occupancy(total["on_the_books"], total["capacity"])
+        total["forecast_occupancy"] = _occupancy(total["forecast"], total["capacity"])
+
+    return {
+        "as_of": as_of,
+        "days": days,
+        "room_types": list(room_types.values()),
+        "totals": [totals[day] for day in sorted(totals)],
+    }
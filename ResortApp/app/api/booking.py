@@ -1,52 +1,107 @@
 # booking.py
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
-from sqlalchemy.orm import Session, joinedload, load_only
-from sqlalchemy import or_, and_
-from typing import List, Union
+from fastapi import APIRouter, Depends, HTTPException, File, Header, UploadFile
+from sqlalchemy.orm import Session, joinedload, load_only, selectinload
+from sqlalchemy import or_, and_, func, tuple_
+from typing import List, Optional, Union
+from datetime import date
 from app.utils.auth import get_db, get_current_user
 from app.utils.booking_id import parse_display_id
+from app.utils.availability import ensure_rooms_available, find_conflicts
+from app.utils.booking_writer import write_booking
+from app.utils.bulk_booking import create_bulk_bookings
+from app.utils.guest_identity import link_guest_user
+from app.utils.idempotency import run_idempotent
+from app.utils.occupancy_grid import invalidate_occupancy_grid
+from app.utils.pagination import CachedCount, decode_cursor, encode_cursor
+from app.utils.reservations import commit_reservations, extend_reservations, release_reservations
+from app.utils.events import record_room_statuses
+from app.utils.room_status import refresh_room_statuses
+from app.utils.uploads import checkin_store
 from app.models.booking import Booking, BookingRoom
 from app.models.user import User
 from app.models.room import Room
 from app.models.Package import Package, PackageBooking, PackageBookingRoom
-from app.schemas.booking import BookingCreate, BookingOut
+from app.schemas.booking import BookingBulkResult, BookingCreate, BookingOut
 from app.schemas.room import RoomOut
 from fastapi.responses import FileResponse
-import os
-import shutil
-import uuid
-
-UPLOAD_DIR = "uploads/checkin_proofs"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 from app.schemas.booking import BookingOut, BookingRoomOut
 from pydantic import BaseModel
 
 class PaginatedBookingResponse(BaseModel):
     total: int
     bookings: List[BookingOut]
+    next_cursor: Optional[str] = None
 
 router = APIRouter(prefix="/bookings", tags=["Bookings"])
 
+# Cached COUNT(*) for the bookings list, kept in step by the write endpoints below
+booking_totals = CachedCount()
+
 @router.get("", response_model=PaginatedBookingResponse)
-def get_bookings(db: Session = Depends(get_db), skip: int = 0, limit: int = 20, order_by: str = "id", order: str = "desc"):
+def get_bookings(
+    db: Session = Depends(get_db),
+    skip: int = 0,
+    limit: int = 20,
+    order_by: str = "id",
+    order: str = "desc",
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    room_id: Optional[int] = None,
+    guest: Optional[str] = None,
+):
+    """
+    List regular bookings, newest first by default.
+
+    Pages can be fetched with skip/limit or, for large tables, with the
+    `next_cursor` returned by the previous page (keyset pagination on
+    `id` or `(check_in, id)`; `skip` is ignored when a cursor is given).
+    Optional filters: status, stays overlapping [date_from, date_to], room
+    and guest name/email/mobile.
+    """
+    if order_by not in ("id", "check_in"):
+        order_by = "id"
+    descending = order != "asc"
+
     try:
-        # Get regular bookings with room details, ordered by latest first
+        filters = []
+        if status:
+            # Accept either spelling of multi-word statuses (checked-in / checked_in)
+            filters.append(Booking.status.in_({status, status.replace("-", "_"), status.replace("_", "-")}))
+        if date_from:
+            filters.append(Booking.check_out > date_from)
+        if date_to:
+            filters.append(Booking.check_in <= date_to)
+        if room_id is not None:
+            filters.append(Booking.booking_rooms.any(BookingRoom.room_id == room_id))
+        if guest:
+            pattern = f"%{guest.strip()}%"
+            filters.append(or_(
+                Booking.guest_name.ilike(pattern),
+                Booking.guest_email.ilike(pattern),
+                Booking.guest_mobile.ilike(pattern),
+            ))
+
         query = db.query(Booking).options(
-            joinedload(Booking.booking_rooms).joinedload(BookingRoom.room),
+            selectinload(Booking.booking_rooms).joinedload(BookingRoom.room),
             joinedload(Booking.user).joinedload(User.role)
-        )
-        
-        # Apply ordering
-        if order_by == "id" and order == "desc":
-            query = query.order_by(Booking.id.desc())
-        elif order_by == "id" and order == "asc":
-            query = query.order_by(Booking.id.asc())
-        elif order_by == "check_in" and order == "desc":
-            query = query.order_by(Booking.check_in.desc())
-        elif order_by == "check_in" and order == "asc":
-            query = query.order_by(Booking.check_in.asc())
-        
-        regular_bookings = query.offset(skip).limit(limit).all()
+        ).filter(*filters)
+
+        # Apply ordering; id breaks ties so check_in pages are stable
+        sort_key = (Booking.check_in, Booking.id) if order_by == "check_in" else (Booking.id,)
+        query = query.order_by(*[col.desc() if descending else col.asc() for col in sort_key])
+
+        if cursor:
+            last = decode_cursor(cursor, order_by)
+            try:
+                last = [date.fromisoformat(last[0]), int(last[1])] if order_by == "check_in" else [int(last[0])]
+            except (ValueError, TypeError, IndexError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            after = tuple_(*sort_key) < tuple_(*last) if descending else tuple_(*sort_key) > tuple_(*last)
+            regular_bookings = query.filter(after).limit(limit).all()
+        else:
+            regular_bookings = query.offset(skip).limit(limit).all()
         
         # Convert to BookingOut format
         booking_results = []
@@ -68,11 +123,22 @@ def get_bookings(db: Session = Depends(get_db), skip: int = 0, limit: int = 20,
                 rooms=[br.room for br in booking.booking_rooms if br.room]
             )
             booking_results.append(booking_out)
+
+        next_cursor = None
+        if limit > 0 and len(regular_bookings) == limit:
+            last_booking = regular_bookings[-1]
+            if order_by == "check_in":
+                next_cursor = encode_cursor(order_by, last_booking.check_in.isoformat(), last_booking.id)
+            else:
+                next_cursor = encode_cursor(order_by, last_booking.id)
         
-        # Get total count
-        total_count = db.query(Booking).count()
+        # Total is served from cache; filtered totals are cached per filter set
+        filter_key = (status, date_from, date_to, room_id, guest) if filters else None
+        total_count = booking_totals.get(filter_key, lambda: db.query(func.count(Booking.id)).filter(*filters).scalar())
         
-        return {"total": total_count, "bookings": booking_results}
+        return {"total": total_count, "bookings": booking_results, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error fetching bookings: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching bookings: {str(e)}")
@@ -152,109 +218,67 @@ def get_booking_details(booking_id: Union[str, int], is_package: bool, db: Sessi
 
 
 # -------------------------------
-# Helper function to get or create guest user
+# Confirmation email, queued with the booking
 # -------------------------------
-def get_or_create_guest_user(db: Session, email: str, mobile: str, name: str):
+def queue_room_confirmation_email(db: Session, db_booking: Booking, rooms: List[Room], to_email: Optional[str], guest_name: str, guest_mobile: Optional[str]):
     """
-    Find or create a guest user based on email and mobile number.
-    Returns the user_id to link bookings to the same user.
+    Calculate booking charges and queue the confirmation email in the booking
+    transaction; the outbox sender delivers it after commit.
     """
-    from app.models.user import User, Role
-    import bcrypt
-    
-    # Normalize empty strings to None for easier handling
-    email = email.strip() if email and isinstance(email, str) else None
-    mobile = mobile.strip() if mobile and isinstance(mobile, str) else None
-    name = name.strip() if name and isinstance(name, str) else "Guest User"
-    
-    # Need at least one identifier (email or mobile)
-    if not email and not mobile:
-        raise ValueError("Either email or mobile number must be provided")
-    
-    # First, try to find user by email (most reliable identifier)
-    user = None
-    if email:
-        user = db.query(User).filter(User.email == email).first()
-    
-    # If not found by email, try by mobile/phone
-    if not user and mobile:
-        user = db.query(User).filter(User.phone == mobile).first()
-    
-    # If user exists, return the user_id
-    if user:
-        # Update name if provided and different
-        if name and user.name != name:
-            user.name = name
-            db.commit()
-        return user.id
-    
-    # If user doesn't exist, create a new guest user
+    if not to_email:
+        return
     try:
-        # First, ensure 'guest' role exists
-        guest_role = db.query(Role).filter(Role.name == "guest").first()
-        if not guest_role:
-            # Create guest role if it doesn't exist
-            guest_role = Role(name="guest", permissions="[]")
-            db.add(guest_role)
-            db.commit()
-            db.refresh(guest_role)
+        from app.utils.email import create_booking_confirmation_email
+        from app.utils.email_outbox import queue_email
         
-        # Generate a placeholder password for guest users (they won't log in)
-        password_bytes = "guest_user_no_password".encode("utf-8")
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(password_bytes, salt).decode("utf-8")
+        # Calculate stay duration
+        stay_nights = max(1, (db_booking.check_out - db_booking.check_in).days)
         
-        # Create email if not provided (use mobile-based email or generate unique one)
-        if not email:
-            if mobile:
-                user_email = f"guest_{mobile}@temp.com"
-            else:
-                # Generate a unique email based on timestamp
-                import time
-                user_email = f"guest_{int(time.time())}@temp.com"
-        else:
-            user_email = email
+        # Calculate room charges
+        room_charges = 0
+        rooms_data = []
+        for room in rooms:
+            room_price = room.price or 0
+            room_charges += room_price * stay_nights
+            rooms_data.append({
+                'number': room.number,
+                'type': room.type or 'Standard',
+                'price': room_price
+            })
+        
+        # Format booking ID (BK-000001)
+        formatted_booking_id = f"BK-{str(db_booking.id).zfill(6)}"
         
-        # Check if email already exists (race condition check)
-        existing_user = db.query(User).filter(User.email == user_email).first()
-        if existing_user:
-            # User was created between our check and creation attempt
-            return existing_user.id
+        email_html = create_booking_confirmation_email(
+            guest_name=guest_name,
+            booking_id=db_booking.id,
+            booking_type='room',
+            check_in=str(db_booking.check_in),
+            check_out=str(db_booking.check_out),
+            rooms=rooms_data,
+            total_amount=room_charges,
+            guests={'adults': db_booking.adults, 'children': db_booking.children},
+            guest_mobile=guest_mobile,
+            room_charges=room_charges,
+            stay_nights=stay_nights
+        )
         
-        # Create new guest user
-        new_user = User(
-            name=name,
-            email=user_email,
-            phone=mobile if mobile else None,
-            hashed_password=hashed_password,
-            role_id=guest_role.id,
-            is_active=True
+        queue_email(
+            db,
+            to_email=to_email,
+            subject=f"Booking Confirmation {formatted_booking_id} - Elysian Retreat",
+            html_content=email_html,
+            to_name=guest_name
         )
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
-        return new_user.id
     except Exception as e:
-        # If user creation fails due to unique constraint or other DB error, try to find existing user
-        db.rollback()  # Rollback the failed transaction
-        if email:
-            existing_user = db.query(User).filter(User.email == email).first()
-            if existing_user:
-                return existing_user.id
-        if mobile:
-            existing_user = db.query(User).filter(User.phone == mobile).first()
-            if existing_user:
-                return existing_user.id
-        # Re-raise if we can't find existing user
-        raise ValueError(f"Failed to create or find guest user: {str(e)}")
+        # Log error but don't fail the booking
+        print(f"Failed to queue confirmation email: {str(e)}")
 
 # -------------------------------
 # POST a new booking
 # -------------------------------
 @router.post("", response_model=BookingOut) # Changed from "/" to ""
 def create_booking(booking: BookingCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    # Find or create guest user based on email and mobile
-    guest_user_id = None
     # Normalize email and mobile - convert empty strings to None, handle None safely
     try:
         guest_email = booking.guest_email.strip() if (booking.guest_email and isinstance(booking.guest_email, str) and booking.guest_email.strip()) else None
@@ -266,17 +290,8 @@ def create_booking(booking: BookingCreate, db: Session = Depends(get_db), curren
     except (AttributeError, TypeError):
         guest_mobile = None
     
-    if guest_email or guest_mobile:
-        try:
-            guest_user_id = get_or_create_guest_user(
-                db=db,
-                email=guest_email,
-                mobile=guest_mobile,
-                name=booking.guest_name or "Guest User"
-            )
-        except Exception as e:
-            # Log error but don't fail the booking if user creation fails
-            print(f"Warning: Could not create/link guest user: {str(e)}")
+    # Guest user is upserted in the same transaction as the booking
+    guest_user = link_guest_user(db, guest_email, guest_mobile, booking.guest_name)
     
     # Check for an existing booking to reuse guest details for consistency
     existing_booking = db.query(Booking).filter(
@@ -308,32 +323,10 @@ def create_booking(booking: BookingCreate, db: Session = Depends(get_db), curren
             detail=f"The number of children ({booking.children}) exceeds the total children capacity of the selected rooms ({total_children_capacity} children max). Please select additional rooms or reduce the number of children."
         )
 
-    # Check if rooms are available for the requested dates
-    for room_id in booking.room_ids:
-        # Check if room is already booked by regular bookings for overlapping dates (only check active bookings, not cancelled or checked-out)
-        conflicting_regular_booking = db.query(BookingRoom).join(Booking).filter(
-            BookingRoom.room_id == room_id,
-            Booking.status.in_(['booked', 'checked-in']),  # Only check for active bookings
-            Booking.check_in < booking.check_out,
-            Booking.check_out > booking.check_in
-        ).first()
-        
-        # Check if room is already booked by package bookings for overlapping dates
-        conflicting_package_booking = db.query(PackageBookingRoom).join(PackageBooking).filter(
-            PackageBookingRoom.room_id == room_id,
-            PackageBooking.status.in_(['booked', 'checked-in']),  # Only check for active bookings
-            PackageBooking.check_in < booking.check_out,
-            PackageBooking.check_out > booking.check_in
-        ).first()
-        
-        if conflicting_regular_booking or conflicting_package_booking:
-            room = db.query(Room).filter(Room.id == room_id).first()
-            raise HTTPException(
-                status_code=400,
-                detail=f"Room {room.number if room else room_id} is not available for the selected dates."
-            )
+    # Check if rooms are available for the requested dates (regular and package bookings, one query)
+    ensure_rooms_available(db, booking.room_ids, booking.check_in, booking.check_out, rooms=selected_rooms)
 
-    db_booking = Booking(
+    db_booking = write_booking(db, Booking(
         guest_name=guest_name_to_use,
         guest_mobile=booking.guest_mobile,
         guest_email=booking.guest_email,
@@ -341,111 +334,68 @@ def create_booking(booking: BookingCreate, db: Session = Depends(get_db), curren
         check_out=booking.check_out,
         adults=booking.adults,
         children=booking.children,
-        user_id=guest_user_id,  # Link booking to guest user
-    )
-    db.add(db_booking)
-    db.commit()
-    db.refresh(db_booking)
-
-    # Create BookingRoom links and update room status
-    for room_id in booking.room_ids:
-        room = db.query(Room).filter(Room.id == room_id).first()
-        if room:
-            room.status = "Booked"
-        db.add(BookingRoom(booking_id=db_booking.id, room_id=room_id))
+        user=guest_user,  # Link booking to guest user
+    ), selected_rooms, on_flush=lambda new_booking: queue_room_confirmation_email(
+        db, new_booking, selected_rooms, booking.guest_email, guest_name_to_use, booking.guest_mobile
+    ))
+    booking_totals.bump()
     
-    db.commit()
-
-    db.refresh(db_booking)
-    
-    # Reload with room details for response
-    booking_with_rooms = (
-        db.query(Booking)
-        .options(joinedload(Booking.booking_rooms).joinedload(BookingRoom.room))
-        .filter(Booking.id == db_booking.id)
-        .first()
-    )
-    
-    # Convert to BookingOut format with rooms
+    # Build the response from the committed in-memory objects
     booking_out = BookingOut(
-        id=booking_with_rooms.id,
-        guest_name=booking_with_rooms.guest_name,
-        guest_mobile=booking_with_rooms.guest_mobile,
-        guest_email=booking_with_rooms.guest_email,
-        status=booking_with_rooms.status,
-        check_in=booking_with_rooms.check_in,
-        check_out=booking_with_rooms.check_out,
-        adults=booking_with_rooms.adults,
-        children=booking_with_rooms.children,
-        id_card_image_url=getattr(booking_with_rooms, 'id_card_image_url', None),
-        guest_photo_url=getattr(booking_with_rooms, 'guest_photo_url', None),
-        user=booking_with_rooms.user,
+        id=db_booking.id,
+        guest_name=db_booking.guest_name,
+        guest_mobile=db_booking.guest_mobile,
+        guest_email=db_booking.guest_email,
+        status=db_booking.status,
+        check_in=db_booking.check_in,
+        check_out=db_booking.check_out,
+        adults=db_booking.adults,
+        children=db_booking.children,
+        user=guest_user,
         is_package=False,
-        rooms=[br.room for br in booking_with_rooms.booking_rooms if br.room]
+        rooms=selected_rooms
     )
     
-    # Calculate booking charges and send confirmation email if email address is provided
-    if booking.guest_email:
-        try:
-            from app.utils.email import send_email, create_booking_confirmation_email
-            from datetime import datetime, date
-            
-            # Calculate stay duration
-            check_in_date = booking.check_in if isinstance(booking.check_in, date) else datetime.strptime(str(booking.check_in), '%Y-%m-%d').date()
-            check_out_date = booking.check_out if isinstance(booking.check_out, date) else datetime.strptime(str(booking.check_out), '%Y-%m-%d').date()
-            stay_nights = max(1, (check_out_date - check_in_date).days)
-            
-            # Calculate room charges
-            room_charges = 0
-            rooms_data = []
-            for br in booking_with_rooms.booking_rooms:
-                if br.room:
-                    room_price = br.room.price or 0
-                    room_charges_per_room = room_price * stay_nights
-                    room_charges += room_charges_per_room
-                    rooms_data.append({
-                        'number': br.room.number,
-                        'type': br.room.type or 'Standard',
-                        'price': room_price
-                    })
-            
-            # Format booking ID (BK-000001)
-            formatted_booking_id = f"BK-{str(booking_with_rooms.id).zfill(6)}"
-            
-            email_html = create_booking_confirmation_email(
-                guest_name=guest_name_to_use,
-                booking_id=booking_with_rooms.id,
-                booking_type='room',
-                check_in=str(booking.check_in),
-                check_out=str(booking.check_out),
-                rooms=rooms_data,
-                total_amount=room_charges,
-                guests={'adults': booking.adults, 'children': booking.children},
-                guest_mobile=booking.guest_mobile,
-                room_charges=room_charges,
-                stay_nights=stay_nights
-            )
-            
-            send_email(
-                to_email=booking.guest_email,
-                subject=f"Booking Confirmation {formatted_booking_id} - Elysian Retreat",
-                html_content=email_html,
-                to_name=guest_name_to_use
-            )
-        except Exception as e:
-            # Log error but don't fail the booking
-            print(f"Failed to send confirmation email: {str(e)}")
-    
     return booking_out
 
+@router.post("/bulk", response_model=BookingBulkResult, summary="Create a group of bookings in one request")
+def create_bulk_booking(bookings: List[BookingCreate], db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """
+    Group bookings for tour operators. Every item is validated like POST
+    /bookings; valid items are created in one transaction and the rest are
+    reported per item. Confirmation emails go through the outbox.
+    """
+    results = create_bulk_bookings(
+        db,
+        bookings,
+        on_flush=lambda new_booking, rooms: queue_room_confirmation_email(
+            db, new_booking, rooms, new_booking.guest_email, new_booking.guest_name, new_booking.guest_mobile
+        ),
+    )
+    created = sum(1 for result in results if result.success)
+    if created:
+        booking_totals.bump(created)
+    return BookingBulkResult(created=created, failed=len(results) - created, results=results)
+
 @router.post("/guest", response_model=BookingOut, summary="Create a booking as a guest")
-def create_guest_booking(booking: BookingCreate, db: Session = Depends(get_db)):
+def create_guest_booking(
+    booking: BookingCreate,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
     """
     Public endpoint for guests to create a booking without authentication.
+    Send an Idempotency-Key header to make retries safe: a repeat of the same
+    request returns the original response instead of booking again.
     """
+    return run_idempotent(
+        db, "bookings.guest", idempotency_key, booking, BookingOut,
+        lambda: _create_guest_booking(booking, db, check_duplicates=idempotency_key is None),
+    )
+
+
+def _create_guest_booking(booking: BookingCreate, db: Session, check_duplicates: bool = True):
     try:
-        # Find or create guest user based on email and mobile
-        guest_user_id = None
         # Normalize email and mobile - convert empty strings to None, handle None safely
         try:
             guest_email = booking.guest_email.strip() if (booking.guest_email and isinstance(booking.guest_email, str) and booking.guest_email.strip()) else None
@@ -457,22 +407,14 @@ def create_guest_booking(booking: BookingCreate, db: Session = Depends(get_db)):
         except (AttributeError, TypeError):
             guest_mobile = None
         
-        if guest_email or guest_mobile:
-            try:
-                guest_user_id = get_or_create_guest_user(
-                    db=db,
-                    email=guest_email,
-                    mobile=guest_mobile,
-                    name=booking.guest_name or "Guest User"
-                )
-            except Exception as e:
-                # Log error but don't fail the booking if user creation fails
-                print(f"Warning: Could not create/link guest user: {str(e)}")
+        # Guest user is upserted in the same transaction as the booking
+        guest_user = link_guest_user(db, guest_email, guest_mobile, booking.guest_name)
         
         # Check for duplicate booking with same details and dates
-        # Only check for duplicates if we have at least email or mobile
+        # Only check for duplicates if we have at least email or mobile;
+        # requests with an Idempotency-Key are deduplicated by the key instead
         duplicate_booking = None
-        if guest_email or guest_mobile:
+        if check_duplicates and (guest_email or guest_mobile):
             duplicate_query = db.query(Booking).filter(
                 Booking.check_in == booking.check_in,
                 Booking.check_out == booking.check_out,
@@ -536,32 +478,10 @@ def create_guest_booking(booking: BookingCreate, db: Session = Depends(get_db)):
                 detail=f"The number of children ({booking.children}) exceeds the total children capacity of the selected rooms ({total_children_capacity} children max). Please select additional rooms or reduce the number of children."
             )
 
-        # Check if rooms are available for the requested dates
-        for room_id in booking.room_ids:
-            # Check if room is already booked by regular bookings for overlapping dates (only check active bookings, not cancelled or checked-out)
-            conflicting_regular_booking = db.query(BookingRoom).join(Booking).filter(
-                BookingRoom.room_id == room_id,
-                Booking.status.in_(['booked', 'checked-in']),  # Only check for active bookings
-                Booking.check_in < booking.check_out,
-                Booking.check_out > booking.check_in
-            ).first()
-            
-            # Check if room is already booked by package bookings for overlapping dates
-            conflicting_package_booking = db.query(PackageBookingRoom).join(PackageBooking).filter(
-                PackageBookingRoom.room_id == room_id,
-                PackageBooking.status.in_(['booked', 'checked-in']),  # Only check for active bookings
-                PackageBooking.check_in < booking.check_out,
-                PackageBooking.check_out > booking.check_in
-            ).first()
-            
-            if conflicting_regular_booking or conflicting_package_booking:
-                room = db.query(Room).filter(Room.id == room_id).first()
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Room {room.number if room else room_id} is not available for the selected dates."
-                )
-
-        db_booking = Booking(
+        # Check if rooms are available for the requested dates (regular and package bookings, one query)
+        ensure_rooms_available(db, booking.room_ids, booking.check_in, booking.check_out, rooms=selected_rooms)
+
+        db_booking = write_booking(db, Booking(
             guest_name=guest_name_to_use,
             guest_mobile=guest_mobile or booking.guest_mobile or None,  # Use normalized mobile or original, fallback to None
             guest_email=guest_email or booking.guest_email or None,  # Use normalized email or original, fallback to None
@@ -569,83 +489,27 @@ def create_guest_booking(booking: BookingCreate, db: Session = Depends(get_db)):
             check_out=booking.check_out,
             adults=booking.adults,
             children=booking.children,
-            user_id=guest_user_id,  # Link booking to guest user
-        )
-        db.add(db_booking)
-        db.commit()
-        db.refresh(db_booking)
-
-        # Create BookingRoom links and update room status
-        for room_id in booking.room_ids:
-            db.query(Room).filter(Room.id == room_id).update({"status": "Booked"})
-            db.add(BookingRoom(booking_id=db_booking.id, room_id=room_id))
-        db.commit()
-        db.refresh(db_booking)
+            user=guest_user,  # Link booking to guest user
+        ), selected_rooms, on_flush=lambda new_booking: queue_room_confirmation_email(
+            db, new_booking, selected_rooms, guest_email or booking.guest_email, guest_name_to_use, guest_mobile or booking.guest_mobile
+        ))
+        booking_totals.bump()
         
-        # Reload with room details for email and response
-        booking_with_rooms = (
-            db.query(Booking)
-            .options(joinedload(Booking.booking_rooms).joinedload(BookingRoom.room))
-            .filter(Booking.id == db_booking.id)
-            .first()
+        return BookingOut(
+            id=db_booking.id,
+            guest_name=db_booking.guest_name,
+            guest_mobile=db_booking.guest_mobile,
+            guest_email=db_booking.guest_email,
+            status=db_booking.status,
+            check_in=db_booking.check_in,
+            check_out=db_booking.check_out,
+            adults=db_booking.adults,
+            children=db_booking.children,
+            user=guest_user,
+            is_package=False,
+            rooms=selected_rooms
         )
         
-        # Calculate booking charges and send confirmation email if email address is provided
-        if guest_email or booking.guest_email:
-            try:
-                from app.utils.email import send_email, create_booking_confirmation_email
-                from datetime import datetime, date
-                
-                # Calculate stay duration
-                check_in_date = booking.check_in if isinstance(booking.check_in, date) else datetime.strptime(str(booking.check_in), '%Y-%m-%d').date()
-                check_out_date = booking.check_out if isinstance(booking.check_out, date) else datetime.strptime(str(booking.check_out), '%Y-%m-%d').date()
-                stay_nights = max(1, (check_out_date - check_in_date).days)
-                
-                # Calculate room charges
-                room_charges = 0
-                rooms_data = []
-                for br in booking_with_rooms.booking_rooms:
-                    if br.room:
-                        room_price = br.room.price or 0
-                        room_charges_per_room = room_price * stay_nights
-                        room_charges += room_charges_per_room
-                        rooms_data.append({
-                            'number': br.room.number,
-                            'type': br.room.type or 'Standard',
-                            'price': room_price
-                        })
-                
-                # Format booking ID (BK-000001)
-                formatted_booking_id = f"BK-{str(db_booking.id).zfill(6)}"
-                
-                email_to_use = guest_email or booking.guest_email
-                if email_to_use:
-                    email_html = create_booking_confirmation_email(
-                        guest_name=guest_name_to_use,
-                        booking_id=db_booking.id,
-                        booking_type='room',
-                        check_in=str(booking.check_in),
-                        check_out=str(booking.check_out),
-                        rooms=rooms_data,
-                        total_amount=room_charges,
-                        guests={'adults': booking.adults, 'children': booking.children},
-                        guest_mobile=guest_mobile or booking.guest_mobile,
-                        room_charges=room_charges,
-                        stay_nights=stay_nights
-                    )
-                    
-                    send_email(
-                        to_email=email_to_use,
-                        subject=f"Booking Confirmation {formatted_booking_id} - Elysian Retreat",
-                        html_content=email_html,
-                        to_name=guest_name_to_use
-                    )
-            except Exception as e:
-                # Log error but don't fail the booking
-                print(f"Failed to send confirmation email: {str(e)}")
-        
-        return booking_with_rooms
-        
     except HTTPException:
         # Re-raise HTTP exceptions (like validation errors) as-is
         raise
@@ -686,19 +550,9 @@ def check_in_booking(
     if booking.status != "booked":
         raise HTTPException(status_code=400, detail=f"Booking is not in 'booked' state. Current status: {booking.status}")
 
-    # Save ID card image
-    id_card_filename = f"id_{booking_id}_{uuid.uuid4().hex}.jpg"
-    id_card_path = os.path.join(UPLOAD_DIR, id_card_filename)
-    with open(id_card_path, "wb") as buffer:
-        shutil.copyfileobj(id_card_image.file, buffer)
-    booking.id_card_image_url = id_card_filename
-
-    # Save guest photo
-    guest_photo_filename = f"guest_{booking_id}_{uuid.uuid4().hex}.jpg"
-    guest_photo_path = os.path.join(UPLOAD_DIR, guest_photo_filename)
-    with open(guest_photo_path, "wb") as buffer:
-        shutil.copyfileobj(guest_photo.file, buffer)
-    booking.guest_photo_url = guest_photo_filename
+    # Save ID card image and guest photo; the booking keeps the stored names
+    booking.id_card_image_url = checkin_store.save_sync(id_card_image).name
+    booking.guest_photo_url = checkin_store.save_sync(guest_photo).name
 
     booking.status = "checked-in"
 
@@ -709,8 +563,12 @@ def check_in_booking(
     if booking.booking_rooms:
         room_ids = [br.room_id for br in booking.booking_rooms]
         db.query(Room).filter(Room.id.in_(room_ids)).update({"status": "Checked-in"}, synchronize_session=False)
+        record_room_statuses(db, dict.fromkeys(room_ids, "Checked-in"))
 
     db.commit()
+    invalidate_occupancy_grid(booking.check_in, booking.check_out)
+    refresh_room_statuses(db, [br.room_id for br in booking.booking_rooms])
+    booking_totals.invalidate()
     db.refresh(booking)
     return booking
 
@@ -735,9 +593,14 @@ def cancel_booking(booking_id: Union[str, int], db: Session = Depends(get_db), c
     if booking.booking_rooms:
         room_ids = [br.room_id for br in booking.booking_rooms]
         db.query(Room).filter(Room.id.in_(room_ids)).update({"status": "Available"}, synchronize_session=False)
+        record_room_statuses(db, dict.fromkeys(room_ids, "Available"))
 
     booking.status = "cancelled"
+    release_reservations(db, booking_id=booking.id)
     db.commit()
+    invalidate_occupancy_grid(booking.check_in, booking.check_out)
+    refresh_room_statuses(db, [br.room_id for br in booking.booking_rooms])
+    booking_totals.invalidate()
     db.refresh(booking)
     return booking
     
@@ -809,45 +672,30 @@ def extend_checkout(booking_id: Union[str, int], new_checkout: str, db: Session
     room_ids = [br.room_id for br in booking.booking_rooms if br.room_id]
     
     if room_ids:
-        # Check for conflicts with regular bookings
         # A conflict exists if another booking overlaps with the extended period
-        # Extended period: from booking.check_out (exclusive) to new_checkout_date (inclusive)
-        conflicting_bookings = db.query(Booking).join(BookingRoom).filter(
-            Booking.id != booking_id,
-            BookingRoom.room_id.in_(room_ids),
-            Booking.status.in_(['booked', 'checked-in', 'checked_in']),
-            and_(
-                Booking.check_in < new_checkout_date,
-                Booking.check_out > booking.check_out
-            )
-        ).first()
-        
-        if conflicting_bookings:
+        # Extended period: from booking.check_out (inclusive) to new_checkout_date (exclusive)
+        conflicts = find_conflicts(
+            db, room_ids, booking.check_out, new_checkout_date, exclude_booking_id=booking_id
+        )
+        stays = [stay for room_stays in conflicts.values() for stay in room_stays]
+        conflicting_booking = next((stay for stay in stays if not stay.is_package), None)
+        if conflicting_booking:
             raise HTTPException(
                 status_code=400,
-                detail=f"Cannot extend checkout date. Room(s) are already booked by another booking (ID: {conflicting_bookings.id}) during the extended period."
-            )
-        
-        # Check for conflicts with package bookings
-        # A conflict exists if a package booking overlaps with the extended period
-        conflicting_package_bookings = db.query(PackageBooking).join(PackageBookingRoom).filter(
-            PackageBookingRoom.room_id.in_(room_ids),
-            PackageBooking.status.in_(['booked', 'checked-in', 'checked_in']),
-            and_(
-                PackageBooking.check_in < new_checkout_date,
-                PackageBooking.check_out > booking.check_out
+                detail=f"Cannot extend checkout date. Room(s) are already booked by another booking (ID: {conflicting_booking.booking_id}) during the extended period."
             )
-        ).first()
-        
-        if conflicting_package_bookings:
+        if stays:
             raise HTTPException(
                 status_code=400,
-                detail=f"Cannot extend checkout date. Room(s) are already booked by a package booking (ID: {conflicting_package_bookings.id}) during the extended period."
+                detail=f"Cannot extend checkout date. Room(s) are already booked by a package booking (ID: {stays[0].booking_id}) during the extended period."
             )
     
     # Update the checkout date
     booking.check_out = new_checkout_date
-    db.commit()
+    extend_reservations(db, new_checkout_date, booking_id=booking.id)
+    commit_reservations(db, [br.room for br in booking.booking_rooms if br.room])
+    invalidate_occupancy_grid(booking.check_in, new_checkout_date)
+    booking_totals.invalidate()
     db.refresh(booking)
     
     # Reload booking with relationships for response
@@ -896,7 +744,7 @@ def get_booking(booking_id: Union[str, int], db: Session = Depends(get_db), curr
 # -------------------------------
 @router.get("/checkin-image/{filename}")
 def get_checkin_image(filename: str):
-    filepath = os.path.join(UPLOAD_DIR, filename)
-    if not os.path.exists(filepath) or not os.path.isfile(filepath):
+    filepath = checkin_store.locate(filename)
+    if filepath is None:
         raise HTTPException(status_code=404, detail="Image not found")
     return FileResponse(filepath)
\ No newline at end of file
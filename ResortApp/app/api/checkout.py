@@ -1,19 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, func
-from typing import List
+from collections import defaultdict
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import func, update
+from typing import Dict, List, Optional
 from datetime import date, datetime
 
 # Assume your utility and model imports are set up correctly
+from app.database import SessionLocal
 from app.utils.auth import get_db, get_current_user
 from app.models.room import Room
 from app.models.booking import Booking, BookingRoom
 from app.models.Package import Package, PackageBooking, PackageBookingRoom
 from app.models.user import User
 from app.models.foodorder import FoodOrder, FoodOrderItem
+from app.models.food_item import FoodItem
 from app.models.service import AssignedService, Service
 from app.models.checkout import Checkout
-from app.schemas.checkout import BillSummary, BillBreakdown, CheckoutFull, CheckoutSuccess, CheckoutRequest
+from app.schemas.checkout import BillSummary, BillBreakdown, BillPreview, CheckoutFull, CheckoutSuccess, CheckoutRequest
+from app.utils.occupancy_grid import invalidate_occupancy_grid
+from app.utils.events import record_room_statuses
+from app.utils.room_status import property_today, refresh_room_statuses
+from app.utils.reservations import release_reservations
+from app.utils import tax
+from app.utils.tax import TaxLine, money
+from app.utils.folio import UNBILLED_FOOD, UNBILLED_SERVICE, folio_totals, is_whole_property, mark_folio_rooms
 
 router = APIRouter(prefix="/bill", tags=["checkout"])
 
@@ -248,9 +259,220 @@ def get_active_rooms(db: Session = Depends(get_db), current_user: User = Depends
         print(traceback.format_exc())
         return []
 
-def _calculate_bill_for_single_room(db: Session, room_number: str):
+# ---------------- Night audit: every open bill at once ----------------
+
+ACTIVE_BILL_STATUSES = ['checked-in', 'checked_in']
+# Bookings per round of queries; bounds memory when streaming a large property
+PREVIEW_BATCH_SIZE = 200
+
+
+def _unbilled_lines_by_room(db: Session, room_ids: List[int]):
+    """
+    Unbilled food and service lines of many rooms in two grouped queries:
+    ({room_id: [food line]}, {room_id: [service line]}). Repeated items and
+    services are combined into one line each.
+    """
+    food_lines: Dict[int, list] = defaultdict(list)
+    service_lines: Dict[int, list] = defaultdict(list)
+    if not room_ids:
+        return food_lines, service_lines
+
+    food_rows = (db.query(FoodOrder.room_id, FoodItem.name, FoodItem.price, func.sum(FoodOrderItem.quantity))
+                 .join(FoodOrderItem, FoodOrderItem.order_id == FoodOrder.id)
+                 .join(FoodItem, FoodItem.id == FoodOrderItem.food_item_id)
+                 .filter(FoodOrder.room_id.in_(room_ids), UNBILLED_FOOD)
+                 .group_by(FoodOrder.room_id, FoodItem.id, FoodItem.name, FoodItem.price)
+                 .order_by(FoodOrder.room_id, FoodItem.name))
+    for room_id, name, price, quantity in food_rows:
+        quantity = int(quantity or 0)
+        food_lines[room_id].append({"item_name": name, "quantity": quantity, "amount": quantity * (price or 0)})
+
+    service_rows = (db.query(AssignedService.room_id, Service.name, func.sum(Service.charges))
+                    .join(Service, Service.id == AssignedService.service_id)
+                    .filter(AssignedService.room_id.in_(room_ids), UNBILLED_SERVICE)
+                    .group_by(AssignedService.room_id, Service.id, Service.name)
+                    .order_by(AssignedService.room_id, Service.name))
+    for room_id, name, charges in service_rows:
+        service_lines[room_id].append({"service_name": name, "charges": charges or 0})
+    return food_lines, service_lines
+
+
+def _bill_preview(booking, rooms: List[Room], is_package: bool, as_of: date, food_lines, service_lines) -> BillPreview:
+    """The same bill as _calculate_bill_for_entire_booking, from preloaded rows; GST is added per batch."""
+    # Same effective checkout rule as a checkout on `as_of`
+    effective_checkout_date = max(as_of, booking.check_out)
+    stay_days = max(1, (effective_checkout_date - booking.check_in).days)
+
+    room_charges = package_charges = 0
+    if is_package:
+        package = booking.package
+        package_price = package.price if package else 0
+        if is_whole_property(package):
+            package_charges = package_price
+        else:
+            package_charges = package_price * len(rooms) * stay_days
+    else:
+        room_charges = sum((room.price or 0) * stay_days for room in rooms)
+
+    food_items = [line for room in rooms for line in food_lines.get(room.id, [])]
+    service_items = [line for room in rooms for line in service_lines.get(room.id, [])]
+    charges = BillBreakdown(
+        room_charges=room_charges,
+        package_charges=package_charges,
+        food_charges=sum(line["amount"] for line in food_items),
+        service_charges=sum(line["charges"] for line in service_items),
+        food_items=food_items,
+        service_items=service_items,
+    )
+
+    return BillPreview(
+        booking_id=booking.id,
+        booking_type="package" if is_package else "regular",
+        guest_name=booking.guest_name,
+        room_numbers=sorted(room.number for room in rooms),
+        number_of_guests=getattr(booking, 'number_of_guests', 1),
+        stay_nights=stay_days,
+        check_in=booking.check_in,
+        check_out=effective_checkout_date,
+        charges=charges,
+    )
+
+
+def _iter_bill_previews(db: Session, as_of: date, departing: bool):
+    """Bills of every checked-in booking, in batches of PREVIEW_BATCH_SIZE bookings."""
+    sources = (
+        (Booking, Booking.booking_rooms, BookingRoom.room, False),
+        (PackageBooking, PackageBooking.rooms, PackageBookingRoom.room, True),
+    )
+    for model, links, link_room, is_package in sources:
+        last_id = 0
+        while True:
+            query = (db.query(model)
+                     .options(selectinload(links).selectinload(link_room))
+                     .filter(model.status.in_(ACTIVE_BILL_STATUSES), model.id > last_id))
+            if is_package:
+                query = query.options(selectinload(PackageBooking.package))
+            if departing:
+                query = query.filter(model.check_out <= as_of)
+            batch = query.order_by(model.id).limit(PREVIEW_BATCH_SIZE).all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            rooms_by_booking = {
+                booking.id: [link.room for link in getattr(booking, links.key) if link.room]
+                for booking in batch
+            }
+            food_lines, service_lines = _unbilled_lines_by_room(
+                db, [room.id for rooms in rooms_by_booking.values() for room in rooms]
+            )
+            previews = [
+                _bill_preview(booking, rooms_by_booking[booking.id], is_package, as_of, food_lines, service_lines)
+                for booking in batch if rooms_by_booking[booking.id]
+            ]
+            _apply_gst_and_totals(
+                *[preview.charges for preview in previews],
+                on=as_of,
+                nights=[preview.stay_nights for preview in previews],
+            )
+            yield from previews
+            if len(batch) < PREVIEW_BATCH_SIZE:
+                break
+
+
+@router.get("/preview-all", response_model=List[BillPreview])
+def preview_all_bills(
+    as_of: Optional[date] = Query(None, alias="date", description="Audit date; defaults to today"),
+    departing: bool = Query(False, description="Only bookings due to check out by the audit date"),
+    stream: bool = Query(False, description="Stream one JSON bill per line (application/x-ndjson)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Bill previews for every checked-in booking (all rooms of each booking),
+    as GET /bill/{room_number} would return them on `date`, for the night
+    audit and the morning departures list. Food and service charges come
+    from grouped queries per batch of bookings instead of per room.
+    """
+    as_of = as_of or property_today()
+    if not stream:
+        return list(_iter_bill_previews(db, as_of, departing))
+
+    def lines():
+        # Own session: the response outlives the request's dependencies
+        stream_db = SessionLocal()
+        try:
+            for preview in _iter_bill_previews(stream_db, as_of, departing):
+                yield preview.model_dump_json() + "\n"
+        finally:
+            stream_db.close()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def _apply_gst_and_totals(*bills: BillBreakdown, on: Optional[date] = None, nights: Optional[List[int]] = None):
+    """
+    GST and totals of one or more bills, computed by the tax engine
+    (app/utils/tax.py) in one pass: room and package charges on the
+    12%/18% slab, food at 5%. `nights` (per bill) feeds per-night slabs.
+    """
+    lines = []
+    for i, charges in enumerate(bills):
+        stay_nights = nights[i] if nights else 1
+        lines += [
+            TaxLine(tax.ROOM, charges.room_charges, stay_nights),
+            TaxLine(tax.PACKAGE, charges.package_charges, stay_nights),
+            TaxLine(tax.FOOD, charges.food_charges),
+        ]
+    taxes = iter(tax.compute_taxes(lines, on=on))
+    for charges in bills:
+        room_gst, package_gst, food_gst = next(taxes), next(taxes), next(taxes)
+        charges.room_gst = float(room_gst)
+        charges.package_gst = float(package_gst)
+        charges.food_gst = float(food_gst)
+        charges.total_gst = float(room_gst + package_gst + food_gst)
+        # Total due (subtotal before GST)
+        charges.total_due = float(sum(
+            (money(amount) for amount in (charges.room_charges, charges.food_charges, charges.service_charges, charges.package_charges)),
+            tax.ZERO,
+        ))
+
+
+def _lock_for_checkout(db: Session, booking, is_package: bool, room_ids: List[int]):
+    """
+    SELECT ... FOR UPDATE the booking, then its rooms in id order, and reload
+    them. Every checkout takes the locks in this order, so concurrent
+    checkouts of one booking run one after the other and the later one sees
+    the first one's result instead of billing again.
+    """
+    model = PackageBooking if is_package else Booking
+    db.query(model).filter(model.id == booking.id).populate_existing().with_for_update().one()
+    db.query(Room).filter(Room.id.in_(room_ids)).order_by(Room.id).populate_existing().with_for_update().all()
+    if booking.status not in ['checked-in', 'checked_in', 'booked']:
+        raise HTTPException(status_code=409, detail=f"This booking has already been checked out. Current status: {booking.status}")
+
+
+def _mark_charges_billed(db: Session, room_ids: List[int]):
+    """Flip exactly the charges the bill included to billed: one UPDATE per table."""
+    db.execute(
+        update(FoodOrder)
+        .where(FoodOrder.room_id.in_(room_ids), UNBILLED_FOOD)
+        .values(billing_status="billed")
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        update(AssignedService)
+        .where(AssignedService.room_id.in_(room_ids), UNBILLED_SERVICE)
+        .values(billing_status="billed")
+        .execution_options(synchronize_session=False)
+    )
+    mark_folio_rooms(db, room_ids)
+
+
+def _calculate_bill_for_single_room(db: Session, room_number: str, lock: bool = False):
     """
     Calculates bill for a single room only, regardless of how many rooms are in the booking.
+    With `lock`, the booking and room are locked for checkout before the charges are read.
     """
     # 1. Find the room
     room = db.query(Room).filter(Room.number == room_number).first()
@@ -285,6 +507,9 @@ def _calculate_bill_for_single_room(db: Session, room_number: str):
     if not booking:
         raise HTTPException(status_code=404, detail=f"No active booking found for room {room_number}.")
     
+    if lock:
+        _lock_for_checkout(db, booking, is_package, [room.id])
+
     # 3. Calculate charges for THIS ROOM ONLY
     charges = BillBreakdown()
     
@@ -296,22 +521,12 @@ def _calculate_bill_for_single_room(db: Session, room_number: str):
     stay_days = max(1, (effective_checkout_date - booking.check_in).days)
     
     if is_package:
-        # Check if this is a whole_property package
         package = booking.package if booking.package else None
-        is_whole_property = False
-        if package:
-            # Check booking_type field
-            booking_type = getattr(package, 'booking_type', None)
-            if booking_type:
-                is_whole_property = booking_type.lower() in ['whole_property', 'whole property']
-            else:
-                # Fallback: if no room_types specified, treat as whole_property (legacy packages)
-                room_types = getattr(package, 'room_types', None)
-                is_whole_property = not room_types or not room_types.strip()
+        whole_property = is_whole_property(package)
         
         package_price = package.price if package else 0
         
-        if is_whole_property:
+        if whole_property:
             # For whole_property packages: package price is the total amount (not multiplied by days)
             # Note: For single room checkout, we still use the full package price
             # as it's a whole property package (all rooms included)
@@ -332,12 +547,10 @@ def _calculate_bill_for_single_room(db: Session, room_number: str):
     unbilled_food_order_items = (db.query(FoodOrderItem)
                                  .join(FoodOrder)
                                  .options(joinedload(FoodOrderItem.food_item))
-                                 .filter(FoodOrder.room_id == room.id, 
-                                        or_(FoodOrder.billing_status == "unbilled", 
-                                            FoodOrder.billing_status.is_(None)))
+                                 .filter(FoodOrder.room_id == room.id, UNBILLED_FOOD)
                                  .all())
     
-    unbilled_services = db.query(AssignedService).options(joinedload(AssignedService.service)).filter(AssignedService.room_id == room.id, AssignedService.billing_status == "unbilled").all()
+    unbilled_services = db.query(AssignedService).options(joinedload(AssignedService.service)).filter(AssignedService.room_id == room.id, UNBILLED_SERVICE).all()
     
     charges.food_charges = sum(item.quantity * item.food_item.price for item in unbilled_food_order_items if item.food_item)
     charges.service_charges = sum(ass.service.charges for ass in unbilled_services)
@@ -345,33 +558,7 @@ def _calculate_bill_for_single_room(db: Session, room_number: str):
     charges.food_items = [{"item_name": item.food_item.name, "quantity": item.quantity, "amount": item.quantity * item.food_item.price} for item in unbilled_food_order_items if item.food_item]
     charges.service_items = [{"service_name": ass.service.name, "charges": ass.service.charges} for ass in unbilled_services]
     
-    # Calculate GST
-    # Room charges: 12% GST if <= 7500, 18% GST if > 7500
-    room_charge_amount = charges.room_charges or 0
-    if room_charge_amount > 0:
-        if room_charge_amount <= 7500:
-            charges.room_gst = room_charge_amount * 0.12
-        else:
-            charges.room_gst = room_charge_amount * 0.18
-    
-    # Package charges: Same rule as room charges (12% if <= 7500, 18% if > 7500)
-    package_charge_amount = charges.package_charges or 0
-    if package_charge_amount > 0:
-        if package_charge_amount <= 7500:
-            charges.package_gst = package_charge_amount * 0.12
-        else:
-            charges.package_gst = package_charge_amount * 0.18
-    
-    # Food charges: 5% GST always
-    food_charge_amount = charges.food_charges or 0
-    if food_charge_amount > 0:
-        charges.food_gst = food_charge_amount * 0.05
-    
-    # Total GST
-    charges.total_gst = (charges.room_gst or 0) + (charges.food_gst or 0) + (charges.package_gst or 0)
-    
-    # Total due (subtotal before GST)
-    charges.total_due = sum([charges.room_charges, charges.food_charges, charges.service_charges, charges.package_charges])
+    _apply_gst_and_totals(charges, nights=[stay_days])
     
     number_of_guests = getattr(booking, 'number_of_guests', 1)
     
@@ -381,10 +568,12 @@ def _calculate_bill_for_single_room(db: Session, room_number: str):
         "effective_checkout_date": effective_checkout_date
     }
 
-def _calculate_bill_for_entire_booking(db: Session, room_number: str):
+def _calculate_bill_for_entire_booking(db: Session, room_number: str, detail: bool = True, lock: bool = False):
     """
     Core logic: Finds an entire booking from a single room number and calculates the total bill
-    for all associated rooms and services.
+    for all associated rooms and services. Totals come from the booking's folio; the food and
+    service line items are only loaded when `detail` is set. With `lock`, the booking and all
+    its rooms are locked for checkout before the charges are read.
     """
     # 1. Find the initial room to identify the parent booking
     initial_room = db.query(Room).filter(Room.number == room_number).first()
@@ -438,6 +627,9 @@ def _calculate_bill_for_entire_booking(db: Session, room_number: str):
     if not all_rooms:
          raise HTTPException(status_code=404, detail="Booking found, but no rooms are linked to it.")
 
+    if lock:
+        _lock_for_checkout(db, booking, is_package, room_ids)
+
     # 4. Calculate total charges across ALL rooms
     charges = BillBreakdown()
     
@@ -448,85 +640,27 @@ def _calculate_bill_for_entire_booking(db: Session, room_number: str):
     effective_checkout_date = max(today, booking.check_out)
     stay_days = max(1, (effective_checkout_date - booking.check_in).days)
 
-    if is_package:
-        # Check if this is a whole_property package
-        package = booking.package if booking.package else None
-        is_whole_property = False
-        if package:
-            # Check booking_type field
-            booking_type = getattr(package, 'booking_type', None)
-            if booking_type:
-                is_whole_property = booking_type.lower() in ['whole_property', 'whole property']
-            else:
-                # Fallback: if no room_types specified, treat as whole_property (legacy packages)
-                room_types = getattr(package, 'room_types', None)
-                is_whole_property = not room_types or not room_types.strip()
-        
-        package_price = package.price if package else 0
-        
-        if is_whole_property:
-            # For whole_property packages: package price is the total amount (not multiplied by rooms/days)
-            charges.package_charges = package_price
-            charges.room_charges = 0  # Room charges are included in the package price
-        else:
-            # For room_type packages: package price is per room, per night
-            num_rooms_in_package = len(all_rooms)
-            charges.package_charges = package_price * num_rooms_in_package * stay_days
-            charges.room_charges = 0  # Room charges are included in the package price
-    else:
-        charges.package_charges = 0
-        # For regular bookings: calculate room charges as number of rooms * days * room price
-        charges.room_charges = sum((room.price or 0) * stay_days for room in all_rooms)
-    
-    # Sum up additional food and service charges from all rooms
-    # We need to get the individual items from the orders to display them.
-    # Include food orders with billing_status "unbilled" or NULL (for orders created before billing_status was added)
-    # Exclude only orders that are explicitly marked as "billed"
-    unbilled_food_order_items = (db.query(FoodOrderItem)
-                                 .join(FoodOrder)
-                                 .options(joinedload(FoodOrderItem.food_item))
-                                 .filter(FoodOrder.room_id.in_(room_ids), 
-                                        or_(FoodOrder.billing_status == "unbilled", 
-                                            FoodOrder.billing_status.is_(None)))
-                                 .all())
-
-    unbilled_services = db.query(AssignedService).options(joinedload(AssignedService.service)).filter(AssignedService.room_id.in_(room_ids), AssignedService.billing_status == "unbilled").all()
+    # Running subtotals from the booking's folio (app/utils/folio.py): one row, not every order
+    totals = folio_totals(db, booking, is_package, stay_days)
+    charges.room_charges = float(totals.room_charges)
+    charges.package_charges = float(totals.package_charges)
+    charges.food_charges = float(totals.food_charges)
+    charges.service_charges = float(totals.service_charges)
 
-    # Calculate total food charges from the individual items.
-    charges.food_charges = sum(item.quantity * item.food_item.price for item in unbilled_food_order_items if item.food_item)
-    charges.service_charges = sum(ass.service.charges for ass in unbilled_services)
+    if detail:
+        # Individual items for the itemised bill.
+        # Include food orders with billing_status "unbilled" or NULL (for orders created before billing_status was added)
+        unbilled_food_order_items = (db.query(FoodOrderItem)
+                                     .join(FoodOrder)
+                                     .options(joinedload(FoodOrderItem.food_item))
+                                     .filter(FoodOrder.room_id.in_(room_ids), UNBILLED_FOOD)
+                                     .all())
+        unbilled_services = db.query(AssignedService).options(joinedload(AssignedService.service)).filter(AssignedService.room_id.in_(room_ids), UNBILLED_SERVICE).all()
 
-    # Populate detailed item lists for the bill summary
-    charges.food_items = [{"item_name": item.food_item.name, "quantity": item.quantity, "amount": item.quantity * item.food_item.price} for item in unbilled_food_order_items if item.food_item]
-    charges.service_items = [{"service_name": ass.service.name, "charges": ass.service.charges} for ass in unbilled_services]
+        charges.food_items = [{"item_name": item.food_item.name, "quantity": item.quantity, "amount": item.quantity * item.food_item.price} for item in unbilled_food_order_items if item.food_item]
+        charges.service_items = [{"service_name": ass.service.name, "charges": ass.service.charges} for ass in unbilled_services]
 
-    # Calculate GST
-    # Room charges: 12% GST if <= 7500, 18% GST if > 7500
-    room_charge_amount = charges.room_charges or 0
-    if room_charge_amount > 0:
-        if room_charge_amount <= 7500:
-            charges.room_gst = room_charge_amount * 0.12
-        else:
-            charges.room_gst = room_charge_amount * 0.18
-    
-    # Package charges: Same rule as room charges (12% if <= 7500, 18% if > 7500)
-    package_charge_amount = charges.package_charges or 0
-    if package_charge_amount > 0:
-        if package_charge_amount <= 7500:
-            charges.package_gst = package_charge_amount * 0.12
-        else:
-            charges.package_gst = package_charge_amount * 0.18
-    
-    # Food charges: 5% GST always
-    food_charge_amount = charges.food_charges or 0
-    if food_charge_amount > 0:
-        charges.food_gst = food_charge_amount * 0.05
-    
-    # Total GST
-    charges.total_gst = (charges.room_gst or 0) + (charges.food_gst or 0) + (charges.package_gst or 0)
-
-    # Total due (subtotal before GST)
-    charges.total_due = sum([charges.room_charges, charges.food_charges, charges.service_charges, charges.package_charges])
+    _apply_gst_and_totals(charges, nights=[stay_days])
 
     # Assume number_of_guests is a field on the booking model. Default to 1 if not present.
     number_of_guests = getattr(booking, 'number_of_guests', 1)
@@ -539,11 +673,12 @@ def _calculate_bill_for_entire_booking(db: Session, room_number: str):
 
 
 @router.get("/{room_number}", response_model=BillSummary)
-def get_bill_for_booking(room_number: str, checkout_mode: str = "multiple", db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_bill_for_booking(room_number: str, checkout_mode: str = "multiple", detail: bool = True, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     """
     Returns a bill summary for the booking associated with the given room number.
     If checkout_mode is 'single', calculates bill for that room only.
     If checkout_mode is 'multiple', calculates bill for all rooms in the booking.
+    With detail=false the food and service line items are left out (totals only).
     """
     if checkout_mode == "single":
         bill_data = _calculate_bill_for_single_room(db, room_number)
@@ -558,7 +693,9 @@ def get_bill_for_booking(room_number: str, checkout_mode: str = "multiple", db:
             charges=bill_data["charges"]
         )
     else:
-        bill_data = _calculate_bill_for_entire_booking(db, room_number)
+        bill_data = _calculate_bill_for_entire_booking(db, room_number, detail=detail)
+        # Keeps a folio row built on this read
+        db.commit()
         effective_checkout = bill_data.get("effective_checkout_date", bill_data["booking"].check_out)
         return BillSummary(
             guest_name=bill_data["booking"].guest_name,
@@ -587,7 +724,8 @@ def process_booking_checkout(room_number: str, request: CheckoutRequest, db: Ses
     if checkout_mode == "single":
         # Single room checkout
         # Calculate bill first - this will validate that there's an active booking
-        bill_data = _calculate_bill_for_single_room(db, room_number)
+        # Locks the booking and room first, so a repeated request waits here
+        bill_data = _calculate_bill_for_single_room(db, room_number, lock=True)
         booking = bill_data["booking"]
         room = bill_data["room"]
         charges = bill_data["charges"]
@@ -597,18 +735,6 @@ def process_booking_checkout(room_number: str, request: CheckoutRequest, db: Ses
         if booking.status not in ['checked-in', 'checked_in', 'booked']:
             raise HTTPException(status_code=400, detail=f"Booking cannot be checked out. Current status: {booking.status}")
         
-        # Check if there's already a checkout for this specific room today (to prevent duplicates)
-        today = date.today()
-        existing_room_checkout = db.query(Checkout).filter(
-            Checkout.room_number == room_number,
-            func.date(Checkout.checkout_date) == today
-        ).first()
-        if existing_room_checkout:
-            raise HTTPException(
-                status_code=409,
-                detail=f"Room {room_number} was already checked out today (Checkout ID: {existing_room_checkout.id}). Please refresh the page to see updated room status."
-            )
-        
         # Check if booking is already checked out (more reliable than room status)
         if booking.status in ['checked_out', 'checked-out']:
             raise HTTPException(
@@ -669,13 +795,21 @@ def process_booking_checkout(room_number: str, request: CheckoutRequest, db: Ses
                 checkout_date=effective_checkout_datetime  # Use effective checkout date
             )
             db.add(new_checkout)
+            # Inserted first: a second checkout of the room on this date fails the
+            # unique index (uq_checkouts_room_number_checkout_date) before anything else is written
+            db.flush()
             
             # Update only this room's related records
-            db.query(FoodOrder).filter(FoodOrder.room_id == room.id, FoodOrder.billing_status == "unbilled").update({"billing_status": "billed"})
-            db.query(AssignedService).filter(AssignedService.room_id == room.id, AssignedService.billing_status == "unbilled").update({"billing_status": "billed"})
+            _mark_charges_billed(db, [room.id])
             
             # Update room status only (don't change booking status)
             room.status = "Available"
+            release_reservations(
+                db,
+                booking_id=booking.id if not is_package else None,
+                package_booking_id=booking.id if is_package else None,
+                room_ids=[room.id],
+            )
             
             # Check if all rooms in booking are checked out, then update booking status
             if is_package:
@@ -689,6 +823,10 @@ def process_booking_checkout(room_number: str, request: CheckoutRequest, db: Ses
             
             db.commit()
             db.refresh(new_checkout)
+            invalidate_occupancy_grid(booking.check_in, booking.check_out)
+            # Rooms still held by a partly checked-out booking keep their manual "Available"
+            if not remaining_rooms:
+                refresh_room_statuses(db, [room.id])
             
         except Exception as e:
             db.rollback()
@@ -697,7 +835,7 @@ def process_booking_checkout(room_number: str, request: CheckoutRequest, db: Ses
             if "unique constraint" in error_detail.lower() or "duplicate key" in error_detail.lower() or "23505" in error_detail:
                 raise HTTPException(
                     status_code=409, 
-                    detail=f"Checkout failed: A checkout record may already exist for this booking."
+                    detail=f"Room {room_number} has already been checked out. Please refresh the page to see updated room status."
                 )
             raise HTTPException(status_code=500, detail=f"Checkout failed due to an internal error: {error_detail}")
         
@@ -709,7 +847,8 @@ def process_booking_checkout(room_number: str, request: CheckoutRequest, db: Ses
     
     else:
         # Multiple room checkout (entire booking)
-        bill_data = _calculate_bill_for_entire_booking(db, room_number)
+        # Locks the booking and its rooms first, so a repeated request waits here
+        bill_data = _calculate_bill_for_entire_booking(db, room_number, detail=False, lock=True)
 
         booking = bill_data["booking"]
         all_rooms = bill_data["all_rooms"]
@@ -725,16 +864,6 @@ def process_booking_checkout(room_number: str, request: CheckoutRequest, db: Ses
         if booking.status not in ['checked-in', 'checked_in', 'booked']:
             raise HTTPException(status_code=400, detail=f"Booking cannot be checked out. Current status: {booking.status}")
         
-        # Check if a checkout record already exists for this booking (unique constraint)
-        existing_checkout = None
-        if not is_package:
-            existing_checkout = db.query(Checkout).filter(Checkout.booking_id == booking.id).first()
-        else:
-            existing_checkout = db.query(Checkout).filter(Checkout.package_booking_id == booking.id).first()
-        
-        if existing_checkout:
-            raise HTTPException(status_code=409, detail=f"This booking has already been checked out. Checkout ID: {existing_checkout.id}")
-        
         # Check if any rooms are already checked out
         already_checked_out_rooms = [room.number for room in all_rooms if room.status == "Available"]
         if already_checked_out_rooms:
@@ -775,16 +904,26 @@ def process_booking_checkout(room_number: str, request: CheckoutRequest, db: Ses
                 checkout_date=effective_checkout_datetime  # Use effective checkout date
             )
             db.add(new_checkout)
+            # Inserted first: the unique booking_id / package_booking_id constraint
+            # rejects a second checkout of the booking before anything else is written
+            db.flush()
 
             # Atomically update all related records
-            db.query(FoodOrder).filter(FoodOrder.room_id.in_(room_ids), FoodOrder.billing_status == "unbilled").update({"billing_status": "billed"})
-            db.query(AssignedService).filter(AssignedService.room_id.in_(room_ids), AssignedService.billing_status == "unbilled").update({"billing_status": "billed"})
+            _mark_charges_billed(db, room_ids)
             
             booking.status = "checked_out"
             db.query(Room).filter(Room.id.in_(room_ids)).update({"status": "Available"})
+            record_room_statuses(db, dict.fromkeys(room_ids, "Available"))
+            release_reservations(
+                db,
+                booking_id=booking.id if not is_package else None,
+                package_booking_id=booking.id if is_package else None,
+            )
 
             db.commit()
             db.refresh(new_checkout)
+            invalidate_occupancy_grid(booking.check_in, booking.check_out)
+            refresh_room_statuses(db, room_ids)
 
         except Exception as e:
             db.rollback()
@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends
+import os
+import time
+
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, Date
+from sqlalchemy import and_, case, func, select, true, union
 from datetime import date, timedelta
 
 from app.utils.auth import get_db
+from app.utils.availability import ACTIVE_BOOKING_STATUSES
+from app.utils.cache import SingleFlightCache
+from app.utils.daily_metrics import ALL_TIME, read_metrics
+from app.models.daily_metric import DailyMetric
 from app.models.checkout import Checkout
 from app.models.room import Room
 from app.models.booking import Booking, BookingRoom
@@ -17,133 +24,166 @@ from app.models.service import Service, AssignedService
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
 
-@router.get("/kpis")
-def get_kpis(db: Session = Depends(get_db)):
-    """
-    Calculates and returns key performance indicators for the dashboard.
-    """
-    try:
-        today = date.today()
+# KPIs are polled by every open dashboard; one query per property per interval serves them all
+KPI_TTL_SECONDS = float(os.getenv("DASHBOARD_KPI_TTL_SECONDS", "15"))
+_kpi_cache = SingleFlightCache(ttl=KPI_TTL_SECONDS)
 
-        # 1. Checkout KPIs
-        checkouts_today = db.query(Checkout).filter(func.cast(Checkout.checkout_date, Date) == today).count() or 0
-        checkouts_total = db.query(Checkout).count() or 0
+KPI_DEFAULTS = {
+    "checkouts_today": 0,
+    "checkouts_total": 0,
+    "available_rooms": 0,
+    "booked_rooms": 0,
+    "food_revenue_today": 0,
+    "package_bookings_today": 0,
+}
 
-        # 2. Room Status KPIs
-        all_rooms = db.query(Room).all() or []
-        booked_room_ids = set()
 
-        # Find rooms booked via regular bookings (include both 'booked' and 'checked-in' statuses)
-        active_bookings = db.query(BookingRoom.room_id).join(Booking).filter(
-            Booking.status.in_(['booked', 'checked-in', 'checked_in']),  # Include checked-in status
+def kpi_statement(today: date):
+    """
+    All dashboard KPIs as one statement: a CTE per figure, cross-joined into a
+    single row. Date filters are ranges on the indexed columns, not casts.
+    """
+    rooms = select(
+        func.count(Room.id).label("total_rooms"),
+        func.coalesce(func.sum(case((func.lower(Room.status) == "maintenance", 1), else_=0)), 0).label("maintenance_rooms"),
+    ).cte("room_counts")
+
+    # Rooms occupied today by regular or package bookings
+    occupied = union(
+        select(BookingRoom.room_id)
+        .join(Booking, Booking.id == BookingRoom.booking_id)
+        .where(
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES),
             Booking.check_in <= today,
             Booking.check_out > today,
-        ).all()
-        booked_room_ids.update([r.room_id for r in active_bookings if r.room_id])
-
-        # Find rooms booked via package bookings (include both 'booked' and 'checked-in' statuses)
-        active_package_bookings = db.query(PackageBookingRoom.room_id).join(PackageBooking).filter(
-            PackageBooking.status.in_(['booked', 'checked-in', 'checked_in']),  # Include checked-in status
+            BookingRoom.room_id.isnot(None),
+        ),
+        select(PackageBookingRoom.room_id)
+        .join(PackageBooking, PackageBooking.id == PackageBookingRoom.package_booking_id)
+        .where(
+            PackageBooking.status.in_(ACTIVE_BOOKING_STATUSES),
             PackageBooking.check_in <= today,
             PackageBooking.check_out > today,
-        ).all()
-        booked_room_ids.update([r.room_id for r in active_package_bookings if r.room_id])
-
-        booked_rooms_count = len(booked_room_ids) or 0
-        maintenance_rooms_count = db.query(Room).filter(func.lower(Room.status) == "maintenance").count() or 0
-        total_rooms_count = len(all_rooms) or 0
-        available_rooms_count = max(0, total_rooms_count - booked_rooms_count - maintenance_rooms_count)
-
-        # 3. Food Revenue KPI
-        # Handle both 'amount' and 'total_amount' fields for FoodOrder
-        food_revenue_today = 0
-        try:
-            food_revenue_today = db.query(func.sum(FoodOrder.amount)).filter(
-                func.cast(FoodOrder.created_at, Date) == today
-            ).scalar() or 0
-        except Exception:
-            # Fallback to total_amount if amount field doesn't exist
-            try:
-                food_revenue_today = db.query(func.sum(FoodOrder.total_amount)).filter(
-                    func.cast(FoodOrder.created_at, Date) == today
-                ).scalar() or 0
-            except Exception:
-                food_revenue_today = 0
-
-        # 4. Package Booking KPI
-        package_bookings_today = db.query(PackageBooking).filter(
-            func.cast(PackageBooking.check_in, Date) == today
-        ).count() or 0
-
-        return [{
-            "checkouts_today": checkouts_today,
-            "checkouts_total": checkouts_total,
-            "available_rooms": available_rooms_count,
-            "booked_rooms": booked_rooms_count,
-            "food_revenue_today": float(food_revenue_today) if food_revenue_today else 0,
-            "package_bookings_today": package_bookings_today,
-        }]
+            PackageBookingRoom.room_id.isnot(None),
+        ),
+    ).cte("occupied_rooms")
+    booked = select(func.count(occupied.c.room_id).label("booked_rooms")).cte("booked")
+
+    # Checkout and food figures from the daily metrics rollup
+    def metric(day, name):
+        value = case((and_(DailyMetric.day == day, DailyMetric.metric == name), DailyMetric.value), else_=0)
+        return func.coalesce(func.sum(value), 0)
+
+    metrics = (
+        select(
+            metric(today, "checkouts").label("checkouts_today"),
+            metric(ALL_TIME, "checkouts").label("checkouts_total"),
+            metric(today, "food_revenue").label("food_revenue_today"),
+        )
+        .where(DailyMetric.day.in_([today, ALL_TIME]), DailyMetric.metric.in_(["checkouts", "food_revenue"]))
+        .cte("metrics")
+    )
+
+    arrivals = select(func.count(PackageBooking.id).label("package_bookings_today")).where(
+        PackageBooking.check_in >= today, PackageBooking.check_in < today + timedelta(days=1)
+    ).cte("package_arrivals")
+
+    return select(
+        rooms.c.total_rooms,
+        rooms.c.maintenance_rooms,
+        booked.c.booked_rooms,
+        metrics.c.checkouts_today,
+        metrics.c.checkouts_total,
+        metrics.c.food_revenue_today,
+        arrivals.c.package_bookings_today,
+    ).select_from(rooms).join(booked, true()).join(metrics, true()).join(arrivals, true())
+
+
+def compute_kpis(db: Session, today: date) -> dict:
+    row = db.execute(kpi_statement(today)).one()
+    return {
+        "checkouts_today": int(row.checkouts_today),
+        "checkouts_total": int(row.checkouts_total),
+        "available_rooms": max(0, int(row.total_rooms) - int(row.booked_rooms) - int(row.maintenance_rooms)),
+        "booked_rooms": int(row.booked_rooms),
+        "food_revenue_today": float(row.food_revenue_today),
+        "package_bookings_today": int(row.package_bookings_today),
+    }
+
+
+@router.get("/kpis")
+def get_kpis(response: Response, db: Session = Depends(get_db)):
+    """
+    Calculates and returns key performance indicators for the dashboard.
+    Cached per property for KPI_TTL_SECONDS; Server-Timing tells a cache hit from a query.
+    """
+    started = time.perf_counter()
+    try:
+        today = date.today()
+        kpis, hit = _kpi_cache.get(today, lambda: compute_kpis(db, today))
+        source = "cache" if hit else "query"
     except Exception as e:
         # Return default values if there's any error to prevent 500 response
         import traceback
         print(f"Error in get_kpis: {str(e)}")
         print(traceback.format_exc())
-        return [{
-            "checkouts_today": 0,
-            "checkouts_total": 0,
-            "available_rooms": 0,
-            "booked_rooms": 0,
-            "food_revenue_today": 0,
-            "package_bookings_today": 0,
-        }]
+        kpis, source = KPI_DEFAULTS, "error"
+    response.headers["Server-Timing"] = f'kpis;desc="{source}";dur={(time.perf_counter() - started) * 1000:.1f}'
+    return [dict(kpis)]
 
 @router.get("/charts")
 def get_chart_data(db: Session = Depends(get_db)):
     """Dashboard chart data with sensible fallbacks.
-    - Primary source: Checkout totals (actual billed revenue)
+    - Primary source: Checkout totals (actual billed revenue), read from the daily metrics rollup
     - Fallback: Estimated revenue from current bookings if no checkouts exist
     """
-    from sqlalchemy import cast
+    today = date.today()
+    week = [today - timedelta(days=i) for i in range(6, -1, -1)]
+    metrics = read_metrics(
+        db,
+        week + [ALL_TIME],
+        ["revenue_room", "revenue_package", "revenue_food", "revenue_total", "checkouts", "arrivals"],
+    )
 
     # --- Primary: use billed totals from Checkout ---
-    room_total = db.query(func.coalesce(func.sum(Checkout.room_total), 0)).scalar() or 0
-    package_total = db.query(func.coalesce(func.sum(Checkout.package_total), 0)).scalar() or 0
-    food_total = db.query(func.coalesce(func.sum(Checkout.food_total), 0)).scalar() or 0
+    room_total = metrics[(ALL_TIME, "revenue_room")]
+    package_total = metrics[(ALL_TIME, "revenue_package")]
+    food_total = metrics[(ALL_TIME, "revenue_food")]
 
     # If everything is zero, build a lightweight estimate from active data to avoid empty charts
     if (room_total + package_total + food_total) == 0:
+        thirty_days_ago = today - timedelta(days=30)
+
         # Estimate room revenue: sum(room.price * nights) for recent bookings (last 30 days)
-        thirty_days_ago = date.today() - timedelta(days=30)
         recent_bookings = (
-            db.query(Booking)
-            .options()
+            db.query(Booking.check_in, Booking.check_out, func.coalesce(func.sum(Room.price), 0))
+            .join(BookingRoom, BookingRoom.booking_id == Booking.id)
+            .join(Room, Room.id == BookingRoom.room_id)
             .filter(Booking.check_in >= thirty_days_ago)
+            .group_by(Booking.id, Booking.check_in, Booking.check_out)
             .all()
         )
-        est_room = 0.0
-        for b in recent_bookings:
-            nights = max(1, (b.check_out - b.check_in).days)
-            # load linked rooms
-            brs = db.query(BookingRoom).filter(BookingRoom.booking_id == b.id).all()
-            for br in brs:
-                room = db.query(Room).filter(Room.id == br.room_id).first()
-                if room and room.price:
-                    est_room += float(room.price) * nights
-
-        # Estimate package revenue: count * average price from packages linked to recent package bookings
-        recent_pkg_bookings = (
-            db.query(PackageBooking)
+        est_room = sum(
+            float(room_prices) * max(1, (check_out - check_in).days)
+            for check_in, check_out, room_prices in recent_bookings
+        )
+
+        # Estimate package revenue: the package price of each recent package booking
+        est_package = (
+            db.query(func.coalesce(func.sum(Package.price), 0))
+            .select_from(PackageBooking)
+            .join(Package, Package.id == PackageBooking.package_id)
             .filter(PackageBooking.check_in >= thirty_days_ago)
-            .all()
+            .scalar()
+            or 0
         )
-        est_package = 0.0
-        for pb in recent_pkg_bookings:
-            pkg = db.query(Package).filter(Package.id == pb.package_id).first()
-            if pkg and pkg.price:
-                est_package += float(pkg.price)
 
-        # Food revenue estimate: billed + unbilled last 30 days
-        est_food = db.query(func.coalesce(func.sum(FoodOrder.total_amount), 0)).scalar() or 0
+        # Food revenue estimate: billed + unbilled orders of the last 30 days
+        est_food = sum(
+            read_metrics(
+                db, [thirty_days_ago + timedelta(days=i) for i in range(31)], ["food_revenue"]
+            ).values()
+        )
 
         room_total, package_total, food_total = est_room, est_package, est_food
 
@@ -155,17 +195,14 @@ def get_chart_data(db: Session = Depends(get_db)):
 
     # --- Weekly performance ---
     weekly_performance = []
-    today = date.today()
-    for i in range(6, -1, -1):
-        day = today - timedelta(days=i)
+    for day in week:
         # Billed revenue and checkout count for each day
-        day_revenue = db.query(func.coalesce(func.sum(Checkout.grand_total), 0)).filter(func.cast(Checkout.checkout_date, Date) == day).scalar() or 0
-        day_checkouts = db.query(func.count(Checkout.id)).filter(func.cast(Checkout.checkout_date, Date) == day).scalar() or 0
+        day_revenue = metrics[(day, "revenue_total")]
+        day_checkouts = metrics[(day, "checkouts")]
 
         # Fallback: if still zero, count bookings starting that day
         if not day_revenue:
-            starts = db.query(func.count(Booking.id)).filter(Booking.check_in == day).scalar() or 0
-            day_revenue = float(starts) * 1000.0  # symbolic baseline so chart shows activity
+            day_revenue = float(metrics[(day, "arrivals")]) * 1000.0  # symbolic baseline so chart shows activity
         weekly_performance.append({
             "day": day.strftime("%a"),
             "revenue": round(float(day_revenue), 2),
@@ -201,7 +238,7 @@ def get_reports_data(db: Session = Depends(get_db)):
 
     return [{
         "kpis": {
-            "total_revenue": db.query(func.sum(Checkout.grand_total)).scalar() or 0,
+            "total_revenue": float(read_metrics(db, [ALL_TIME], ["revenue_total"])[(ALL_TIME, "revenue_total")]),
             "total_expenses": db.query(func.sum(Expense.amount)).scalar() or 0,
             "total_bookings": db.query(Booking).count() + db.query(PackageBooking).count(),
             "active_employees": db.query(Employee).count(),
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime
+from app.utils.auth import get_db, get_current_user
+from app.utils.email_outbox import notify_sender, outbox_counts
+from app.models.email_outbox import EmailOutbox
+from app.models.user import User
+from app.schemas.email_outbox import EmailOutboxOut, EmailOutboxStatusOut
+
+router = APIRouter(prefix="/email-outbox", tags=["Email Outbox"])
+
+
+@router.get("", response_model=EmailOutboxStatusOut)
+def get_email_outbox(
+    status: Optional[str] = None,
+    limit: int = 50,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Delivery status of queued emails: counts per status and the latest rows."""
+    query = db.query(EmailOutbox)
+    if status:
+        query = query.filter(EmailOutbox.status == status)
+    emails = query.order_by(EmailOutbox.id.desc()).limit(limit).all()
+    return {"counts": outbox_counts(db), "emails": emails}
+
+
+@router.post("/{email_id}/retry", response_model=EmailOutboxOut)
+def retry_email(email_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Put a failed or skipped email back in the queue for immediate delivery."""
+    email = db.query(EmailOutbox).filter(EmailOutbox.id == email_id).first()
+    if not email:
+        raise HTTPException(status_code=404, detail="Email not found")
+    if email.status == "sent":
+        raise HTTPException(status_code=400, detail="Email has already been sent")
+    email.status = "pending"
+    email.attempts = 0
+    email.next_attempt_at = datetime.utcnow()
+    db.commit()
+    db.refresh(email)
+    notify_sender()
+    return email
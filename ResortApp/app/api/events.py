@@ -0,0 +1,127 @@
+import asyncio
+import json
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app.database import SessionLocal
+from app.utils.auth import get_current_user
+from app.utils.events import bus
+from app.utils.pg_listener import WORKER_ID
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+# Comment line sent when idle so proxies keep the connection open
+KEEPALIVE_SECONDS = 15
+# Client reconnect delay, in milliseconds
+RETRY_MS = 3000
+
+
+def _authenticate(token: Optional[str]):
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    db = SessionLocal()
+    try:
+        return get_current_user(token=token, db=db)
+    finally:
+        db.close()
+
+
+def _frame(seq: Optional[int], event_type: str, data: dict) -> str:
+    lines = []
+    if seq is not None:
+        # Sequence numbers are per worker: the id says whose they are
+        lines.append(f"id: {WORKER_ID}:{seq}")
+    lines.append(f"event: {event_type}")
+    lines.append("data: " + json.dumps(data, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+
+def _parse_last_event_id(value: Optional[str]) -> Optional[Tuple[str, int]]:
+    """(worker id, sequence number) of a Last-Event-ID; ("", 0) when it is not one of ours."""
+    if not value:
+        return None
+    worker, _, seq = value.rpartition(":")
+    try:
+        return worker, int(seq)
+    except ValueError:
+        return "", 0
+
+
+async def _event_stream(request: Request, prefixes: tuple, last_event_id: Optional[Tuple[str, int]]):
+    def wanted(e: dict) -> bool:
+        return not prefixes or e["type"].startswith(prefixes)
+
+    # Subscribe before replaying so nothing published in between is lost, and
+    # only once the body is iterated, so the finally below always unsubscribes
+    subscription = bus.subscribe()
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        last_sent = 0
+        if last_event_id is not None:
+            worker, seq = last_event_id
+            missed = bus.since(seq) if worker == WORKER_ID else None
+            if missed is None:
+                # Reconnected to another worker, or too far behind: reload everything
+                yield _frame(None, "resync", {})
+            else:
+                for seq, e in missed:
+                    if wanted(e):
+                        yield _frame(seq, e["type"], e)
+                    last_sent = seq
+        yield _frame(None, "ready", {"worker": WORKER_ID})
+
+        while not await request.is_disconnected():
+            try:
+                seq, e = await asyncio.wait_for(subscription.queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if subscription.overflowed:
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.overflowed = False
+                yield _frame(None, "resync", {})
+                continue
+            if seq <= last_sent:
+                # Already sent from the replay buffer
+                continue
+            last_sent = seq
+            if wanted(e):
+                yield _frame(seq, e["type"], e)
+    finally:
+        bus.unsubscribe(subscription)
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    token: Optional[str] = Query(None, description="Access token; EventSource cannot send headers"),
+    types: Optional[str] = Query(None, description="Comma-separated event type prefixes, e.g. booking,room"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Server-Sent Events feed of booking, check-in, checkout, food order,
+    service assignment and room status changes, so the dashboard can update
+    in place instead of polling. Each event's data is a compact delta such as
+    {"type": "room.status", "id": 3, "status": "Checked-in"}. On "resync" the
+    client should reload its lists.
+    """
+    authorization = request.headers.get("authorization", "")
+    if not token and authorization.lower().startswith("bearer "):
+        token = authorization[7:].strip()
+    await run_in_threadpool(_authenticate, token)
+
+    prefixes = tuple(t.strip() for t in types.split(",") if t.strip()) if types else ()
+    return StreamingResponse(
+        _event_stream(request, prefixes, _parse_last_event_id(last_event_id)),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            # Disable nginx response buffering for this stream
+            "X-Accel-Buffering": "no",
+        },
+    )
@@ -5,21 +5,15 @@ from app.curd import food_category as crud
 from app.utils.auth import get_db, get_current_user
 from app.models.food_category import FoodCategory
 from app.models.user import User
-import os, shutil, uuid
-import uuid,os, shutil
-UPLOAD_DIR = "static/food_categories"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+from app.utils.uploads import discard_upload, food_category_store
 router = APIRouter(prefix="/food-categories", tags=["Food Categories"])
 
 
 @router.post("", response_model=FoodCategoryOut)
 def create_category(name: str = Form(...), image: UploadFile = File(None), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     filename = None
-    if image:
-        filename = f"category_{uuid.uuid4().hex}_{image.filename}"
-        path = os.path.join("static/food_categories", filename)
-        with open(path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
+    if image and image.filename:
+        filename = food_category_store.save_sync(image).relative
     
     category = FoodCategory(name=name, image=filename)
     db.add(category)
@@ -52,17 +46,10 @@ def update(cat_id: int, name: str = Form(...), image: UploadFile = File(None), d
     
     # Handle image update if provided
     if image and image.filename:
-        # Delete old image if exists
+        filename = food_category_store.save_sync(image).relative
+        # Delete old image if it is not shared
         if category.image:
-            old_path = os.path.join(UPLOAD_DIR, category.image)
-            if os.path.exists(old_path):
-                os.remove(old_path)
-        
-        # Save new image
-        filename = f"category_{uuid.uuid4().hex}_{image.filename}"
-        path = os.path.join(UPLOAD_DIR, filename)
-        with open(path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
+            discard_upload(f"/static/food_categories/{category.image}")
         category.image = filename
     
     db.commit()
@@ -79,9 +66,7 @@ def delete(cat_id: int, db: Session = Depends(get_db), current_user: User = Depe
     
     # Delete image if exists
     if category.image:
-        image_path = os.path.join(UPLOAD_DIR, category.image)
-        if os.path.exists(image_path):
-            os.remove(image_path)
+        discard_upload(f"/static/food_categories/{category.image}")
     
     db.delete(category)
     db.commit()
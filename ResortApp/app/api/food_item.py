@@ -4,12 +4,10 @@ from sqlalchemy.orm import Session
 from app.curd import food_item
 from app.schemas.food_item import FoodItemCreate
 from app.models.user import User
-import os, shutil, uuid
 from app.utils.auth import get_db, get_current_user
+from app.utils.uploads import media_store
 
 router = APIRouter(prefix="/food-items", tags=["FoodItem"])
-UPLOAD_DIR = "uploads/food_items"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
 
@@ -26,14 +24,7 @@ async def create_item(
 ):
     image_paths = []
     for image in images:
-        # Generate unique filename
-        filename = f"food_{uuid.uuid4().hex}_{image.filename}"
-        path = os.path.join(UPLOAD_DIR, filename)
-        with open(path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        # Store with leading slash for proper URL construction
-        web_path = f"/{UPLOAD_DIR}/{filename}".replace("\\", "/")
-        image_paths.append(web_path)
+        image_paths.append((await media_store.save(image)).url)
 
     item_data = FoodItemCreate(
         name=name, description=description, price=price,
@@ -1,27 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, Response
 from sqlalchemy.orm import Session
-import os
-import shutil
-import uuid
 
 import app.schemas.frontend as schemas
 import app.models.frontend as models
 from app.models.user import User
 import app.curd.frontend as crud
 from app.utils.auth import get_db, get_current_user
+from app.utils import site_content
+from app.utils.http_cache import etag_matches
+from app.utils.uploads import media_store
 
 router = APIRouter()
 
-# Determine upload directory - use absolute path to avoid issues with working directory
-# Get the directory where main.py is located (ResortApp/)
-# frontend.py is at: ResortApp/app/api/frontend.py
-# So we need to go up 3 levels: app/api -> app -> ResortApp
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-UPLOAD_DIR = os.path.join(BASE_DIR, "static", "uploads")
-# Ensure directory exists with proper permissions
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-print(f"Upload directory set to: {UPLOAD_DIR}")  # Debug log
-
 # ---------- Header & Banner ----------
 @router.get("/header-banner/", response_model=list[schemas.HeaderBanner])
 def list_header_banner(db: Session = Depends(get_db), skip: int = 0, limit: int = 20):
@@ -47,42 +37,8 @@ async def create_header_banner(
         # Convert is_active string to boolean
         is_active_bool = is_active.lower() in ("true", "1", "yes", "on")
         
-        # Ensure upload directory exists
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
-        
-        # Check if directory is writable
-        if not os.access(UPLOAD_DIR, os.W_OK):
-            raise HTTPException(status_code=500, detail=f"Upload directory is not writable: {UPLOAD_DIR}")
-        
-        # Generate unique filename to avoid conflicts
-        if not image.filename:
-            raise HTTPException(status_code=400, detail="No filename provided for image")
-        
-        file_ext = image.filename.split('.')[-1] if '.' in image.filename else 'jpg'
-        unique_filename = f"banner_{uuid.uuid4().hex}.{file_ext}"
-        file_path = os.path.join(UPLOAD_DIR, unique_filename)
-        
-        # Save file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        
-        # Verify file was saved
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=500, detail="File was not saved successfully")
-
-        # Create URL path (relative to static mount)
-        # static/uploads/banner_xxx.jpg -> /static/uploads/banner_xxx.jpg
-        normalized_path = file_path.replace('\\', '/')
-        # Extract relative path from BASE_DIR
-        if normalized_path.startswith(BASE_DIR.replace('\\', '/')):
-            image_url = normalized_path.replace(BASE_DIR.replace('\\', '/'), '').lstrip('/')
-        else:
-            image_url = normalized_path.lstrip('/')
-        
-        if not image_url.startswith('static/'):
-            image_url = f"static/uploads/{unique_filename}"
-        
-        image_url = f"/{image_url}" if not image_url.startswith('/') else image_url
+        # Streamed in chunks to content-addressed storage (app/utils/uploads.py)
+        image_url = (await media_store.save(image)).url
         
         obj = schemas.HeaderBannerCreate(
             title=title,
@@ -117,39 +73,8 @@ async def update_header_banner(
         
         image_url = None
         if image:
-            # Ensure upload directory exists
-            os.makedirs(UPLOAD_DIR, exist_ok=True)
-            
-            # Check if directory is writable
-            if not os.access(UPLOAD_DIR, os.W_OK):
-                raise HTTPException(status_code=500, detail=f"Upload directory is not writable: {UPLOAD_DIR}")
-            
-            # Generate unique filename to avoid conflicts
-            if not image.filename:
-                raise HTTPException(status_code=400, detail="No filename provided for image")
-            
-            file_ext = image.filename.split('.')[-1] if '.' in image.filename else 'jpg'
-            unique_filename = f"banner_{uuid.uuid4().hex}.{file_ext}"
-            file_path = os.path.join(UPLOAD_DIR, unique_filename)
-            
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(image.file, buffer)
-            
-            # Verify file was saved
-            if not os.path.exists(file_path):
-                raise HTTPException(status_code=500, detail="File was not saved successfully")
-            
-            # Create URL path (relative to static mount)
-            normalized_path = file_path.replace('\\', '/')
-            if normalized_path.startswith(BASE_DIR.replace('\\', '/')):
-                image_url = normalized_path.replace(BASE_DIR.replace('\\', '/'), '').lstrip('/')
-            else:
-                image_url = normalized_path.lstrip('/')
-            
-            if not image_url.startswith('static/'):
-                image_url = f"static/uploads/{unique_filename}"
-            
-            image_url = f"/{image_url}" if not image_url.startswith('/') else image_url
+            # Streamed in chunks to content-addressed storage (app/utils/uploads.py)
+            image_url = (await media_store.save(image)).url
 
         obj = schemas.HeaderBannerUpdate(
             title=title,
@@ -158,6 +83,8 @@ async def update_header_banner(
             image_url=image_url
         )
         return crud.update(db, models.HeaderBanner, item_id, obj)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update header banner: {str(e)}")
 
@@ -221,34 +148,8 @@ async def create_gallery(
     current_user: User = Depends(get_current_user)
 ):
     try:
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
-        if not os.access(UPLOAD_DIR, os.W_OK):
-            raise HTTPException(status_code=500, detail=f"Upload directory is not writable: {UPLOAD_DIR}")
-        if not image.filename:
-            raise HTTPException(status_code=400, detail="No filename provided for image")
-        
-        # Generate unique filename to avoid conflicts
-        file_ext = image.filename.split('.')[-1] if '.' in image.filename else 'jpg'
-        unique_filename = f"gallery_{uuid.uuid4().hex}.{file_ext}"
-        file_path = os.path.join(UPLOAD_DIR, unique_filename)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=500, detail="File was not saved successfully")
-
-        # Create URL path (relative to static mount)
-        normalized_path = file_path.replace('\\', '/')
-        if normalized_path.startswith(BASE_DIR.replace('\\', '/')):
-            image_url = normalized_path.replace(BASE_DIR.replace('\\', '/'), '').lstrip('/')
-        else:
-            image_url = normalized_path.lstrip('/')
-        
-        if not image_url.startswith('static/'):
-            image_url = f"static/uploads/{unique_filename}"
-        
-        image_url = f"/{image_url}" if not image_url.startswith('/') else image_url
+        # Streamed in chunks to content-addressed storage (app/utils/uploads.py)
+        image_url = (await media_store.save(image)).url
         
         obj = schemas.GalleryCreate(
             caption=caption,
@@ -277,34 +178,8 @@ async def update_gallery(
     try:
         image_url = None
         if image:
-            os.makedirs(UPLOAD_DIR, exist_ok=True)
-            if not os.access(UPLOAD_DIR, os.W_OK):
-                raise HTTPException(status_code=500, detail=f"Upload directory is not writable: {UPLOAD_DIR}")
-            if not image.filename:
-                raise HTTPException(status_code=400, detail="No filename provided for image")
-            
-            # Generate unique filename to avoid conflicts
-            file_ext = image.filename.split('.')[-1] if '.' in image.filename else 'jpg'
-            unique_filename = f"gallery_{uuid.uuid4().hex}.{file_ext}"
-            file_path = os.path.join(UPLOAD_DIR, unique_filename)
-            
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(image.file, buffer)
-            
-            if not os.path.exists(file_path):
-                raise HTTPException(status_code=500, detail="File was not saved successfully")
-
-            # Create URL path (relative to static mount)
-            normalized_path = file_path.replace('\\', '/')
-            if normalized_path.startswith(BASE_DIR.replace('\\', '/')):
-                image_url = normalized_path.replace(BASE_DIR.replace('\\', '/'), '').lstrip('/')
-            else:
-                image_url = normalized_path.lstrip('/')
-            
-            if not image_url.startswith('static/'):
-                image_url = f"static/uploads/{unique_filename}"
-            
-            image_url = f"/{image_url}" if not image_url.startswith('/') else image_url
+            # Streamed in chunks to content-addressed storage (app/utils/uploads.py)
+            image_url = (await media_store.save(image)).url
 
         # If no new image provided, keep existing image_url
         if image_url is None:
@@ -438,34 +313,8 @@ async def create_signature_experience(
     current_user: User = Depends(get_current_user)
 ):
     try:
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
-        if not os.access(UPLOAD_DIR, os.W_OK):
-            raise HTTPException(status_code=500, detail=f"Upload directory is not writable: {UPLOAD_DIR}")
-        if not image.filename:
-            raise HTTPException(status_code=400, detail="No filename provided for image")
-        
-        # Generate unique filename to avoid conflicts
-        file_ext = image.filename.split('.')[-1] if '.' in image.filename else 'jpg'
-        unique_filename = f"sigexp_{uuid.uuid4().hex}.{file_ext}"
-        file_path = os.path.join(UPLOAD_DIR, unique_filename)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=500, detail="File was not saved successfully")
-
-        # Create URL path (relative to static mount)
-        normalized_path = file_path.replace('\\', '/')
-        if normalized_path.startswith(BASE_DIR.replace('\\', '/')):
-            image_url = normalized_path.replace(BASE_DIR.replace('\\', '/'), '').lstrip('/')
-        else:
-            image_url = normalized_path.lstrip('/')
-        
-        if not image_url.startswith('static/'):
-            image_url = f"static/uploads/{unique_filename}"
-        
-        image_url = f"/{image_url}" if not image_url.startswith('/') else image_url
+        # Streamed in chunks to content-addressed storage (app/utils/uploads.py)
+        image_url = (await media_store.save(image)).url
         
         obj = schemas.SignatureExperienceCreate(
             title=title,
@@ -501,34 +350,8 @@ async def update_signature_experience(
         }
         
         if image:
-            os.makedirs(UPLOAD_DIR, exist_ok=True)
-            if not os.access(UPLOAD_DIR, os.W_OK):
-                raise HTTPException(status_code=500, detail=f"Upload directory is not writable: {UPLOAD_DIR}")
-            if not image.filename:
-                raise HTTPException(status_code=400, detail="No filename provided for image")
-            
-            # Generate unique filename to avoid conflicts
-            file_ext = image.filename.split('.')[-1] if '.' in image.filename else 'jpg'
-            unique_filename = f"sigexp_{uuid.uuid4().hex}.{file_ext}"
-            file_path = os.path.join(UPLOAD_DIR, unique_filename)
-            
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(image.file, buffer)
-            
-            if not os.path.exists(file_path):
-                raise HTTPException(status_code=500, detail="File was not saved successfully")
-
-            # Create URL path (relative to static mount)
-            normalized_path = file_path.replace('\\', '/')
-            if normalized_path.startswith(BASE_DIR.replace('\\', '/')):
-                image_url = normalized_path.replace(BASE_DIR.replace('\\', '/'), '').lstrip('/')
-            else:
-                image_url = normalized_path.lstrip('/')
-            
-            if not image_url.startswith('static/'):
-                image_url = f"static/uploads/{unique_filename}"
-            
-            image_url = f"/{image_url}" if not image_url.startswith('/') else image_url
+            # Streamed in chunks to content-addressed storage (app/utils/uploads.py)
+            image_url = (await media_store.save(image)).url
             update_data["image_url"] = image_url
         else:
             # If no new image provided, keep existing image_url
@@ -579,34 +402,8 @@ async def create_plan_wedding(
     current_user: User = Depends(get_current_user)
 ):
     try:
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
-        if not os.access(UPLOAD_DIR, os.W_OK):
-            raise HTTPException(status_code=500, detail=f"Upload directory is not writable: {UPLOAD_DIR}")
-        if not image.filename:
-            raise HTTPException(status_code=400, detail="No filename provided for image")
-        
-        # Generate unique filename to avoid conflicts
-        file_ext = image.filename.split('.')[-1] if '.' in image.filename else 'jpg'
-        unique_filename = f"wedding_{uuid.uuid4().hex}.{file_ext}"
-        file_path = os.path.join(UPLOAD_DIR, unique_filename)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=500, detail="File was not saved successfully")
-
-        # Create URL path (relative to static mount)
-        normalized_path = file_path.replace('\\', '/')
-        if normalized_path.startswith(BASE_DIR.replace('\\', '/')):
-            image_url = normalized_path.replace(BASE_DIR.replace('\\', '/'), '').lstrip('/')
-        else:
-            image_url = normalized_path.lstrip('/')
-        
-        if not image_url.startswith('static/'):
-            image_url = f"static/uploads/{unique_filename}"
-        
-        image_url = f"/{image_url}" if not image_url.startswith('/') else image_url
+        # Streamed in chunks to content-addressed storage (app/utils/uploads.py)
+        image_url = (await media_store.save(image)).url
         
         obj = schemas.PlanWeddingCreate(
             title=title,
@@ -642,34 +439,8 @@ async def update_plan_wedding(
         }
         
         if image:
-            os.makedirs(UPLOAD_DIR, exist_ok=True)
-            if not os.access(UPLOAD_DIR, os.W_OK):
-                raise HTTPException(status_code=500, detail=f"Upload directory is not writable: {UPLOAD_DIR}")
-            if not image.filename:
-                raise HTTPException(status_code=400, detail="No filename provided for image")
-            
-            # Generate unique filename to avoid conflicts
-            file_ext = image.filename.split('.')[-1] if '.' in image.filename else 'jpg'
-            unique_filename = f"wedding_{uuid.uuid4().hex}.{file_ext}"
-            file_path = os.path.join(UPLOAD_DIR, unique_filename)
-            
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(image.file, buffer)
-            
-            if not os.path.exists(file_path):
-                raise HTTPException(status_code=500, detail="File was not saved successfully")
-
-            # Create URL path (relative to static mount)
-            normalized_path = file_path.replace('\\', '/')
-            if normalized_path.startswith(BASE_DIR.replace('\\', '/')):
-                image_url = normalized_path.replace(BASE_DIR.replace('\\', '/'), '').lstrip('/')
-            else:
-                image_url = normalized_path.lstrip('/')
-            
-            if not image_url.startswith('static/'):
-                image_url = f"static/uploads/{unique_filename}"
-            
-            image_url = f"/{image_url}" if not image_url.startswith('/') else image_url
+            # Streamed in chunks to content-addressed storage (app/utils/uploads.py)
+            image_url = (await media_store.save(image)).url
             update_data["image_url"] = image_url
         else:
             # If no new image provided, keep existing image_url
@@ -750,34 +521,8 @@ async def create_nearby_attraction(
     current_user: User = Depends(get_current_user)
 ):
     try:
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
-        if not os.access(UPLOAD_DIR, os.W_OK):
-            raise HTTPException(status_code=500, detail=f"Upload directory is not writable: {UPLOAD_DIR}")
-        if not image.filename:
-            raise HTTPException(status_code=400, detail="No filename provided for image")
-        
-        # Generate unique filename to avoid conflicts
-        file_ext = image.filename.split('.')[-1] if '.' in image.filename else 'jpg'
-        unique_filename = f"attraction_{uuid.uuid4().hex}.{file_ext}"
-        file_path = os.path.join(UPLOAD_DIR, unique_filename)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=500, detail="File was not saved successfully")
-
-        # Create URL path (relative to static mount)
-        normalized_path = file_path.replace('\\', '/')
-        if normalized_path.startswith(BASE_DIR.replace('\\', '/')):
-            image_url = normalized_path.replace(BASE_DIR.replace('\\', '/'), '').lstrip('/')
-        else:
-            image_url = normalized_path.lstrip('/')
-        
-        if not image_url.startswith('static/'):
-            image_url = f"static/uploads/{unique_filename}"
-        
-        image_url = f"/{image_url}" if not image_url.startswith('/') else image_url
+        # Streamed in chunks to content-addressed storage (app/utils/uploads.py)
+        image_url = (await media_store.save(image)).url
         
         obj = schemas.NearbyAttractionCreate(
             title=title,
@@ -818,34 +563,8 @@ async def update_nearby_attraction(
             update_data["map_link"] = cleaned or None
         
         if image:
-            os.makedirs(UPLOAD_DIR, exist_ok=True)
-            if not os.access(UPLOAD_DIR, os.W_OK):
-                raise HTTPException(status_code=500, detail=f"Upload directory is not writable: {UPLOAD_DIR}")
-            if not image.filename:
-                raise HTTPException(status_code=400, detail="No filename provided for image")
-            
-            # Generate unique filename to avoid conflicts
-            file_ext = image.filename.split('.')[-1] if '.' in image.filename else 'jpg'
-            unique_filename = f"attraction_{uuid.uuid4().hex}.{file_ext}"
-            file_path = os.path.join(UPLOAD_DIR, unique_filename)
-            
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(image.file, buffer)
-            
-            if not os.path.exists(file_path):
-                raise HTTPException(status_code=500, detail="File was not saved successfully")
-
-            # Create URL path (relative to static mount)
-            normalized_path = file_path.replace('\\', '/')
-            if normalized_path.startswith(BASE_DIR.replace('\\', '/')):
-                image_url = normalized_path.replace(BASE_DIR.replace('\\', '/'), '').lstrip('/')
-            else:
-                image_url = normalized_path.lstrip('/')
-            
-            if not image_url.startswith('static/'):
-                image_url = f"static/uploads/{unique_filename}"
-            
-            image_url = f"/{image_url}" if not image_url.startswith('/') else image_url
+            # Streamed in chunks to content-addressed storage (app/utils/uploads.py)
+            image_url = (await media_store.save(image)).url
             update_data["image_url"] = image_url
         else:
             # If no new image provided, keep existing image_url
@@ -907,32 +626,8 @@ async def create_nearby_attraction_banner(
     current_user: User = Depends(get_current_user)
 ):
     try:
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
-        if not os.access(UPLOAD_DIR, os.W_OK):
-            raise HTTPException(status_code=500, detail=f"Upload directory is not writable: {UPLOAD_DIR}")
-        if not image.filename:
-            raise HTTPException(status_code=400, detail="No filename provided for image")
-
-        file_ext = image.filename.split('.')[-1] if '.' in image.filename else 'jpg'
-        unique_filename = f"nearby_banner_{uuid.uuid4().hex}.{file_ext}"
-        file_path = os.path.join(UPLOAD_DIR, unique_filename)
-
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=500, detail="File was not saved successfully")
-
-        normalized_path = file_path.replace('\\', '/')
-        if normalized_path.startswith(BASE_DIR.replace('\\', '/')):
-            image_url = normalized_path.replace(BASE_DIR.replace('\\', '/'), '').lstrip('/')
-        else:
-            image_url = normalized_path.lstrip('/')
-
-        if not image_url.startswith('static/'):
-            image_url = f"static/uploads/{unique_filename}"
-
-        image_url = f"/{image_url}" if not image_url.startswith('/') else image_url
+        # Streamed in chunks to content-addressed storage (app/utils/uploads.py)
+        image_url = (await media_store.save(image)).url
 
         obj = schemas.NearbyAttractionBannerCreate(
             title=title,
@@ -971,32 +666,8 @@ async def update_nearby_attraction_banner(
         }
 
         if image:
-            os.makedirs(UPLOAD_DIR, exist_ok=True)
-            if not os.access(UPLOAD_DIR, os.W_OK):
-                raise HTTPException(status_code=500, detail=f"Upload directory is not writable: {UPLOAD_DIR}")
-            if not image.filename:
-                raise HTTPException(status_code=400, detail="No filename provided for image")
-
-            file_ext = image.filename.split('.')[-1] if '.' in image.filename else 'jpg'
-            unique_filename = f"nearby_banner_{uuid.uuid4().hex}.{file_ext}"
-            file_path = os.path.join(UPLOAD_DIR, unique_filename)
-
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(image.file, buffer)
-
-            if not os.path.exists(file_path):
-                raise HTTPException(status_code=500, detail="File was not saved successfully")
-
-            normalized_path = file_path.replace('\\', '/')
-            if normalized_path.startswith(BASE_DIR.replace('\\', '/')):
-                image_url = normalized_path.replace(BASE_DIR.replace('\\', '/'), '').lstrip('/')
-            else:
-                image_url = normalized_path.lstrip('/')
-
-            if not image_url.startswith('static/'):
-                image_url = f"static/uploads/{unique_filename}"
-
-            image_url = f"/{image_url}" if not image_url.startswith('/') else image_url
+            # Streamed in chunks to content-addressed storage (app/utils/uploads.py)
+            image_url = (await media_store.save(image)).url
             update_data["image_url"] = image_url
         else:
             existing = crud.get_by_id(db, models.NearbyAttractionBanner, item_id)
@@ -1016,4 +687,25 @@ async def update_nearby_attraction_banner(
 
 @router.delete("/nearby-attraction-banners/{item_id}")
 def delete_nearby_attraction_banner(item_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return crud.delete(db, models.NearbyAttractionBanner, item_id)
\ No newline at end of file
+    return crud.delete(db, models.NearbyAttractionBanner, item_id)
+
+# ---------- Site Content (all sections) ----------
+@router.get("/site-content")
+def get_site_content(request: Request, db: Session = Depends(get_db)):
+    """
+    Every active landing page section in one precompressed payload, keyed by
+    section (header_banner, gallery, reviews, resort_info, ...).
+    """
+    content = site_content.get_site_content(db)
+    body, encoding = content.encoded(request.headers.get("accept-encoding", ""))
+    etag = content.etag_for(encoding)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,25 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header
 from sqlalchemy.orm import Session, joinedload
-from typing import List, Union
-import os
+from typing import List, Optional, Union
 from app.models.user import User
 from app.models.room import Room
 from app.models.Package import Package, PackageBooking, PackageBookingRoom
 from app.utils.auth import get_db, get_current_user
 from app.utils.booking_id import parse_display_id
+from app.utils.availability import find_conflicts
+from app.utils.idempotency import run_idempotent
+from app.utils.occupancy_grid import invalidate_occupancy_grid
+from app.utils.events import record_room_statuses
+from app.utils.room_status import refresh_room_statuses
+from app.utils.reservations import commit_reservations, extend_reservations, release_reservations
+from app.utils.uploads import checkin_store, media_store
 from app.schemas.packages import PackageBookingCreate, PackageOut, PackageBookingOut
 from fastapi.responses import FileResponse
 from app.curd import packages as crud_package
-import shutil
-import uuid
 
 router = APIRouter(prefix="/packages", tags=["Packages"])
 
-UPLOAD_DIR = "uploads/packages"
-CHECKIN_UPLOAD_DIR = "uploads/checkin_proofs"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(CHECKIN_UPLOAD_DIR, exist_ok=True)
-
 
 # ------------------- Packages -------------------
 
@@ -50,26 +49,10 @@ async def create_package_api(
         image_urls = []
         try:
             for img in images:
-                # Generate unique filename - handle case where filename might be None
-                original_filename = img.filename if img.filename else "image.jpg"
-                filename = f"pkg_{uuid.uuid4().hex}_{original_filename}"
-                file_path = os.path.join(UPLOAD_DIR, filename)
-                
-                # Use async file operations for better performance with large files
-                try:
-                    # Read file content asynchronously
-                    contents = await img.read()
-                    # Write to disk
-                    with open(file_path, "wb") as buffer:
-                        buffer.write(contents)
-                except (AttributeError, TypeError):
-                    # Fallback to synchronous if async methods not available
-                    with open(file_path, "wb") as buffer:
-                        shutil.copyfileobj(img.file, buffer)
-                
-                # Store with leading slash for proper URL construction
-                normalized_path = file_path.replace('\\', '/')
-                image_urls.append(f"/{normalized_path}")
+                # Streamed to disk in chunks; the event loop is never blocked
+                image_urls.append((await media_store.save(img)).url)
+        except HTTPException:
+            raise
         except Exception as img_error:
             import traceback
             error_detail = f"Failed to save package images: {str(img_error)}\n{traceback.format_exc()}"
@@ -86,15 +69,7 @@ async def create_package_api(
             print(f"ERROR: {error_detail}")
             import sys
             sys.stderr.write(f"ERROR in create_package_api (database): {error_detail}\n")
-            # Clean up uploaded images if package creation fails
-            for img_url in image_urls:
-                try:
-                    # Remove leading slash to get actual file path
-                    file_path = img_url.lstrip('/')
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-                except Exception as cleanup_error:
-                    print(f"Warning: Failed to cleanup image {img_url}: {str(cleanup_error)}")
+            # Stored images are left in place: they are content-addressed and may be shared
             raise HTTPException(status_code=500, detail=f"Failed to create package: {str(db_error)}")
     except HTTPException:
         # Re-raise HTTP exceptions (like validation errors) as-is
@@ -148,14 +123,7 @@ async def update_package_api(
     if images:
         image_urls = []
         for img in images:
-            # Generate unique filename
-            filename = f"pkg_{uuid.uuid4().hex}_{img.filename}"
-            file_path = os.path.join(UPLOAD_DIR, filename)
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(img.file, buffer)
-            # Store with leading slash for proper URL construction
-            normalized_path = file_path.replace('\\', '/')
-            image_urls.append(f"/{normalized_path}")
+            image_urls.append((await media_store.save(img)).url)
         
         # Add new images to existing ones
         for url in image_urls:
@@ -176,147 +144,108 @@ def delete_package_api(package_id: int, db: Session = Depends(get_db), current_u
 
 # ------------------- Package Bookings -------------------
 
+def queue_package_confirmation_email(db: Session, pkg_booking: PackageBooking, to_email: Optional[str], guest_mobile: Optional[str]):
+    """
+    Calculate package charges and queue the confirmation email in the booking
+    transaction; the outbox sender delivers it after commit.
+    """
+    if not to_email:
+        return
+    try:
+        from app.utils.email import create_booking_confirmation_email
+        from app.utils.email_outbox import queue_email
+        
+        package = pkg_booking.package
+        
+        # Calculate stay duration
+        stay_nights = max(1, (pkg_booking.check_out - pkg_booking.check_in).days)
+        
+        # Calculate package charges (package price per night per room)
+        package_price = package.price if package else 0
+        package_charges = package_price * stay_nights * len(pkg_booking.rooms) if pkg_booking.rooms else package_price * stay_nights
+        
+        # Get room details with prices
+        rooms_data = []
+        for pbr in pkg_booking.rooms:
+            if pbr.room:
+                rooms_data.append({
+                    'number': pbr.room.number,
+                    'type': pbr.room.type or 'Standard',
+                    'price': pbr.room.price or 0
+                })
+        
+        # Format booking ID (PK-000001)
+        formatted_booking_id = f"PK-{str(pkg_booking.id).zfill(6)}"
+        
+        email_html = create_booking_confirmation_email(
+            guest_name=pkg_booking.guest_name,
+            booking_id=pkg_booking.id,
+            booking_type='package',
+            check_in=str(pkg_booking.check_in),
+            check_out=str(pkg_booking.check_out),
+            rooms=rooms_data,
+            total_amount=package_charges,
+            package_name=package.title if package else None,
+            guests={'adults': pkg_booking.adults, 'children': pkg_booking.children},
+            guest_mobile=guest_mobile,
+            package_charges=package_charges,
+            stay_nights=stay_nights
+        )
+        
+        queue_email(
+            db,
+            to_email=to_email,
+            subject=f"Package Booking Confirmation {formatted_booking_id} - Elysian Retreat",
+            html_content=email_html,
+            to_name=pkg_booking.guest_name
+        )
+    except Exception as e:
+        # Log error but don't fail the booking
+        print(f"Failed to queue confirmation email: {str(e)}")
+
 @router.post("/book", response_model=PackageBookingOut)
 def book_package_api(
     booking: PackageBookingCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    result = crud_package.book_package(db, booking)
-    
-    # Calculate booking charges and send confirmation email if email address is provided
-    if booking.guest_email and result:
-        try:
-            from app.utils.email import send_email, create_booking_confirmation_email
-            from datetime import datetime, date
-            
-            # Get package details
-            package = db.query(Package).filter(Package.id == booking.package_id).first()
-            
-            # Calculate stay duration
-            check_in_date = result.check_in if isinstance(result.check_in, date) else datetime.strptime(str(result.check_in), '%Y-%m-%d').date()
-            check_out_date = result.check_out if isinstance(result.check_out, date) else datetime.strptime(str(result.check_out), '%Y-%m-%d').date()
-            stay_nights = max(1, (check_out_date - check_in_date).days)
-            
-            # Calculate package charges (package price per night per room)
-            package_price = package.price if package else 0
-            package_charges = package_price * stay_nights * len(booking.room_ids) if booking.room_ids else package_price * stay_nights
-            
-            # Get room details with prices
-            rooms_data = []
-            for pbr in result.rooms:
-                if pbr.room:
-                    rooms_data.append({
-                        'number': pbr.room.number,
-                        'type': pbr.room.type or 'Standard',
-                        'price': pbr.room.price or 0
-                    })
-            
-            # Format booking ID (PK-000001)
-            formatted_booking_id = f"PK-{str(result.id).zfill(6)}"
-            
-            email_html = create_booking_confirmation_email(
-                guest_name=result.guest_name,
-                booking_id=result.id,
-                booking_type='package',
-                check_in=str(result.check_in),
-                check_out=str(result.check_out),
-                rooms=rooms_data,
-                total_amount=package_charges,
-                package_name=package.title if package else None,
-                guests={'adults': booking.adults, 'children': booking.children},
-                guest_mobile=booking.guest_mobile,
-                package_charges=package_charges,
-                stay_nights=stay_nights
-            )
-            
-            send_email(
-                to_email=booking.guest_email,
-                subject=f"Package Booking Confirmation {formatted_booking_id} - Elysian Retreat",
-                html_content=email_html,
-                to_name=result.guest_name
-            )
-        except Exception as e:
-            # Log error but don't fail the booking
-            print(f"Failed to send confirmation email: {str(e)}")
-    
+    result = crud_package.book_package(
+        db, booking,
+        on_flush=lambda new_booking: queue_package_confirmation_email(db, new_booking, booking.guest_email, booking.guest_mobile)
+    )
     return result
 
 @router.post("/book/guest", response_model=PackageBookingOut, summary="Book a package as a guest")
 def book_package_guest_api(
     booking: PackageBookingCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
 ):
     """
     Public endpoint for guests to book a package without authentication.
+    Send an Idempotency-Key header to make retries safe: a repeat of the same
+    request returns the original response instead of booking again.
     """
+    return run_idempotent(
+        db, "packages.book.guest", idempotency_key, booking, PackageBookingOut,
+        lambda: _book_package_guest(booking, db),
+    )
+
+
+def _book_package_guest(booking: PackageBookingCreate, db: Session):
     try:
-        result = crud_package.book_package(db, booking)
+        # Normalize email for sending
+        guest_email = None
+        try:
+            if booking.guest_email:
+                guest_email = booking.guest_email.strip() if isinstance(booking.guest_email, str) and booking.guest_email.strip() else None
+        except (AttributeError, TypeError):
+            pass
         
-        # Calculate booking charges and send confirmation email if email address is provided
-        if result:
-            # Normalize email for sending
-            guest_email = None
-            try:
-                if booking.guest_email:
-                    guest_email = booking.guest_email.strip() if isinstance(booking.guest_email, str) and booking.guest_email.strip() else None
-            except (AttributeError, TypeError):
-                pass
-            
-            if guest_email:
-                try:
-                    from app.utils.email import send_email, create_booking_confirmation_email
-                    from datetime import datetime, date
-                    
-                    # Get package details
-                    package = db.query(Package).filter(Package.id == booking.package_id).first()
-                    
-                    # Calculate stay duration
-                    check_in_date = result.check_in if isinstance(result.check_in, date) else datetime.strptime(str(result.check_in), '%Y-%m-%d').date()
-                    check_out_date = result.check_out if isinstance(result.check_out, date) else datetime.strptime(str(result.check_out), '%Y-%m-%d').date()
-                    stay_nights = max(1, (check_out_date - check_in_date).days)
-                    
-                    # Calculate package charges (package price per night per room)
-                    package_price = package.price if package else 0
-                    package_charges = package_price * stay_nights * len(booking.room_ids) if booking.room_ids else package_price * stay_nights
-                    
-                    # Get room details with prices
-                    rooms_data = []
-                    for pbr in result.rooms:
-                        if pbr.room:
-                            rooms_data.append({
-                                'number': pbr.room.number,
-                                'type': pbr.room.type or 'Standard',
-                                'price': pbr.room.price or 0
-                            })
-                    
-                    # Format booking ID (PK-000001)
-                    formatted_booking_id = f"PK-{str(result.id).zfill(6)}"
-                    
-                    email_html = create_booking_confirmation_email(
-                        guest_name=result.guest_name,
-                        booking_id=result.id,
-                        booking_type='package',
-                        check_in=str(result.check_in),
-                        check_out=str(result.check_out),
-                        rooms=rooms_data,
-                        total_amount=package_charges,
-                        package_name=package.title if package else None,
-                        guests={'adults': booking.adults, 'children': booking.children},
-                        guest_mobile=booking.guest_mobile,
-                        package_charges=package_charges,
-                        stay_nights=stay_nights
-                    )
-                    
-                    send_email(
-                        to_email=guest_email,
-                        subject=f"Package Booking Confirmation {formatted_booking_id} - Elysian Retreat",
-                        html_content=email_html,
-                        to_name=result.guest_name
-                    )
-                except Exception as e:
-                    # Log error but don't fail the booking
-                    print(f"Failed to send confirmation email: {str(e)}")
+        result = crud_package.book_package(
+            db, booking,
+            on_flush=lambda new_booking: queue_package_confirmation_email(db, new_booking, guest_email, booking.guest_mobile)
+        )
         
         return result
         
@@ -361,8 +290,7 @@ def get_bookings(db: Session = Depends(get_db), skip: int = 0, limit: int = 20):
 def _list_packages_impl(db: Session, skip: int = 0, limit: int = 20):
     """Helper function for list_packages"""
     try:
-        # Query directly in the endpoint to apply pagination
-        result = db.query(Package).offset(skip).limit(limit).all()
+        result = crud_package.get_packages(db, skip=skip, limit=limit)
         return result if result is not None else []
     except Exception as e:
         import traceback
@@ -422,9 +350,13 @@ def cancel_package_booking(booking_id: Union[str, int], db: Session = Depends(ge
     if booking.rooms:
         room_ids = [br.room_id for br in booking.rooms]
         db.query(Room).filter(Room.id.in_(room_ids)).update({"status": "Available"}, synchronize_session=False)
+        record_room_statuses(db, dict.fromkeys(room_ids, "Available"))
 
     booking.status = "cancelled"
+    release_reservations(db, package_booking_id=booking.id)
     db.commit()
+    invalidate_occupancy_grid(booking.check_in, booking.check_out)
+    refresh_room_statuses(db, [br.room_id for br in booking.rooms])
     db.refresh(booking)
     return booking
 
@@ -437,7 +369,6 @@ def extend_package_booking_checkout(booking_id: Union[str, int], new_checkout: s
     Accepts both display ID (PK-000001) and numeric ID.
     """
     from datetime import datetime
-    from sqlalchemy import and_, or_
     
     # Parse display ID (PK-000001) or accept numeric ID
     numeric_id, booking_type = parse_display_id(str(booking_id))
@@ -558,43 +489,28 @@ def extend_package_booking_checkout(booking_id: Union[str, int], new_checkout: s
     room_ids = [br.room_id for br in booking.rooms if br.room_id]
     
     if room_ids:
-        # Check for conflicts with regular bookings
-        from app.models.booking import Booking, BookingRoom
-        conflicting_bookings = db.query(Booking).join(BookingRoom).filter(
-            BookingRoom.room_id.in_(room_ids),
-            Booking.status.in_(['booked', 'checked-in', 'checked_in']),
-            and_(
-                Booking.check_in < new_checkout_date,
-                Booking.check_out > booking.check_out
-            )
-        ).first()
-        
-        if conflicting_bookings:
+        # A conflict exists if another booking overlaps with the extended period
+        conflicts = find_conflicts(
+            db, room_ids, booking.check_out, new_checkout_date, exclude_package_booking_id=booking_id
+        )
+        stays = [stay for room_stays in conflicts.values() for stay in room_stays]
+        conflicting_booking = next((stay for stay in stays if not stay.is_package), None)
+        if conflicting_booking:
             raise HTTPException(
                 status_code=400,
-                detail=f"Cannot extend checkout date. Room(s) are already booked by another booking (ID: {conflicting_bookings.id}) during the extended period."
-            )
-        
-        # Check for conflicts with other package bookings
-        conflicting_package_bookings = db.query(PackageBooking).join(PackageBookingRoom).filter(
-            PackageBooking.id != booking_id,
-            PackageBookingRoom.room_id.in_(room_ids),
-            PackageBooking.status.in_(['booked', 'checked-in', 'checked_in']),
-            and_(
-                PackageBooking.check_in < new_checkout_date,
-                PackageBooking.check_out > booking.check_out
+                detail=f"Cannot extend checkout date. Room(s) are already booked by another booking (ID: {conflicting_booking.booking_id}) during the extended period."
             )
-        ).first()
-        
-        if conflicting_package_bookings:
+        if stays:
             raise HTTPException(
                 status_code=400,
-                detail=f"Cannot extend checkout date. Room(s) are already booked by another package booking (ID: {conflicting_package_bookings.id}) during the extended period."
+                detail=f"Cannot extend checkout date. Room(s) are already booked by another package booking (ID: {stays[0].booking_id}) during the extended period."
             )
     
     # Update the checkout date
     booking.check_out = new_checkout_date
-    db.commit()
+    extend_reservations(db, new_checkout_date, package_booking_id=booking.id)
+    commit_reservations(db, [br.room for br in booking.rooms if br.room])
+    invalidate_occupancy_grid(booking.check_in, new_checkout_date)
     db.refresh(booking)
     
     # Reload booking with relationships for response
@@ -644,19 +560,9 @@ def check_in_package_booking(
             detail=f"Package booking {booking_id} cannot be checked in. Expected status 'booked', found '{booking.status}'."
         )
 
-    # Save ID card image
-    id_card_filename = f"id_pkg_{booking_id}_{uuid.uuid4().hex}.jpg"
-    id_card_path = os.path.join(CHECKIN_UPLOAD_DIR, id_card_filename)
-    with open(id_card_path, "wb") as buffer:
-        shutil.copyfileobj(id_card_image.file, buffer)
-    booking.id_card_image_url = id_card_filename
-
-    # Save guest photo
-    guest_photo_filename = f"guest_pkg_{booking_id}_{uuid.uuid4().hex}.jpg"
-    guest_photo_path = os.path.join(CHECKIN_UPLOAD_DIR, guest_photo_filename)
-    with open(guest_photo_path, "wb") as buffer:
-        shutil.copyfileobj(guest_photo.file, buffer)
-    booking.guest_photo_url = guest_photo_filename
+    # Save ID card image and guest photo; the booking keeps the stored names
+    booking.id_card_image_url = checkin_store.save_sync(id_card_image).name
+    booking.guest_photo_url = checkin_store.save_sync(guest_photo).name
 
     booking.status = "checked-in"
     booking.user_id = current_user.id
@@ -664,8 +570,11 @@ def check_in_package_booking(
     if booking.rooms:
         room_ids = [br.room_id for br in booking.rooms]
         db.query(Room).filter(Room.id.in_(room_ids)).update({"status": "Checked-in"}, synchronize_session=False)
+        record_room_statuses(db, dict.fromkeys(room_ids, "Checked-in"))
 
     db.commit()
+    invalidate_occupancy_grid(booking.check_in, booking.check_out)
+    refresh_room_statuses(db, [br.room_id for br in booking.rooms])
     db.refresh(booking)
     return booking
 
@@ -674,7 +583,7 @@ def check_in_package_booking(
 # -------------------------------
 @router.get("/booking/checkin-image/{filename}")
 def get_package_checkin_image(filename: str):
-    filepath = os.path.join(CHECKIN_UPLOAD_DIR, filename)
-    if not os.path.exists(filepath) or not os.path.isfile(filepath):
+    filepath = checkin_store.locate(filename)
+    if filepath is None:
         raise HTTPException(status_code=404, detail="Image not found")
     return FileResponse(filepath)
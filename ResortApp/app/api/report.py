@@ -5,6 +5,7 @@ from sqlalchemy import func
 from typing import List, Optional, Dict, Any
 from datetime import date, timedelta, datetime
 from app.utils.auth import get_db
+from app.utils import tax
 from app import models as models
 from app.schemas import booking as booking_schema, packages as package_schema, suggestion as suggestion_schema
 from app.schemas.foodorder import FoodOrderItemOut
@@ -305,6 +306,65 @@ def get_room_charges(
     ]
 
 
+@router.get("/gst-summary")
+def get_gst_summary(
+    from_date: Optional[date] = Query(None),
+    to_date: Optional[date] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    GST due on the checkouts in the date range, by charge category and rate.
+    Every checkout's charges are taxed under the rules in effect on its
+    checkout date, in one pass of the tax engine and in Decimal.
+    """
+    query = db.query(
+        models.Checkout.checkout_date,
+        models.Checkout.room_total,
+        models.Checkout.package_total,
+        models.Checkout.food_total,
+        models.Checkout.service_total,
+        models.Checkout.tax_amount,
+    )
+    if from_date:
+        query = query.filter(models.Checkout.checkout_date >= from_date)
+    if to_date:
+        query = query.filter(models.Checkout.checkout_date < to_date + timedelta(days=1))
+
+    categories = (tax.ROOM, tax.PACKAGE, tax.FOOD, tax.SERVICE)
+    lines = []
+    recorded_tax = tax.ZERO
+    checkouts = 0
+    for checkout_date, *totals, tax_amount in query.yield_per(1000):
+        day = checkout_date.date() if checkout_date else date.today()
+        lines += [tax.TaxLine(category, amount, 1, day) for category, amount in zip(categories, totals)]
+        recorded_tax += tax.money(tax_amount)
+        checkouts += 1
+
+    summary = {category: {"taxable": tax.ZERO, "tax": tax.ZERO, "by_rate": {}} for category in categories}
+    for line, line_tax in zip(lines, tax.compute_taxes(lines)):
+        amount = tax.money(line.amount)
+        if amount <= 0:
+            continue
+        entry = summary[line.category]
+        entry["taxable"] += amount
+        entry["tax"] += line_tax
+        rate = f"{(tax.tax_rate(line.category, amount, on=line.on) * 100).normalize():f}"
+        bucket = entry["by_rate"].setdefault(rate, {"taxable": tax.ZERO, "tax": tax.ZERO})
+        bucket["taxable"] += amount
+        bucket["tax"] += line_tax
+
+    return {
+        "from_date": from_date,
+        "to_date": to_date,
+        "checkouts": checkouts,
+        "categories": summary,
+        "total_taxable": sum((entry["taxable"] for entry in summary.values()), tax.ZERO),
+        "total_tax": sum((entry["tax"] for entry in summary.values()), tax.ZERO),
+        # What the checkouts charged, for reconciliation
+        "recorded_tax": recorded_tax,
+    }
+
+
 @router.get("/rent-records")
 def get_rent_records(
     from_date: Optional[date] = Query(None),
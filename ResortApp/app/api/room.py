@@ -1,15 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from app.database import SessionLocal
-from app.schemas.room import RoomCreate, RoomOut
+from app.schemas.room import RoomCreate, RoomOut, RoomAvailabilityOut, RoomCombinationOut, OccupancyGridOut
+from app.utils.occupancy_grid import invalidate_occupancy_grid
+from app.utils.uploads import discard_upload, media_store
 from app.curd import room as crud_room
 from app.models.room import Room
 from app.models.booking import Booking, BookingRoom
-import shutil
-import os
-from uuid import uuid4
 from datetime import date
+from typing import Optional
 
 router = APIRouter(prefix="/rooms", tags=["Rooms"])
 
@@ -20,10 +20,6 @@ def get_db():
     finally:
         db.close()
 
-UPLOAD_DIR = os.path.join("static", "rooms")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-
 # Test endpoint without authentication - handles images
 @router.post("/test", response_model=RoomOut)
 def create_room_test(
@@ -49,14 +45,12 @@ def create_room_test(
     db: Session = Depends(get_db)
 ):
     try:
-        filename = None
+        image_url = None
         if image and image.filename:
             try:
-                ext = image.filename.split('.')[-1]
-                filename = f"room_{uuid4().hex}.{ext}"
-                image_path = os.path.join(UPLOAD_DIR, filename)
-                with open(image_path, "wb") as buffer:
-                    shutil.copyfileobj(image.file, buffer)
+                image_url = media_store.save_sync(image).url
+            except HTTPException:
+                raise
             except Exception as e:
                 print(f"Error saving image: {e}")
                 raise HTTPException(status_code=500, detail=f"Error saving image: {str(e)}")
@@ -68,7 +62,7 @@ def create_room_test(
             status=status,
             adults=adults,
             children=children,
-            image_url=f"/static/rooms/{filename}" if filename else None,
+            image_url=image_url,
             air_conditioning=air_conditioning,
             wifi=wifi,
             bathroom=bathroom,
@@ -84,8 +78,12 @@ def create_room_test(
         )
         db.add(db_room)
         db.commit()
+        invalidate_occupancy_grid()
         db.refresh(db_room)
         return db_room
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         print(f"Error creating room: {e}")
@@ -106,13 +104,11 @@ def delete_room_test(room_id: int, db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail="Room not found")
 
         # Delete associated image if exists
-        if db_room.image_url:
-            image_path = db_room.image_url.lstrip("/")
-            if os.path.exists(image_path):
-                os.remove(image_path)
+        discard_upload(db_room.image_url)
 
         db.delete(db_room)
         db.commit()
+        invalidate_occupancy_grid()
         return {"message": "Room deleted successfully"}
     except Exception as e:
         db.rollback()
@@ -123,14 +119,7 @@ def delete_room_test(room_id: int, db: Session = Depends(get_db)):
 @router.get("/test", response_model=list[RoomOut])
 def get_rooms_test(db: Session = Depends(get_db), skip: int = 0, limit: int = 100):
     try:
-        # Update room statuses before fetching (non-blocking - continues even if update fails)
-        try:
-            from app.utils.room_status import update_room_statuses
-            update_room_statuses(db)
-        except Exception as status_error:
-            print(f"Room status update failed (continuing): {status_error}")
-            # Continue fetching rooms even if status update fails
-        
+        # Statuses are rolled over by the nightly job and booking writes; reads never write
         rooms = db.query(Room).offset(skip).limit(limit).all()
         return rooms
         
@@ -171,14 +160,12 @@ def create_room(
     db: Session = Depends(get_db)
 ):
     try:
-        filename = None
+        image_url = None
         if image and image.filename:
             try:
-                ext = image.filename.split('.')[-1]
-                filename = f"room_{uuid4().hex}.{ext}"
-                image_path = os.path.join(UPLOAD_DIR, filename)
-                with open(image_path, "wb") as buffer:
-                    shutil.copyfileobj(image.file, buffer)
+                image_url = media_store.save_sync(image).url
+            except HTTPException:
+                raise
             except Exception as e:
                 print(f"Error saving image: {e}")
                 raise HTTPException(status_code=500, detail=f"Error saving image: {str(e)}")
@@ -190,7 +177,7 @@ def create_room(
             status=status,
             adults=adults,
             children=children,
-            image_url=f"/static/rooms/{filename}" if filename else None,
+            image_url=image_url,
             air_conditioning=air_conditioning,
             wifi=wifi,
             bathroom=bathroom,
@@ -206,8 +193,12 @@ def create_room(
         )
         db.add(db_room)
         db.commit()
+        invalidate_occupancy_grid()
         db.refresh(db_room)
         return db_room
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         print(f"Error creating room: {e}")
@@ -223,11 +214,82 @@ def update_room_statuses_endpoint(db: Session = Depends(get_db)):
     """
     try:
         from app.utils.room_status import update_room_statuses
-        update_room_statuses(db)
-        return {"message": "Room statuses updated successfully"}
+        updated = update_room_statuses(db)
+        return {"message": "Room statuses updated successfully", "updated": updated}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating room statuses: {str(e)}")
 
+@router.get("/availability", response_model=RoomAvailabilityOut)
+def get_room_availability(
+    check_in: date,
+    check_out: date,
+    adults: int = 0,
+    children: int = 0,
+    type: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Every room free for [check_in, check_out), excluding active regular and
+    package bookings, plus capacity-aware room suggestions for the party.
+    """
+    if check_out <= check_in:
+        raise HTTPException(status_code=400, detail="Check-out date must be at least 1 day after check-in date")
+    if adults < 0 or children < 0:
+        raise HTTPException(status_code=400, detail="Guest counts cannot be negative")
+
+    from app.utils.availability import get_available_rooms, suggest_room_combinations
+    rooms = get_available_rooms(db, check_in, check_out, room_type=type)
+    nights = (check_out - check_in).days
+
+    combinations = []
+    if adults or children:
+        for combination in suggest_room_combinations(rooms, adults, children):
+            price_per_night = sum(room.price or 0 for room in combination)
+            combinations.append(RoomCombinationOut(
+                room_ids=[room.id for room in combination],
+                room_numbers=[room.number for room in combination],
+                adults=sum(room.adults or 0 for room in combination),
+                children=sum(room.children or 0 for room in combination),
+                price_per_night=price_per_night,
+                total_price=price_per_night * nights,
+            ))
+
+    return RoomAvailabilityOut(
+        check_in=check_in,
+        check_out=check_out,
+        nights=nights,
+        rooms=rooms,
+        combinations=combinations,
+    )
+
+@router.get("/occupancy-grid", response_model=OccupancyGridOut)
+def get_occupancy_grid(
+    start_date: Optional[date] = Query(None, alias="from"),
+    days: int = Query(30, ge=1, le=90),
+    encoding: str = "rle",
+    db: Session = Depends(get_db)
+):
+    """
+    Rooms x days grid (free/booked/checked-in/maintenance) for the tape chart,
+    starting at `from` (default today) and spanning `days` nights.
+    """
+    if encoding not in ["rle", "base64"]:
+        raise HTTPException(status_code=400, detail="encoding must be either 'rle' or 'base64'")
+
+    from app.utils.occupancy_grid import LEGEND, encode_base64, encode_rle, get_grid
+    start_date = start_date or date.today()
+    rooms, grid = get_grid(db, start_date, days)
+
+    return OccupancyGridOut(
+        start_date=start_date,
+        days=days,
+        encoding=encoding,
+        legend=LEGEND,
+        rooms=rooms,
+        rows=encode_rle(grid) if encoding == "rle" else None,
+        data=encode_base64(grid) if encoding == "base64" else None,
+    )
+
 def _get_rooms_impl(db: Session, skip: int = 0, limit: int = 20):
     """Helper function for get_rooms"""
     try:
@@ -238,23 +300,11 @@ def _get_rooms_impl(db: Session, skip: int = 0, limit: int = 20):
             print(f"Database connection test failed: {conn_error}")
             raise HTTPException(status_code=503, detail="Database connection unavailable. Please try again.")
         
-        # Skip room status update for large queries (limit > 100) to prevent timeouts
-        # Status updates are expensive and can cause 30+ second delays with many rooms
-        # For Food Orders page and other bulk operations, we don't need real-time status
-        if limit <= 100:
-            # Update room statuses before fetching (non-blocking - continues even if update fails)
-            try:
-                from app.utils.room_status import update_room_statuses
-                update_room_statuses(db)
-            except Exception as status_error:
-                print(f"Room status update failed (continuing): {status_error}")
-                # Continue fetching rooms even if status update fails
-        else:
-            print(f"Skipping room status update for large query (limit={limit}) to prevent timeout")
-        
+        # Statuses are kept current by the nightly rollover and by booking,
+        # check-in and checkout writes, so this read path never writes
         # Query rooms with proper error handling
         try:
-            rooms = db.query(Room).offset(skip).limit(limit).all()
+            rooms = crud_room.get_rooms(db, skip=skip, limit=limit)
         except Exception as query_error:
             print(f"Room query failed: {query_error}")
             db.rollback()
@@ -295,13 +345,11 @@ def delete_room(room_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Room not found")
 
     # Delete associated image if exists
-    if db_room.image_url:
-        image_path = db_room.image_url.lstrip("/")
-        if os.path.exists(image_path):
-            os.remove(image_path)
+    discard_upload(db_room.image_url)
 
     db.delete(db_room)
     db.commit()
+    invalidate_occupancy_grid()
     return {"message": "Room deleted successfully"}
 
 
@@ -376,19 +424,12 @@ def update_room(
 
     # Handle new image upload if provided
     if image:
-        # Remove old image if exists
-        if db_room.image_url:
-            old_path = db_room.image_url.lstrip("/")
-            if os.path.exists(old_path):
-                os.remove(old_path)
-
-        ext = image.filename.split(".")[-1]
-        filename = f"room_{uuid4().hex}.{ext}"
-        image_path = os.path.join(UPLOAD_DIR, filename)
-        with open(image_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        db_room.image_url = f"/static/rooms/{filename}"
+        image_url = media_store.save_sync(image).url
+        # Remove the old image once the new one is stored
+        discard_upload(db_room.image_url)
+        db_room.image_url = image_url
 
     db.commit()
+    invalidate_occupancy_grid()
     db.refresh(db_room)
     return db_room
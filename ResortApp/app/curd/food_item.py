@@ -2,6 +2,7 @@ from app.models.food_item import FoodItem, FoodItemImage
 from app.schemas.food_item import FoodItemCreate
 from sqlalchemy.orm import Session
 from sqlalchemy.orm import joinedload
+from app.utils.cache import cached
 
 def create_food_item(db: Session, item: FoodItemCreate, image_paths: list[str]):
     db_item = FoodItem(**item.dict())
@@ -17,6 +18,7 @@ def create_food_item(db: Session, item: FoodItemCreate, image_paths: list[str]):
     db.refresh(db_item)
     return db_item
 
+@cached("food_items", tables=("food_items", "food_item_images", "food_categories"))
 def get_all_food_items(db: Session, skip: int = 0, limit: int = 100):
     items = (
         db.query(FoodItem)
@@ -3,6 +3,7 @@ from app.models.foodorder import FoodOrder, FoodOrderItem
 from app.models.booking import Booking, BookingRoom
 from app.models.Package import PackageBooking, PackageBookingRoom
 from app.schemas.foodorder import FoodOrderCreate, FoodOrderUpdate
+from app.utils.folio import mark_folio_rooms
 
 def get_guest_for_room(room_id, db: Session):
     """Get guest name for a room from either regular or package bookings"""
@@ -105,6 +106,8 @@ def update_food_order(db: Session, order_id: int, update_data: FoodOrderUpdate):
 
     if update_data.items is not None:
         db.query(FoodOrderItem).filter(FoodOrderItem.order_id == order.id).delete()
+        # The bulk delete skips the mapper events that keep the folio current
+        mark_folio_rooms(db, [order.room_id])
         for item_data in update_data.items:
             item = FoodOrderItem(
                 order_id=order.id,
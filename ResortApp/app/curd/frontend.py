@@ -1,8 +1,24 @@
 from sqlalchemy.orm import Session
 import app.models as models
+import app.models.frontend as frontend_models
 import app.schemas as schemas
+from app.utils.cache import cached
+
+# Every CMS table the generic reads can serve
+CMS_TABLES = [
+    model.__tablename__
+    for model in vars(frontend_models).values()
+    if isinstance(model, type) and hasattr(model, "__tablename__")
+]
+
+
+def _cms_namespace(db: Session, model, *args, **kwargs) -> str:
+    # One cache per CMS section, so editing the gallery keeps the reviews cached
+    return model.__tablename__
+
 
 # Generic CRUD
+@cached(_cms_namespace, watch=CMS_TABLES)
 def get_all(db: Session, model, skip: int = 0, limit: int = 100):
     return db.query(model).offset(skip).limit(limit).all()
 
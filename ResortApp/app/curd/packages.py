@@ -1,10 +1,17 @@
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session, joinedload, selectinload
 from fastapi import HTTPException
 from typing import List
 
 from app.models.Package import Package, PackageImage, PackageBooking, PackageBookingRoom
 from app.models.room import Room
 from app.schemas.packages import PackageBookingCreate
+from app.utils.availability import ensure_rooms_available
+from app.utils.booking_writer import write_booking
+from app.utils.cache import cached
+from app.utils.guest_identity import link_guest_user
+from app.utils.occupancy_grid import invalidate_occupancy_grid
+from app.utils.room_status import refresh_room_statuses
+from app.utils.reservations import release_reservations
 
 
 # ------------------- Packages -------------------
@@ -58,103 +65,7 @@ def get_package_bookings(db: Session):
         .options(joinedload(PackageBooking.rooms).joinedload(PackageBookingRoom.room))
     ).all()
 
-def get_or_create_guest_user(db: Session, email: str, mobile: str, name: str):
-    """
-    Find or create a guest user based on email and mobile number.
-    Returns the user_id to link bookings to the same user.
-    """
-    from app.models.user import User, Role
-    import bcrypt
-    
-    # Normalize empty strings to None for easier handling
-    email = email.strip() if email and isinstance(email, str) else None
-    mobile = mobile.strip() if mobile and isinstance(mobile, str) else None
-    name = name.strip() if name and isinstance(name, str) else "Guest User"
-    
-    # Need at least one identifier (email or mobile)
-    if not email and not mobile:
-        raise ValueError("Either email or mobile number must be provided")
-    
-    # First, try to find user by email (most reliable identifier)
-    user = None
-    if email:
-        user = db.query(User).filter(User.email == email).first()
-    
-    # If not found by email, try by mobile/phone
-    if not user and mobile:
-        user = db.query(User).filter(User.phone == mobile).first()
-    
-    # If user exists, return the user_id
-    if user:
-        # Update name if provided and different
-        if name and user.name != name:
-            user.name = name
-            db.commit()
-        return user.id
-    
-    # If user doesn't exist, create a new guest user
-    try:
-        # First, ensure 'guest' role exists
-        guest_role = db.query(Role).filter(Role.name == "guest").first()
-        if not guest_role:
-            # Create guest role if it doesn't exist
-            guest_role = Role(name="guest", permissions="[]")
-            db.add(guest_role)
-            db.commit()
-            db.refresh(guest_role)
-        
-        # Generate a placeholder password for guest users (they won't log in)
-        password_bytes = "guest_user_no_password".encode("utf-8")
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(password_bytes, salt).decode("utf-8")
-        
-        # Create email if not provided (use mobile-based email or generate unique one)
-        if not email:
-            if mobile:
-                user_email = f"guest_{mobile}@temp.com"
-            else:
-                # Generate a unique email based on timestamp
-                import time
-                user_email = f"guest_{int(time.time())}@temp.com"
-        else:
-            user_email = email
-        
-        # Check if email already exists (race condition check)
-        existing_user = db.query(User).filter(User.email == user_email).first()
-        if existing_user:
-            # User was created between our check and creation attempt
-            return existing_user.id
-        
-        # Create new guest user
-        new_user = User(
-            name=name,
-            email=user_email,
-            phone=mobile if mobile else None,
-            hashed_password=hashed_password,
-            role_id=guest_role.id,
-            is_active=True
-        )
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
-        return new_user.id
-    except Exception as e:
-        # If user creation fails due to unique constraint or other DB error, try to find existing user
-        db.rollback()  # Rollback the failed transaction
-        if email:
-            existing_user = db.query(User).filter(User.email == email).first()
-            if existing_user:
-                return existing_user.id
-        if mobile:
-            existing_user = db.query(User).filter(User.phone == mobile).first()
-            if existing_user:
-                return existing_user.id
-        # Re-raise if we can't find existing user
-        raise ValueError(f"Failed to create or find guest user: {str(e)}")
-
-def book_package(db: Session, booking: PackageBookingCreate):
-    # Find or create guest user based on email and mobile
-    guest_user_id = None
+def book_package(db: Session, booking: PackageBookingCreate, on_flush=None):
     # Normalize email and mobile - convert empty strings to None, handle None safely
     try:
         guest_email = booking.guest_email.strip() if (booking.guest_email and isinstance(booking.guest_email, str) and booking.guest_email.strip()) else None
@@ -166,17 +77,8 @@ def book_package(db: Session, booking: PackageBookingCreate):
     except (AttributeError, TypeError):
         guest_mobile = None
     
-    if guest_email or guest_mobile:
-        try:
-            guest_user_id = get_or_create_guest_user(
-                db=db,
-                email=guest_email,
-                mobile=guest_mobile,
-                name=booking.guest_name or "Guest User"
-            )
-        except Exception as e:
-            # Log error but don't fail the booking if user creation fails
-            print(f"Warning: Could not create/link guest user: {str(e)}")
+    # Guest user is upserted in the same transaction as the booking
+    guest_user = link_guest_user(db, guest_email, guest_mobile, booking.guest_name)
     
     # Check for an existing package booking to reuse guest details for consistency
     # Only check if we have at least email or mobile
@@ -205,9 +107,9 @@ def book_package(db: Session, booking: PackageBookingCreate):
         raise HTTPException(status_code=404, detail="Package not found")
     
     is_whole_property = selected_package.booking_type == 'whole_property'
+    selected_rooms = db.query(Room).filter(Room.id.in_(booking.room_ids)).all() if booking.room_ids else []
     
     if not is_whole_property and booking.room_ids:
-        selected_rooms = db.query(Room).filter(Room.id.in_(booking.room_ids)).all()
         if len(selected_rooms) != len(booking.room_ids):
             raise HTTPException(status_code=400, detail="One or more selected rooms are invalid.")
         
@@ -228,41 +130,12 @@ def book_package(db: Session, booking: PackageBookingCreate):
 
     # CRITICAL FIX: Check for conflicts BEFORE creating the booking
     # This prevents invalid bookings from being created in the database
-    for room_id in booking.room_ids:
-        # Check for conflicts with package bookings (simplified overlap check: start1 < end2 AND start2 < end1)
-        package_conflict = (
-            db.query(PackageBookingRoom)
-            .join(PackageBooking)
-            .filter(
-                PackageBookingRoom.room_id == room_id,
-                PackageBooking.status.in_(["booked", "checked-in", "checked_in"]),  # Only check for active bookings
-                PackageBooking.check_in < booking.check_out,
-                PackageBooking.check_out > booking.check_in
-            )
-            .first()
-        )
-
-        # Check for conflicts with regular bookings (simplified overlap check: start1 < end2 AND start2 < end1)
-        from app.models.booking import Booking, BookingRoom
-        regular_conflict = (
-            db.query(BookingRoom)
-            .join(Booking)
-            .filter(
-                BookingRoom.room_id == room_id,
-                Booking.status.in_(["booked", "checked-in", "checked_in"]),  # Only check for active bookings
-                Booking.check_in < booking.check_out,
-                Booking.check_out > booking.check_in
-            )
-            .first()
-        )
+    ensure_rooms_available(db, booking.room_ids, booking.check_in, booking.check_out, rooms=selected_rooms)
 
-        if package_conflict or regular_conflict:
-            room = db.query(Room).filter(Room.id == room_id).first()
-            raise HTTPException(status_code=400, detail=f"Room {room.number if room else room_id} is not available for the selected dates.")
-
-    # All conflict checks passed - now create the booking
-    db_booking = PackageBooking(
-        package_id=booking.package_id,
+    # All conflict checks passed - booking, room links, reservations and room
+    # statuses are written in one transaction
+    db_booking = write_booking(db, PackageBooking(
+        package=selected_package,
         check_in=booking.check_in,
         check_out=booking.check_out,
         guest_name=guest_name_to_use,
@@ -271,32 +144,9 @@ def book_package(db: Session, booking: PackageBookingCreate):
         adults=booking.adults,
         children=booking.children,
         status="booked",
-        user_id=guest_user_id,  # Link booking to guest user
-    )
-    db.add(db_booking)
-    db.commit()
-    db.refresh(db_booking)
-
-    # Assign multiple rooms (conflicts already checked, safe to proceed)
-    for room_id in booking.room_ids:
-        # Update the room's status to 'Booked'
-        room_to_update = db.query(Room).filter(Room.id == room_id).first()
-        if room_to_update:
-            room_to_update.status = "Booked"
-
-        db_room_link = PackageBookingRoom(package_booking_id=db_booking.id, room_id=room_id)
-        db.add(db_room_link)
-
-    db.commit()
-
-    # Reload with rooms + room details
-    booking_with_rooms = (
-        db.query(PackageBooking)
-        .options(joinedload(PackageBooking.rooms).joinedload(PackageBookingRoom.room))
-        .filter(PackageBooking.id == db_booking.id)
-        .first()
-    )
-    return booking_with_rooms
+        user=guest_user,  # Link booking to guest user
+    ), selected_rooms, on_flush=on_flush)
+    return db_booking
 
 
 
@@ -308,6 +158,7 @@ def delete_package_booking(db: Session, booking_id: int):
         return False
 
     booking.status = "cancelled"
+    release_reservations(db, package_booking_id=booking.id)
 
     for link in booking.rooms:
         room_to_update = db.query(Room).filter(Room.id == link.room_id).first()
@@ -315,11 +166,19 @@ def delete_package_booking(db: Session, booking_id: int):
             room_to_update.status = "Available"
 
     db.commit()
+    invalidate_occupancy_grid(booking.check_in, booking.check_out)
+    refresh_room_statuses(db, [link.room_id for link in booking.rooms])
     db.refresh(booking)
     return True
+# Packages are served with their images, so both tables invalidate the cache
+PACKAGE_TABLES = ("packages", "package_images")
+
+
+@cached("packages", tables=PACKAGE_TABLES)
 def get_packages(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Package).offset(skip).limit(limit).all()
+    return db.query(Package).options(selectinload(Package.images)).offset(skip).limit(limit).all()
 
 
+@cached("packages", tables=PACKAGE_TABLES)
 def get_package(db: Session, package_id: int):
-    return db.query(Package).filter(Package.id == package_id).first()
\ No newline at end of file
+    return db.query(Package).options(selectinload(Package.images)).filter(Package.id == package_id).first()
\ No newline at end of file
@@ -11,8 +11,16 @@ from app.models.service import AssignedService, Service
 from app.models.Package import PackageBooking, Package, PackageBookingRoom
 from app.models.checkout import Checkout
 from app.schemas.checkout import BillSummary, BillBreakdown, CheckoutSuccess, CheckoutRequest
+from app.utils.cache import cached
+from app.utils.folio import mark_folio_rooms
 router = APIRouter(prefix="/bill", tags=["checkout"])
 
+
+@cached("rooms")
+def get_rooms(db: Session, skip: int = 0, limit: int = 100):
+    """Rooms page for GET /rooms; cached until a room is written (incl. status changes)."""
+    return db.query(Room).offset(skip).limit(limit).all()
+
 def get_all_rooms(db: Session, skip: int = 0, limit: int = 100):
     rooms = db.query(Room).offset(skip).limit(limit).all()
     today = date.today()
@@ -184,6 +192,7 @@ def checkout(room_number: str, request: CheckoutRequest, db: Session = Depends(g
         # Update billing status for all related services
         db.query(FoodOrder).filter(FoodOrder.room_id == room.id, FoodOrder.billing_status == "unbilled").update({"billing_status": "billed"})
         db.query(AssignedService).filter(AssignedService.room_id == room.id, AssignedService.billing_status == "unbilled").update({"billing_status": "billed"})
+        mark_folio_rooms(db, [room.id])
 
         # Update booking and room status
         booking.status = "checked_out"
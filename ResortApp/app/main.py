@@ -7,12 +7,15 @@ import os
 
 # API Routers
 from app.api import (
+    analytics,
     attendance,
     auth,
     booking,
     checkout,
     dashboard,
+    email_outbox,
     employee,
+    events,
     expenses,
     food_category,
     food_item,
@@ -34,6 +37,11 @@ ROOT_PATH = os.getenv("ROOT_PATH", "")
 
 app = FastAPI(root_path=ROOT_PATH, redirect_slashes=False)
 
+# Cached catalog responses with ETag/304; added first so CORS wraps it
+from app.utils.http_cache import CatalogCacheMiddleware
+from app.utils.uploads import UploadStaticFiles
+app.add_middleware(CatalogCacheMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -47,8 +55,9 @@ app.add_middleware(
 UPLOAD_DIR = "uploads/expenses"
 os.makedirs("static/rooms", exist_ok=True)
 os.makedirs(UPLOAD_DIR, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Content-addressed uploads get immutable cache headers (app/utils/uploads.py)
+app.mount("/uploads", UploadStaticFiles(directory="uploads"), name="uploads")
+app.mount("/static", UploadStaticFiles(directory="static"), name="static")
 
 # Register Routers with /api prefix to match nginx configuration
 app.include_router(auth.router, prefix="/api")
@@ -69,5 +78,60 @@ app.include_router(payment.router, prefix="/api")
 app.include_router(frontend.router, prefix="/api")
 app.include_router(dashboard.router, prefix="/api")
 app.include_router(report.router, prefix="/api")
+app.include_router(email_outbox.router, prefix="/api")
+app.include_router(events.router, prefix="/api")
+app.include_router(analytics.router, prefix="/api")
 # app.include_router(guest_api.guest_router) # <--- And add this line
-# app.include_router(billing_api.router) # <-- Now billing is active
\ No newline at end of file
+# app.include_router(billing_api.router) # <-- Now billing is active
+
+
+# Nightly room status rollover at property-local midnight
+@app.on_event("startup")
+async def start_room_status_scheduler():
+    import asyncio
+    from app.utils.room_status import run_room_status_scheduler
+    app.state.room_status_task = asyncio.create_task(run_room_status_scheduler())
+
+
+# Nightly occupancy forecast for the next 90 nights
+@app.on_event("startup")
+async def start_forecast_scheduler():
+    import asyncio
+    from app.utils.forecast import run_forecast_scheduler
+    app.state.forecast_task = asyncio.create_task(run_forecast_scheduler())
+
+
+# Hourly purge of expired Idempotency-Key records
+@app.on_event("startup")
+async def start_idempotency_cleanup():
+    import asyncio
+    from app.utils.idempotency import run_idempotency_cleanup
+    app.state.idempotency_cleanup_task = asyncio.create_task(run_idempotency_cleanup())
+
+
+# Background delivery of queued emails
+@app.on_event("startup")
+def start_email_outbox_sender():
+    from app.utils.email_outbox import start_email_sender
+    start_email_sender()
+
+
+# Compile email templates before the first booking needs them
+@app.on_event("startup")
+def warm_email_templates():
+    from app.utils.email_templates import warm_email_templates as warm
+    warm()
+
+
+# Live events from the other workers (PostgreSQL LISTEN/NOTIFY)
+@app.on_event("startup")
+def start_event_listener():
+    from app.utils.events import start_event_listener as start
+    start()
+
+
+# Cache invalidations from the other workers (PostgreSQL LISTEN/NOTIFY)
+@app.on_event("startup")
+def start_cache_listener():
+    from app.utils.cache import start_cache_listener as start
+    start()
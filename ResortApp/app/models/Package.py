@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
+from datetime import datetime
 
 
 class Package(Base):
@@ -44,6 +45,8 @@ class PackageBooking(Base):
     id_card_image_url = Column(String, nullable=True)
     guest_photo_url = Column(String, nullable=True)
     status = Column(String)
+    # When the booking was made; pickup curves measure lead time from it
+    created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationships
     package = relationship("Package", back_populates="bookings")
@@ -57,12 +60,15 @@ class PackageBooking(Base):
         cascade="all, delete-orphan"
     )
 
+    # Availability checks filter on the stay window
+    __table_args__ = (Index("ix_package_bookings_check_in_check_out", "check_in", "check_out"),)
+
 
 class PackageBookingRoom(Base):
     __tablename__ = "package_booking_rooms"
     id = Column(Integer, primary_key=True, index=True)
-    package_booking_id = Column(Integer, ForeignKey("package_bookings.id", ondelete="CASCADE"))
-    room_id = Column(Integer, ForeignKey("rooms.id"))
+    package_booking_id = Column(Integer, ForeignKey("package_bookings.id", ondelete="CASCADE"), index=True)
+    room_id = Column(Integer, ForeignKey("rooms.id"), index=True)
 
     # Relationships
     package_booking = relationship("PackageBooking", back_populates="rooms")
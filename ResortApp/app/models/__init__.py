@@ -2,10 +2,16 @@ from .user import User, Role
 from .room import Room
 from .booking import Booking, BookingRoom
 from .Package import Package, PackageBooking, PackageBookingRoom
+from .reservation import RoomReservation
+from .email_outbox import EmailOutbox
+from .idempotency import IdempotencyKey
 from .foodorder import FoodOrder, FoodOrderItem
 from .service import Service, AssignedService, ServiceImage
 from .expense import Expense
 from .checkout import Checkout
+from .folio import BookingFolio
+from .daily_metric import DailyMetric
+from .forecast import OccupancyForecast
 from .employee import Employee, Attendance
 from .food_category import FoodCategory
 from .food_item import FoodItem
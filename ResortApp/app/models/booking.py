@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Float, Integer, String, ForeignKey, Date
+from sqlalchemy import Column, Float, Integer, String, ForeignKey, Date, DateTime, Index
 from sqlalchemy.orm import relationship
+from datetime import datetime
 from app.database import Base
 from .room import Room
 from .user import User
@@ -20,6 +21,8 @@ class Booking(Base):
     guest_photo_url = Column(String, nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     total_amount = Column(Float, default=0.0)
+    # When the booking was made; pickup curves measure lead time from it
+    created_at = Column(DateTime, default=datetime.utcnow)
     # Relationships
     checkout = relationship("Checkout", back_populates="booking", uselist=False)
     user = relationship("User", back_populates="bookings")
@@ -29,12 +32,18 @@ class Booking(Base):
         cascade="all, delete-orphan"
     )
 
+    # Availability checks filter on the stay window; the bookings list pages on (check_in, id)
+    __table_args__ = (
+        Index("ix_bookings_check_in_check_out", "check_in", "check_out"),
+        Index("ix_bookings_check_in_id", "check_in", "id"),
+    )
+
 class BookingRoom(Base):
     __tablename__ = "booking_rooms"
 
     id = Column(Integer, primary_key=True, index=True)
-    booking_id = Column(Integer, ForeignKey("bookings.id"))
-    room_id = Column(Integer, ForeignKey("rooms.id"))
+    booking_id = Column(Integer, ForeignKey("bookings.id"), index=True)
+    room_id = Column(Integer, ForeignKey("rooms.id"), index=True)
 
     booking = relationship("Booking", back_populates="booking_rooms")
     room = relationship("Room", back_populates="booking_rooms")
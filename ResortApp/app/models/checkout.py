@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime, Date, Enum, func
+from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime, Date, Enum, Index, func, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -27,4 +27,17 @@ class Checkout(Base):
     payment_status = Column(String) 
 
     booking = relationship("Booking", back_populates="checkout", uselist=False)
-    package_booking = relationship("PackageBooking", back_populates="checkout", uselist=False)
\ No newline at end of file
+    package_booking = relationship("PackageBooking", back_populates="checkout", uselist=False)
+
+    # One checkout per room and checkout date: a repeated (double-clicked)
+    # checkout of a room fails on insert instead of billing twice
+    __table_args__ = (
+        Index(
+            "uq_checkouts_room_number_checkout_date",
+            "room_number",
+            "checkout_date",
+            unique=True,
+            postgresql_where=text("room_number <> ''"),
+            sqlite_where=text("room_number <> ''"),
+        ),
+    )
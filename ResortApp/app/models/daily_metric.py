@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, UniqueConstraint
+from datetime import datetime
+from app.database import Base
+
+
+class DailyMetric(Base):
+    """
+    One pre-aggregated figure per day (app/utils/daily_metrics.py): billed
+    revenue by category and checkouts by checkout date, rooms sold, arrivals
+    and departures by stay date, and food orders by order date. The rows for
+    ALL_TIME (day 0001-01-01) hold the running totals over every day.
+    """
+    __tablename__ = "daily_metrics"
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    metric = Column(String(32), nullable=False)
+    value = Column(Numeric(14, 2), nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("day", "metric", name="uq_daily_metrics_day_metric"),)
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, Numeric, DateTime, ForeignKey
+from datetime import datetime
+from app.database import Base
+
+
+class BookingFolio(Base):
+    """
+    Running totals of one active regular or package booking's bill
+    (app/utils/folio.py): room or package charges for the booked nights and
+    the unbilled food and service charges of its rooms. Kept up to date in
+    the same transaction as the writes that change them, so a bill reads one
+    row instead of every order and service.
+    """
+    __tablename__ = "booking_folios"
+
+    id = Column(Integer, primary_key=True, index=True)
+    booking_id = Column(Integer, ForeignKey("bookings.id", ondelete="CASCADE"), nullable=True, unique=True)
+    package_booking_id = Column(Integer, ForeignKey("package_bookings.id", ondelete="CASCADE"), nullable=True, unique=True)
+
+    nights = Column(Integer, nullable=False, default=1)  # booked nights the room/package charges cover
+    room_rate = Column(Numeric(12, 2), nullable=False, default=0)  # all rooms, per night
+    package_rate = Column(Numeric(12, 2), nullable=False, default=0)  # per night; 0 for whole-property packages
+    room_charges = Column(Numeric(12, 2), nullable=False, default=0)
+    package_charges = Column(Numeric(12, 2), nullable=False, default=0)
+    food_charges = Column(Numeric(12, 2), nullable=False, default=0)
+    service_charges = Column(Numeric(12, 2), nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
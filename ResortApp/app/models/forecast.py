@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, UniqueConstraint
+from datetime import datetime
+from app.database import Base
+
+
+class OccupancyForecast(Base):
+    """
+    One night's occupancy forecast for one room type, as computed on `as_of`
+    (app/utils/forecast.py): rooms on the books, last year's rooms on the
+    books at the same lead time and final rooms sold for the same night, and
+    the forecast rooms sold. Precomputed nightly for the next 90 nights.
+    """
+    __tablename__ = "occupancy_forecasts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    as_of = Column(Date, nullable=False)
+    stay_date = Column(Date, nullable=False)
+    room_type = Column(String, nullable=False)
+    capacity = Column(Integer, nullable=False, default=0)
+    on_the_books = Column(Integer, nullable=False, default=0)
+    on_the_books_last_year = Column(Integer, nullable=False, default=0)
+    actual_last_year = Column(Integer, nullable=False, default=0)
+    forecast = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("as_of", "stay_date", "room_type", name="uq_occupancy_forecasts_as_of_stay_date_room_type"),
+    )
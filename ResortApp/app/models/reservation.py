@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, ForeignKey, Date, DDL, event
+from app.database import Base
+
+
+class RoomReservation(Base):
+    """
+    One row per room held by an active regular or package booking.
+
+    On PostgreSQL a GiST exclusion constraint over (room_id, [check_in, check_out))
+    makes overlapping reservations for the same room impossible, so concurrent
+    bookings cannot both succeed even if they pass the availability pre-check.
+    """
+    __tablename__ = "room_reservations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    room_id = Column(Integer, ForeignKey("rooms.id", ondelete="CASCADE"), nullable=False, index=True)
+    booking_id = Column(Integer, ForeignKey("bookings.id", ondelete="CASCADE"), nullable=True, index=True)
+    package_booking_id = Column(Integer, ForeignKey("package_bookings.id", ondelete="CASCADE"), nullable=True, index=True)
+    check_in = Column(Date, nullable=False)
+    check_out = Column(Date, nullable=False)
+
+
+# room_id is compared as a one-element int4range so the constraint needs only
+# built-in GiST range support (no btree_gist extension)
+event.listen(
+    RoomReservation.__table__,
+    "after_create",
+    DDL(
+        "ALTER TABLE room_reservations ADD CONSTRAINT room_reservations_no_overlap "
+        "EXCLUDE USING gist (int4range(room_id, room_id, '[]') WITH &&, "
+        "daterange(check_in, check_out, '[)') WITH &&)"
+    ).execute_if(dialect="postgresql"),
+)
@@ -31,6 +31,9 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
     phone = Column(String, nullable=True)
+    # Identity keys for guest lookup (see app/utils/guest_identity.py)
+    email_normalized = Column(String, nullable=True, unique=True, index=True)
+    phone_e164 = Column(String, nullable=True, unique=True, index=True)
     is_active = Column(Boolean, default=True)
     role_id = Column(Integer, ForeignKey("roles.id"))
     bookings = relationship("Booking", back_populates="user")
@@ -76,3 +76,18 @@ class BookingOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# Result for one item of POST /bookings/bulk, in request order
+class BookingBulkItemResult(BaseModel):
+    index: int
+    success: bool
+    booking_id: Optional[int] = None
+    display_id: Optional[str] = None  # Format: BK-000001
+    error: Optional[str] = None
+
+
+class BookingBulkResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BookingBulkItemResult]
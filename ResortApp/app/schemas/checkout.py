@@ -44,6 +44,10 @@ class BillSummary(BaseModel):
     check_out: date
     charges: BillBreakdown
 
+class BillPreview(BillSummary):
+    booking_id: int
+    booking_type: str  # "regular" or "package", as in /bill/active-rooms
+
 class CheckoutFull(BaseModel):
     id: int
     booking_id: Optional[int]
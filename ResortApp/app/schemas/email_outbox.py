@@ -0,0 +1,22 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Dict, List, Optional
+from datetime import datetime
+
+
+class EmailOutboxOut(BaseModel):
+    id: int
+    to_email: str
+    to_name: Optional[str] = None
+    subject: str
+    status: str
+    attempts: int
+    last_error: Optional[str] = None
+    next_attempt_at: datetime
+    created_at: datetime
+    sent_at: Optional[datetime] = None
+    model_config = ConfigDict(from_attributes=True)
+
+
+class EmailOutboxStatusOut(BaseModel):
+    counts: Dict[str, int]
+    emails: List[EmailOutboxOut]
@@ -2,8 +2,9 @@ from pydantic import BaseModel
 from typing import List, Optional
 
 from .food_category import FoodCategoryOut
+from .image import WithImageVariants
 
-class FoodItemImageOut(BaseModel):
+class FoodItemImageOut(WithImageVariants):
     id: int
     image_url: str
 
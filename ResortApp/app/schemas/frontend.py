@@ -1,6 +1,8 @@
 from pydantic import BaseModel
 from datetime import date
 
+from app.schemas.image import WithImageVariants
+
 # Base schema with is_active
 class BaseSchema(BaseModel):
     is_active: bool = True
@@ -18,7 +20,7 @@ class HeaderBannerBase(BaseSchema):
 class HeaderBannerCreate(HeaderBannerBase):
     pass
 
-class HeaderBanner(HeaderBannerBase):
+class HeaderBanner(HeaderBannerBase, WithImageVariants):
     id: int
 
 
@@ -46,7 +48,7 @@ class GalleryBase(BaseSchema):
 class GalleryCreate(GalleryBase):
     pass
 
-class Gallery(GalleryBase):
+class Gallery(GalleryBase, WithImageVariants):
     id: int
 
 
@@ -93,7 +95,7 @@ class SignatureExperienceUpdate(BaseSchema):
     description: str | None = None
     image_url: str | None = None
 
-class SignatureExperience(SignatureExperienceBase):
+class SignatureExperience(SignatureExperienceBase, WithImageVariants):
     id: int
 
 
@@ -111,7 +113,7 @@ class PlanWeddingUpdate(BaseSchema):
     description: str | None = None
     image_url: str | None = None
 
-class PlanWedding(PlanWeddingBase):
+class PlanWedding(PlanWeddingBase, WithImageVariants):
     id: int
 
 
@@ -134,7 +136,7 @@ class NearbyAttractionUpdate(BaseSchema):
     map_link: str | None = None
 
 
-class NearbyAttraction(NearbyAttractionBase):
+class NearbyAttraction(NearbyAttractionBase, WithImageVariants):
     id: int
 
 
@@ -157,5 +159,5 @@ class NearbyAttractionBannerUpdate(BaseSchema):
     map_link: str | None = None
 
 
-class NearbyAttractionBanner(NearbyAttractionBannerBase):
+class NearbyAttractionBanner(NearbyAttractionBannerBase, WithImageVariants):
     id: int
\ No newline at end of file
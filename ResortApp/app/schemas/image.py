@@ -0,0 +1,21 @@
+from typing import Optional
+
+from pydantic import BaseModel, computed_field
+
+from app.utils.image_variants import variant_urls
+
+
+class ImageVariants(BaseModel):
+    thumb: str
+    medium: str
+    large: str
+
+
+class WithImageVariants(BaseModel):
+    """Adds image_variants, the WebP renditions of the schema's image_url."""
+
+    @computed_field
+    @property
+    def image_variants(self) -> Optional[ImageVariants]:
+        urls = variant_urls(getattr(self, "image_url", None))
+        return ImageVariants(**urls) if urls else None
@@ -2,8 +2,10 @@ from pydantic import BaseModel, Field, model_validator
 from datetime import date
 from typing import List, Optional
 
+from app.schemas.image import WithImageVariants
 
-class PackageImageOut(BaseModel):
+
+class PackageImageOut(WithImageVariants):
     id: int
     image_url: str
 
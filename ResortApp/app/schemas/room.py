@@ -1,4 +1,7 @@
 from pydantic import BaseModel
+from datetime import date
+
+from app.schemas.image import WithImageVariants
 
 class RoomBase(BaseModel):
     number: str
@@ -23,7 +26,7 @@ class RoomBase(BaseModel):
 class RoomCreate(RoomBase):
     pass
 
-class RoomOut(RoomBase):
+class RoomOut(RoomBase, WithImageVariants):
     id: int
     status: str
     image_url: str | None = None
@@ -31,3 +34,36 @@ class RoomOut(RoomBase):
     model_config = {
         "from_attributes": True  # enables from_orm in Pydantic v2
     }
+
+
+class RoomCombinationOut(BaseModel):
+    room_ids: list[int]
+    room_numbers: list[str]
+    adults: int
+    children: int
+    price_per_night: float
+    total_price: float
+
+
+class RoomAvailabilityOut(BaseModel):
+    check_in: date
+    check_out: date
+    nights: int
+    rooms: list[RoomOut]
+    combinations: list[RoomCombinationOut] = []
+
+
+class OccupancyRoomOut(BaseModel):
+    id: int
+    number: str
+    type: str | None = None
+
+
+class OccupancyGridOut(BaseModel):
+    start_date: date
+    days: int
+    encoding: str  # "rle": rows of [code, length] runs; "base64": row-major uint8 cells
+    legend: dict[int, str]
+    rooms: list[OccupancyRoomOut]
+    rows: list[list[list[int]]] | None = None
+    data: str | None = None
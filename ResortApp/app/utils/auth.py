@@ -30,6 +30,9 @@ def get_password_hash(password):
 
 
 def verify_password(plain, hashed):
+    # Accounts created without a password (e.g. guests) carry a "!" sentinel
+    if not hashed or hashed.startswith("!"):
+        return False
     # Use bcrypt directly to avoid compatibility issues
     password_bytes = plain.encode("utf-8")
     # bcrypt handles truncation automatically, but we'll limit to 72 bytes to be safe
@@ -0,0 +1,237 @@
+"""
+Room availability checks shared by every booking path.
+
+Regular bookings (BookingRoom -> Booking) and package bookings
+(PackageBookingRoom -> PackageBooking) both hold rooms, so a room is free for
+[check_in, check_out) only when neither kind has an active stay overlapping
+that window. All stays for the requested rooms are fetched in ONE query and
+loaded into a per-room sorted interval index, instead of two queries per room.
+"""
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import exists, false, func, select, true, union_all
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking, BookingRoom
+from app.models.Package import PackageBooking, PackageBookingRoom
+from app.models.reservation import RoomReservation
+from app.models.room import Room
+
+# Statuses that hold a room. Both hyphen and underscore spellings exist in the data.
+ACTIVE_BOOKING_STATUSES = ("booked", "checked-in", "checked_in")
+
+
+class Stay(NamedTuple):
+    check_in: date
+    check_out: date
+    booking_id: int
+    is_package: bool
+
+
+class RoomIntervalIndex:
+    """
+    Per-room list of stays kept sorted by check-in date.
+
+    Callers that write bookings can `add()` the new stay so later checks in the
+    same unit of work (e.g. several bookings in one request) see it without
+    going back to the database.
+    """
+
+    def __init__(self):
+        self._stays: Dict[int, List[Stay]] = defaultdict(list)
+
+    def add(self, room_id: int, stay: Stay):
+        insort(self._stays[room_id], stay)
+
+    def conflicts(
+        self,
+        room_id: int,
+        check_in: date,
+        check_out: date,
+        exclude_booking_id: Optional[int] = None,
+        exclude_package_booking_id: Optional[int] = None,
+    ) -> List[Stay]:
+        stays = self._stays.get(room_id)
+        if not stays:
+            return []
+        # Only stays that start before our check-out can overlap (start1 < end2 AND start2 < end1)
+        upper = bisect_left(stays, (check_out,))
+        return [
+            stay for stay in stays[:upper]
+            if stay.check_out > check_in
+            and not (not stay.is_package and stay.booking_id == exclude_booking_id)
+            and not (stay.is_package and stay.booking_id == exclude_package_booking_id)
+        ]
+
+
+def active_stays_query(room_ids: Optional[Iterable[int]], check_in: date, check_out: date):
+    regular = (
+        select(
+            BookingRoom.room_id.label("room_id"),
+            Booking.check_in.label("check_in"),
+            Booking.check_out.label("check_out"),
+            Booking.id.label("booking_id"),
+            false().label("is_package"),
+            Booking.status.label("status"),
+        )
+        .join(Booking, Booking.id == BookingRoom.booking_id)
+        .where(
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+            Booking.check_in < check_out,
+            Booking.check_out > check_in,
+        )
+    )
+    package = (
+        select(
+            PackageBookingRoom.room_id.label("room_id"),
+            PackageBooking.check_in.label("check_in"),
+            PackageBooking.check_out.label("check_out"),
+            PackageBooking.id.label("booking_id"),
+            true().label("is_package"),
+            PackageBooking.status.label("status"),
+        )
+        .join(PackageBooking, PackageBooking.id == PackageBookingRoom.package_booking_id)
+        .where(
+            PackageBooking.status.in_(ACTIVE_BOOKING_STATUSES),
+            PackageBooking.check_in < check_out,
+            PackageBooking.check_out > check_in,
+        )
+    )
+    if room_ids is not None:
+        room_ids = list(room_ids)
+        regular = regular.where(BookingRoom.room_id.in_(room_ids))
+        package = package.where(PackageBookingRoom.room_id.in_(room_ids))
+    return union_all(regular, package)
+
+
+def load_room_index(
+    db: Session,
+    room_ids: Optional[Iterable[int]],
+    check_in: date,
+    check_out: date,
+) -> RoomIntervalIndex:
+    """
+    Load every active stay overlapping [check_in, check_out) for the given rooms
+    (or for all rooms when room_ids is None) with a single query.
+    """
+    index = RoomIntervalIndex()
+    if room_ids is not None:
+        room_ids = list(room_ids)
+        if not room_ids:
+            return index
+    for row in db.execute(active_stays_query(room_ids, check_in, check_out)):
+        index.add(row.room_id, Stay(row.check_in, row.check_out, row.booking_id, bool(row.is_package)))
+    return index
+
+
+def find_conflicts(
+    db: Session,
+    room_ids: Iterable[int],
+    check_in: date,
+    check_out: date,
+    exclude_booking_id: Optional[int] = None,
+    exclude_package_booking_id: Optional[int] = None,
+) -> Dict[int, List[Stay]]:
+    """
+    Return {room_id: [conflicting stays]} for the rooms that are NOT free for
+    [check_in, check_out). An empty dict means every room is available.
+    """
+    room_ids = list(room_ids)
+    index = load_room_index(db, room_ids, check_in, check_out)
+    conflicts = {}
+    for room_id in room_ids:
+        stays = index.conflicts(room_id, check_in, check_out, exclude_booking_id, exclude_package_booking_id)
+        if stays:
+            conflicts[room_id] = stays
+    return conflicts
+
+
+def ensure_rooms_available(
+    db: Session,
+    room_ids: List[int],
+    check_in: date,
+    check_out: date,
+    rooms: Optional[List[Room]] = None,
+):
+    """
+    Raise the standard 400 "Room X is not available" error for the first
+    requested room that has an overlapping active booking.
+    """
+    conflicts = find_conflicts(db, room_ids, check_in, check_out)
+    if not conflicts:
+        return
+    room_id = next(rid for rid in room_ids if rid in conflicts)
+    room = next((r for r in rooms or [] if r.id == room_id), None)
+    if room is None:
+        room = db.query(Room).filter(Room.id == room_id).first()
+    raise HTTPException(
+        status_code=400,
+        detail=f"Room {room.number if room else room_id} is not available for the selected dates."
+    )
+
+
+def get_available_rooms(
+    db: Session,
+    check_in: date,
+    check_out: date,
+    room_type: Optional[str] = None,
+) -> List[Room]:
+    """
+    Every room with no reservation overlapping [check_in, check_out), as a
+    single NOT EXISTS anti-join query. room_reservations holds exactly the
+    rooms of active regular and package bookings (app/utils/reservations.py),
+    so each room is one probe of its few reservations rather than a walk
+    through its whole booking history.
+    """
+    overlap = (
+        exists()
+        .where(
+            RoomReservation.room_id == Room.id,
+            RoomReservation.check_in < check_out,
+            RoomReservation.check_out > check_in,
+        )
+    )
+    query = db.query(Room).filter(
+        func.lower(func.coalesce(Room.status, "")) != "maintenance",
+        ~overlap,
+    )
+    if room_type:
+        query = query.filter(Room.type == room_type)
+    return query.order_by(Room.price.asc(), Room.id.asc()).all()
+
+
+def suggest_room_combinations(rooms: List[Room], adults: int, children: int, limit: int = 5) -> List[List[Room]]:
+    """
+    Capacity-aware suggestions for a party of `adults` + `children`.
+
+    Single rooms that fit the whole party are offered first (cheapest first).
+    When no single room is big enough, rooms are added greedily, largest adult
+    capacity first and cheapest among equals, until both limits are covered.
+    """
+    singles = [
+        [room] for room in rooms
+        if (room.adults or 0) >= adults and (room.children or 0) >= children
+    ]
+    if singles:
+        return singles[:limit]
+
+    combination = []
+    adult_capacity = children_capacity = 0
+    for room in sorted(rooms, key=lambda r: (-(r.adults or 0), -(r.children or 0), r.price or 0)):
+        if adult_capacity >= adults and children_capacity >= children:
+            break
+        # Skip rooms that add nothing to whichever limit is still uncovered
+        if adult_capacity >= adults and not room.children:
+            continue
+        if children_capacity >= children and not room.adults:
+            continue
+        combination.append(room)
+        adult_capacity += room.adults or 0
+        children_capacity += room.children or 0
+    if adult_capacity >= adults and children_capacity >= children:
+        return [combination]
+    return []
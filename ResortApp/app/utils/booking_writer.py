@@ -0,0 +1,141 @@
+"""
+Single-transaction write path for new bookings.
+
+Used by POST /bookings, POST /bookings/guest, POST /bookings/bulk and
+package booking. The guest user upsert (app/utils/guest_identity.py), the
+booking INSERT, the room links, the room reservations and the room status
+update are all flushed into ONE transaction and committed once, so a failure
+at any step leaves nothing behind. The committed objects
+stay loaded in memory, so the response is built without querying again.
+"""
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking, BookingRoom
+from app.models.Package import PackageBooking, PackageBookingRoom
+from app.models.room import Room
+from app.utils.daily_metrics import mark_stay_days
+from app.utils.events import record_event
+from app.utils.folio import mark_folio_bookings
+from app.utils.occupancy_grid import invalidate_occupancy_grid
+from app.utils.reservations import commit_reservations, flush_reservations, insert_reservations, reserve_rooms
+from app.utils.room_status import apply_room_statuses
+
+
+def _commit_keeping_state(db: Session, rooms: List[Room]):
+    """Commit without expiring loaded objects, so the response needs no reload."""
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        commit_reservations(db, rooms)
+    finally:
+        db.expire_on_commit = expire_on_commit
+
+
+def write_booking(
+    db: Session,
+    booking: Union[Booking, PackageBooking],
+    rooms: List[Room],
+    on_flush: Optional[Callable[[Union[Booking, PackageBooking]], None]] = None,
+) -> Union[Booking, PackageBooking]:
+    """
+    Insert `booking` (a new Booking or PackageBooking) holding `rooms` and
+    commit. Availability must already have been checked; an overlapping
+    reservation is still rejected at commit with the usual 400.
+
+    `on_flush(booking)` runs once the booking has its id, before commit, so
+    rows it adds (e.g. queued confirmation emails) commit with the booking.
+    """
+    room_ids = [room.id for room in rooms]
+    is_package = isinstance(booking, PackageBooking)
+    if is_package:
+        booking.rooms = [PackageBookingRoom(room=room) for room in rooms]
+    else:
+        booking.booking_rooms = [BookingRoom(room=room) for room in rooms]
+
+    # Booking INSERT ... RETURNING id, then one batched INSERT for the links
+    db.add(booking)
+    db.flush()
+
+    reserve_rooms(
+        db,
+        room_ids,
+        booking.check_in,
+        booking.check_out,
+        booking_id=booking.id if not is_package else None,
+        package_booking_id=booking.id if is_package else None,
+    )
+    flush_reservations(db, rooms)
+
+    # Bulk status update for the booked rooms, in the same transaction
+    apply_room_statuses(db, rooms)
+
+    if on_flush:
+        on_flush(booking)
+
+    _commit_keeping_state(db, rooms)
+    invalidate_occupancy_grid(booking.check_in, booking.check_out)
+    return booking
+
+
+def write_bookings(
+    db: Session,
+    bookings: Sequence[Tuple[dict, List[Room]]],
+    on_flush: Optional[Callable[[Booking, List[Room]], None]] = None,
+) -> List[Booking]:
+    """
+    write_booking() for many regular bookings at once. Each item is the
+    Booking column values and its rooms. Bookings, room links and
+    reservations go in as three executemany INSERTs, followed by one room
+    status UPDATE and a single commit. Returns the new bookings in input order.
+    """
+    if not bookings:
+        return []
+    new_bookings = db.scalars(
+        insert(Booking).returning(Booking, sort_by_parameter_order=True),
+        [values for values, _ in bookings],
+    ).all()
+
+    all_rooms = {}
+    links = []
+    reservations = []
+    for booking, (_, rooms) in zip(new_bookings, bookings):
+        for room in rooms:
+            all_rooms[room.id] = room
+            links.append({"booking_id": booking.id, "room_id": room.id})
+            reservations.append({
+                "room_id": room.id,
+                "booking_id": booking.id,
+                "check_in": booking.check_in,
+                "check_out": booking.check_out,
+            })
+        # The bulk INSERT bypasses the mapper events that publish and roll up single bookings
+        mark_stay_days(db, booking.check_in, booking.check_out)
+        record_event(
+            db,
+            "booking.created",
+            kind="room",
+            id=booking.id,
+            status=booking.status,
+            check_in=booking.check_in,
+            check_out=booking.check_out,
+        )
+    all_rooms = list(all_rooms.values())
+    db.execute(insert(BookingRoom), links)
+    mark_folio_bookings(db, [booking.id for booking in new_bookings])
+    insert_reservations(db, reservations, all_rooms)
+
+    apply_room_statuses(db, all_rooms)
+
+    if on_flush:
+        for booking, (_, rooms) in zip(new_bookings, bookings):
+            on_flush(booking, rooms)
+
+    # Read before commit expires them
+    first_check_in = min(booking.check_in for booking in new_bookings)
+    last_check_out = max(booking.check_out for booking in new_bookings)
+    _commit_keeping_state(db, all_rooms)
+    invalidate_occupancy_grid(first_check_in, last_check_out)
+    return new_bookings
@@ -0,0 +1,146 @@
+"""
+Bulk (group) booking for tour operators.
+
+A batch of BookingCreate payloads is validated with a fixed number of
+set-based queries - one for the rooms, one for every active stay overlapping
+the batch's date span, one for guest users and one for earlier guest names -
+and the accepted bookings are written in ONE transaction (write_bookings).
+Items are checked in order against an in-memory interval index, so bookings
+in the same batch cannot double-book each other. Rejected items are reported
+individually and do not stop the rest of the batch.
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking
+from app.models.room import Room
+from app.schemas.booking import BookingBulkItemResult, BookingCreate
+from app.utils.availability import Stay, load_room_index
+from app.utils.booking_writer import write_bookings
+from app.utils.guest_identity import upsert_guest_users
+
+MAX_BULK_BOOKINGS = 1000
+# Re-plans after a concurrent booking took one of the batch's rooms
+MAX_WRITE_ATTEMPTS = 3
+
+
+def _capacity_error(item: BookingCreate, rooms: List[Room]) -> Optional[str]:
+    total_adult_capacity = sum(room.adults or 0 for room in rooms)
+    total_children_capacity = sum(room.children or 0 for room in rooms)
+    if item.adults > total_adult_capacity:
+        return f"The number of adults ({item.adults}) exceeds the total adult capacity of the selected rooms ({total_adult_capacity} adults max). Please select additional rooms or reduce the number of adults."
+    if item.children > total_children_capacity:
+        return f"The number of children ({item.children}) exceeds the total children capacity of the selected rooms ({total_children_capacity} children max). Please select additional rooms or reduce the number of children."
+    return None
+
+
+def _previous_guest_names(db: Session, items: List[BookingCreate]) -> Dict[Tuple[str, str], str]:
+    """Latest guest_name per (email, mobile) among existing bookings, like create_booking reuses."""
+    emails = {item.guest_email for item in items if item.guest_email}
+    if not emails:
+        return {}
+    latest_ids = (
+        db.query(func.max(Booking.id))
+        .filter(Booking.guest_email.in_(emails))
+        .group_by(Booking.guest_email, Booking.guest_mobile)
+    )
+    rows = (
+        db.query(Booking.guest_email, Booking.guest_mobile, Booking.guest_name)
+        .filter(Booking.id.in_(latest_ids))
+        .all()
+    )
+    return {(email, mobile): name for email, mobile, name in rows}
+
+
+def _plan(
+    db: Session,
+    items: List[BookingCreate],
+) -> Tuple[List[Tuple[int, dict, List[Room]]], Dict[int, str]]:
+    """Split the batch into (index, Booking values, rooms) to insert and {index: error}."""
+    room_ids = {room_id for item in items for room_id in item.room_ids}
+    rooms_by_id = {room.id: room for room in db.query(Room).filter(Room.id.in_(room_ids)).all()} if room_ids else {}
+    index = load_room_index(
+        db,
+        rooms_by_id.keys(),
+        min(item.check_in for item in items),
+        max(item.check_out for item in items),
+    )
+
+    valid = []
+    errors = {}
+    for i, item in enumerate(items):
+        selected_rooms = [rooms_by_id[room_id] for room_id in dict.fromkeys(item.room_ids) if room_id in rooms_by_id]
+        if not item.room_ids or len(selected_rooms) != len(item.room_ids):
+            errors[i] = "One or more selected rooms are invalid."
+            continue
+        capacity_error = _capacity_error(item, selected_rooms)
+        if capacity_error:
+            errors[i] = capacity_error
+            continue
+        taken = next((room for room in selected_rooms if index.conflicts(room.id, item.check_in, item.check_out)), None)
+        if taken:
+            errors[i] = f"Room {taken.number} is not available for the selected dates."
+            continue
+        # Later items in the batch see this booking's rooms as taken
+        for room in selected_rooms:
+            index.add(room.id, Stay(item.check_in, item.check_out, 0, False))
+        valid.append((i, item, selected_rooms))
+
+    # Guest users only for the bookings that will be created
+    valid_items = [item for _, item, _ in valid]
+    guest_users = upsert_guest_users(db, [(item.guest_email, item.guest_mobile, item.guest_name) for item in valid_items])
+    previous_names = _previous_guest_names(db, valid_items)
+    accepted = [
+        (i, {
+            "guest_name": previous_names.get((item.guest_email, item.guest_mobile), item.guest_name),
+            "guest_mobile": item.guest_mobile,
+            "guest_email": item.guest_email,
+            "check_in": item.check_in,
+            "check_out": item.check_out,
+            "adults": item.adults,
+            "children": item.children,
+            "user_id": guest_user.id if guest_user else None,
+        }, selected_rooms)
+        for (i, item, selected_rooms), guest_user in zip(valid, guest_users)
+    ]
+    return accepted, errors
+
+
+def create_bulk_bookings(
+    db: Session,
+    items: List[BookingCreate],
+    on_flush: Optional[Callable[[Booking, List[Room]], None]] = None,
+) -> List[BookingBulkItemResult]:
+    """Validate and insert a batch of bookings; one result per item, in input order."""
+    if not items:
+        return []
+    if len(items) > MAX_BULK_BOOKINGS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_BOOKINGS} bookings can be created per request.")
+
+    for attempt in range(MAX_WRITE_ATTEMPTS):
+        accepted, errors = _plan(db, items)
+        try:
+            new_bookings = write_bookings(db, [(values, rooms) for _, values, rooms in accepted], on_flush=on_flush)
+            break
+        except HTTPException:
+            # A concurrent booking took one of the rooms after planning; the
+            # transaction was rolled back, so plan again against fresh data
+            if attempt == MAX_WRITE_ATTEMPTS - 1:
+                raise
+    if not accepted:
+        db.rollback()
+
+    created = {i: booking.id for (i, _, _), booking in zip(accepted, new_bookings)}
+    return [
+        BookingBulkItemResult(
+            index=i,
+            success=i in created,
+            booking_id=created.get(i),
+            display_id=f"BK-{str(created[i]).zfill(6)}" if i in created else None,
+            error=errors.get(i),
+        )
+        for i in range(len(items))
+    ]
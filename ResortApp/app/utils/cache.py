@@ -0,0 +1,282 @@
+"""
+In-process caches for catalog reads (rooms, packages, food items, CMS content).
+
+Each cache is a namespace - an LRU of results with a TTL - filled by the
+@cached decorator on a CRUD read function and tied to the tables it reads.
+A committed write to any of those tables drops the namespace:
+
+- writes are tracked per session, both ORM flushes and bulk
+  INSERT/UPDATE/DELETE statements, and acted on only after COMMIT;
+- this worker clears its own namespaces right away, and the other gunicorn
+  workers are told through PostgreSQL NOTIFY on CACHE_CHANNEL
+  (app/utils/pg_listener.py).
+
+The TTL is only a safety net for a missed notification. Cached ORM objects
+are detached from the session that loaded them, so every relationship the
+response needs must be eager-loaded by the cached function, and callers must
+treat the objects as read-only.
+
+SingleFlightCache is the simpler tool for aggregates that many clients poll
+(the dashboard KPIs): values just expire after a short TTL, and concurrent
+misses for a key share one computation.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, Hashable, Iterable, Optional, Set, Tuple, Union
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.utils import pg_listener
+
+CACHE_CHANNEL = "cache_invalidation"
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_MAXSIZE = 128
+
+_MISSING = object()
+
+
+class CacheNamespace:
+    """Thread-safe LRU cache with a TTL, cleared as a whole on invalidation."""
+
+    def __init__(self, name: str, tables: Iterable[str], maxsize: int = DEFAULT_MAXSIZE, ttl: float = DEFAULT_TTL_SECONDS):
+        self.name = name
+        self.tables = frozenset(tables)
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # Bumped on every clear, so a value computed before a write is not stored after it
+        self.generation = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default=_MISSING):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry[0] >= self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, value, generation: int):
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+class SingleFlightCache:
+    """
+    Thread-safe TTL cache that computes each missing or stale key once: the
+    first caller runs `compute`, concurrent callers for the same key wait for
+    its result. Not tied to table writes; values are at most `ttl` seconds old.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[Hashable, Tuple[float, object]] = {}
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self, key: Hashable):
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] >= self.ttl:
+            return _MISSING
+        return entry[1]
+
+    def get(self, key: Hashable, compute: Callable[[], object]) -> Tuple[object, bool]:
+        """(value, whether it came from the cache); an exception in `compute` is not cached."""
+        with self._lock:
+            value = self._fresh(key)
+            if value is not _MISSING:
+                return value, True
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                value = self._fresh(key)
+            if value is not _MISSING:
+                return value, True
+            value = compute()
+            with self._lock:
+                now = time.monotonic()
+                # Keys such as yesterday's date are never asked for again
+                self._entries = {k: e for k, e in self._entries.items() if now - e[0] < self.ttl}
+                self._entries[key] = (now, value)
+                self._key_locks = {k: lock for k, lock in self._key_locks.items() if k in self._entries}
+            return value, False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_namespaces: Dict[str, CacheNamespace] = {}
+# Tables some namespace reads, in any worker; only their writes are announced
+_watched_tables: Set[str] = set()
+_registry_lock = threading.Lock()
+
+
+def get_namespace(
+    name: str,
+    tables: Optional[Iterable[str]] = None,
+    maxsize: int = DEFAULT_MAXSIZE,
+    ttl: float = DEFAULT_TTL_SECONDS,
+) -> CacheNamespace:
+    """The namespace called `name`, created on first use; `tables` default to (name,)."""
+    namespace = _namespaces.get(name)
+    if namespace is None:
+        with _registry_lock:
+            namespace = _namespaces.get(name)
+            if namespace is None:
+                namespace = CacheNamespace(name, tables or (name,), maxsize, ttl)
+                _namespaces[name] = namespace
+                _watched_tables.update(namespace.tables)
+    return namespace
+
+
+def invalidate_tables(tables: Iterable[str]):
+    """Clear this worker's namespaces that read any of `tables`."""
+    tables = set(tables)
+    for namespace in list(_namespaces.values()):
+        if namespace.tables & tables:
+            namespace.clear()
+
+
+# ---- Decorator ----
+
+def _detach(db: Session, value):
+    """Expunge loaded ORM objects (and their loaded relationships) so they outlive `db`."""
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            _detach(db, item)
+        return
+    try:
+        state = inspect(value)
+    except Exception:
+        return
+    if not getattr(state, "mapper", None) or state.session is not db:
+        return
+    db.expunge(value)
+    for relationship in state.mapper.relationships:
+        if relationship.key in state.dict:
+            _detach(db, state.dict[relationship.key])
+
+
+def _has_pending_writes(db: Session, tables: frozenset) -> bool:
+    # Never cache what the caller's own uncommitted transaction can see
+    return bool(db.new or db.dirty or db.deleted or tables & db.info.get("cache_tables", set()))
+
+
+def cached(
+    namespace: Union[str, Callable[..., str]],
+    tables: Optional[Iterable[str]] = None,
+    maxsize: int = DEFAULT_MAXSIZE,
+    ttl: float = DEFAULT_TTL_SECONDS,
+    watch: Iterable[str] = (),
+):
+    """
+    Cache a CRUD read `func(db, *args, **kwargs)` by its arguments after `db`.
+
+    `namespace` is a name, or a callable receiving the same arguments as
+    `func` (e.g. to key the generic CMS reads by model). The namespace is
+    cleared when any of `tables` (default: the namespace name) is written.
+    A callable namespace lists in `watch` every table its namespaces may
+    read, so writes are announced to workers that have not filled them yet.
+    """
+    _watched_tables.update(watch)
+    if isinstance(namespace, str):
+        _watched_tables.update(tables or (namespace,))
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(db: Session, *args, **kwargs):
+            name = namespace(db, *args, **kwargs) if callable(namespace) else namespace
+            cache = get_namespace(name, tables, maxsize, ttl)
+            key = (func.__qualname__, args, tuple(sorted(kwargs.items())))
+            value = cache.get(key)
+            if value is not _MISSING:
+                return value
+            generation = cache.generation
+            value = func(db, *args, **kwargs)
+            if not _has_pending_writes(db, cache.tables):
+                _detach(db, value)
+                cache.set(key, value, generation)
+            return value
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
+
+
+# ---- Write tracking ----
+
+def _mark(session: Session, tables: Iterable[str]):
+    session.info.setdefault("cache_tables", set()).update(tables)
+
+
+def _tables_of(mapper) -> Set[str]:
+    return {table.name for table in mapper.tables}
+
+
+@event.listens_for(Session, "before_flush")
+def _track_flush(session, flush_context, instances):
+    tables = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        state = inspect(obj)
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        tables |= _tables_of(state.mapper)
+    if tables:
+        _mark(session, tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_statement(orm_execute_state):
+    # Query.update()/delete(), update(Model) and insert(Model) skip the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None and getattr(table, "name", None):
+            _mark(orm_execute_state.session, {table.name})
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    tables = session.info.pop("cache_tables", None)
+    if not tables:
+        return
+    tables &= _watched_tables
+    if not tables:
+        return
+    invalidate_tables(tables)
+    pg_listener.notify(CACHE_CHANNEL, json.dumps({"origin": pg_listener.WORKER_ID, "tables": sorted(tables)}))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_tracked_writes(session):
+    session.info.pop("cache_tables", None)
+
+
+def _on_notify(payload: str):
+    message = json.loads(payload)
+    if message.get("origin") != pg_listener.WORKER_ID:
+        invalidate_tables(message.get("tables", []))
+
+
+def start_cache_listener():
+    """Receive other workers' invalidations (PostgreSQL only; a no-op on SQLite)."""
+    pg_listener.listen(CACHE_CHANNEL, _on_notify)
+    pg_listener.start_listener()
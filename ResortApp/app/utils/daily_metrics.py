@@ -0,0 +1,363 @@
+"""
+Daily metrics rollup for the dashboard.
+
+DailyMetric rows hold the dashboard's figures per day, in three groups that
+are each recomputed from their source table for the days a write touched:
+
+- CHECKOUT_METRICS, by checkout date: billed room, package, food, service,
+  tax and grand-total revenue, and the number of checkouts;
+- STAY_METRICS, by stay date, over regular and package bookings that are not
+  cancelled: rooms sold (room-nights), arrivals and departures;
+- FOOD_METRICS, by order date: food orders and their value, cancelled
+  orders excluded.
+
+Writes mark (group, day) pairs on the session through mapper events, as the
+folios do (app/utils/folio.py). Just before the session commits, the marked
+days' rows are locked, recomputed with date-range queries and written in the
+same transaction. Each recomputed day adds its change to the metric's
+ALL_TIME row, so all-time totals are a single row as well. Dashboards read
+a handful of rows whatever the history size. backfill_daily_metrics.py
+builds the rows for existing data and repairs the ALL_TIME rows.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, func, inspect, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, object_session
+
+from app.models.booking import Booking, BookingRoom
+from app.models.checkout import Checkout
+from app.models.daily_metric import DailyMetric
+from app.models.foodorder import FoodOrder
+from app.models.Package import PackageBooking, PackageBookingRoom
+from app.utils.tax import PAISA, ZERO, money
+
+# The day of the running all-time totals
+ALL_TIME = date.min
+
+CHECKOUT = "checkout"
+STAY = "stay"
+FOOD = "food"
+
+CHECKOUT_METRICS = (
+    "revenue_room",
+    "revenue_package",
+    "revenue_food",
+    "revenue_service",
+    "revenue_tax",
+    "revenue_total",
+    "checkouts",
+)
+STAY_METRICS = ("rooms_sold", "arrivals", "departures")
+FOOD_METRICS = ("food_orders", "food_revenue")
+GROUP_METRICS = {CHECKOUT: CHECKOUT_METRICS, STAY: STAY_METRICS, FOOD: FOOD_METRICS}
+
+# session.info keys: {group: set of days}, and bookings whose stay dates are resolved at commit
+_DAYS = "metric_days"
+_STAY_BOOKINGS = "metric_stay_bookings"
+
+
+def _as_day(value) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+
+def _amount(value) -> Decimal:
+    """A summed column as stored: Decimal to the paisa (float sums carry noise)."""
+    return money(value).quantize(PAISA)
+
+
+def _stay_dates(check_in: Optional[date], check_out: Optional[date]) -> List[date]:
+    """Dates a stay counts on: every night and the departure day."""
+    if not check_in or not check_out:
+        return [d for d in (check_in, check_out) if d]
+    nights = max(0, (check_out - check_in).days)
+    return [check_in + timedelta(days=i) for i in range(nights)] + [check_out]
+
+
+# ---- Marking ----
+
+def mark_metric_days(session: Optional[Session], group: str, days: Iterable):
+    """Days whose `group` metrics a write changed (e.g. through a bulk statement)."""
+    if session is None:
+        return
+    marked = session.info.setdefault(_DAYS, {}).setdefault(group, set())
+    marked.update(day for day in map(_as_day, days) if day is not None)
+
+
+def mark_stay_days(session: Optional[Session], check_in: Optional[date], check_out: Optional[date]):
+    """Stay dates of a booking written through a bulk statement."""
+    mark_metric_days(session, STAY, _stay_dates(check_in, check_out))
+
+
+def _history(target, attribute: str) -> list:
+    """Current and, if it changed in this flush, previous value of `attribute`."""
+    history = inspect(target).attrs[attribute].history
+    return [getattr(target, attribute)] + list(history.deleted or ())
+
+
+def _changed(target, *attributes) -> bool:
+    state = inspect(target)
+    return any(state.attrs[name].history.has_changes() for name in attributes)
+
+
+def _checkout_written(mapper, connection, target):
+    mark_metric_days(object_session(target), CHECKOUT, _history(target, "checkout_date"))
+
+
+def _checkout_updated(mapper, connection, target):
+    if _changed(target, "checkout_date", "room_total", "package_total", "food_total",
+                "service_total", "tax_amount", "grand_total"):
+        _checkout_written(mapper, connection, target)
+
+
+def _stay_written(mapper, connection, target):
+    check_ins, check_outs = _history(target, "check_in"), _history(target, "check_out")
+    # The stay before and after the change: both sets of dates move
+    days = _stay_dates(check_ins[0], check_outs[0]) + _stay_dates(check_ins[-1], check_outs[-1])
+    mark_metric_days(object_session(target), STAY, days)
+
+
+def _stay_updated(mapper, connection, target):
+    if _changed(target, "status", "check_in", "check_out"):
+        _stay_written(mapper, connection, target)
+
+
+def _room_link_written(is_package: bool, attribute: str):
+    def mark(mapper, connection, target):
+        session = object_session(target)
+        if session is not None:
+            bookings = session.info.setdefault(_STAY_BOOKINGS, set())
+            bookings.update((is_package, booking_id) for booking_id in _history(target, attribute) if booking_id)
+    return mark
+
+
+def _food_order_written(mapper, connection, target):
+    mark_metric_days(object_session(target), FOOD, _history(target, "created_at"))
+
+
+def _food_order_updated(mapper, connection, target):
+    if _changed(target, "created_at", "amount", "status"):
+        _food_order_written(mapper, connection, target)
+
+
+for _event in ("after_insert", "after_delete"):
+    event.listen(Checkout, _event, _checkout_written)
+    event.listen(Booking, _event, _stay_written)
+    event.listen(PackageBooking, _event, _stay_written)
+    event.listen(BookingRoom, _event, _room_link_written(False, "booking_id"))
+    event.listen(PackageBookingRoom, _event, _room_link_written(True, "package_booking_id"))
+    event.listen(FoodOrder, _event, _food_order_written)
+event.listen(Checkout, "after_update", _checkout_updated)
+event.listen(Booking, "after_update", _stay_updated)
+event.listen(PackageBooking, "after_update", _stay_updated)
+event.listen(FoodOrder, "after_update", _food_order_updated)
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_marked_metrics(session: Session):
+    # Pending changes fire the mapper events above before the marks are read
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    bookings = session.info.pop(_STAY_BOOKINGS, None)
+    if bookings:
+        for model, is_package in ((Booking, False), (PackageBooking, True)):
+            ids = [booking_id for package, booking_id in bookings if package is is_package]
+            if ids:
+                for check_in, check_out in session.execute(
+                    select(model.check_in, model.check_out).where(model.id.in_(ids))
+                ):
+                    mark_metric_days(session, STAY, _stay_dates(check_in, check_out))
+    days = session.info.pop(_DAYS, None)
+    if days:
+        refresh_daily_metrics(session, days)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_metric_marks(session: Session):
+    session.info.pop(_DAYS, None)
+    session.info.pop(_STAY_BOOKINGS, None)
+
+
+# ---- Computing ----
+
+def _spans(days: Iterable[date]) -> List[Tuple[date, date]]:
+    """Sorted days as runs of consecutive days, (first, last), so far-apart days don't scan the gap."""
+    spans: List[list] = []
+    for day in sorted(set(days)):
+        if spans and (day - spans[-1][1]).days == 1:
+            spans[-1][1] = day
+        else:
+            spans.append([day, day])
+    return [(first, last) for first, last in spans]
+
+
+def _checkout_metrics(db: Session, first: date, last: date) -> Dict[Tuple[date, str], Decimal]:
+    checkout_day = func.date(Checkout.checkout_date)
+    rows = db.execute(
+        select(
+            checkout_day,
+            func.sum(Checkout.room_total),
+            func.sum(Checkout.package_total),
+            func.sum(Checkout.food_total),
+            func.sum(Checkout.service_total),
+            func.sum(Checkout.tax_amount),
+            func.sum(Checkout.grand_total),
+            func.count(Checkout.id),
+        )
+        .where(Checkout.checkout_date >= first, Checkout.checkout_date < last + timedelta(days=1))
+        .group_by(checkout_day)
+    )
+    values = {}
+    for day, *sums in rows:
+        for metric, total in zip(CHECKOUT_METRICS, sums):
+            values[(_as_day(day), metric)] = _amount(total)
+    return values
+
+
+def _stay_metrics(db: Session, first: date, last: date) -> Dict[Tuple[date, str], Decimal]:
+    values: Dict[Tuple[date, str], Decimal] = defaultdict(lambda: ZERO)
+    sources = (
+        (Booking, BookingRoom, BookingRoom.booking_id),
+        (PackageBooking, PackageBookingRoom, PackageBookingRoom.package_booking_id),
+    )
+    for model, link, link_booking_id in sources:
+        rows = db.execute(
+            select(model.check_in, model.check_out, func.count(link.id))
+            .outerjoin(link, link_booking_id == model.id)
+            .where(
+                or_(model.status.is_(None), model.status != "cancelled"),
+                model.check_in <= last,
+                model.check_out >= first,
+            )
+            .group_by(model.id, model.check_in, model.check_out)
+        )
+        for check_in, check_out, rooms in rows:
+            if first <= check_in <= last:
+                values[(check_in, "arrivals")] += 1
+            if first <= check_out <= last:
+                values[(check_out, "departures")] += 1
+            night = max(check_in, first)
+            while night < check_out and night <= last:
+                values[(night, "rooms_sold")] += rooms
+                night += timedelta(days=1)
+    return values
+
+
+def _food_metrics(db: Session, first: date, last: date) -> Dict[Tuple[date, str], Decimal]:
+    order_day = func.date(FoodOrder.created_at)
+    rows = db.execute(
+        select(order_day, func.count(FoodOrder.id), func.sum(FoodOrder.amount))
+        .where(
+            FoodOrder.created_at >= first,
+            FoodOrder.created_at < last + timedelta(days=1),
+            or_(FoodOrder.status.is_(None), FoodOrder.status != "cancelled"),
+        )
+        .group_by(order_day)
+    )
+    values = {}
+    for day, count, amount in rows:
+        values[(_as_day(day), "food_orders")] = _amount(count)
+        values[(_as_day(day), "food_revenue")] = _amount(amount)
+    return values
+
+
+_COMPUTE = {CHECKOUT: _checkout_metrics, STAY: _stay_metrics, FOOD: _food_metrics}
+
+
+def _insert_ignoring_conflicts(db: Session):
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(DailyMetric).on_conflict_do_nothing()
+
+
+def refresh_daily_metrics(db: Session, days_by_group: Dict[str, Iterable[date]]):
+    """
+    Recompute the metrics of these days ({group: days}) in the current
+    transaction, and move the ALL_TIME rows by the difference.
+    """
+    wanted = {
+        (day, metric)
+        for group, days in days_by_group.items()
+        for day in days
+        for metric in GROUP_METRICS[group]
+    }
+    if not wanted:
+        return
+    metrics = {metric for _, metric in wanted}
+    days = {day for day, _ in wanted}
+
+    # Create missing rows at zero, then lock every row involved in a fixed order
+    db.execute(
+        _insert_ignoring_conflicts(db),
+        [{"day": day, "metric": metric, "value": 0} for day, metric in sorted(wanted | {(ALL_TIME, m) for m in metrics})],
+    )
+    rows = db.execute(
+        select(DailyMetric.id, DailyMetric.day, DailyMetric.metric, DailyMetric.value)
+        .where(DailyMetric.day.in_(days | {ALL_TIME}), DailyMetric.metric.in_(metrics))
+        .order_by(DailyMetric.day, DailyMetric.metric)
+        .with_for_update()
+    ).all()
+    current = {(row.day, row.metric): row for row in rows}
+
+    computed: Dict[Tuple[date, str], Decimal] = {}
+    for group, group_days in days_by_group.items():
+        for first, last in _spans(group_days):
+            computed.update(_COMPUTE[group](db, first, last))
+
+    now = datetime.utcnow()
+    values = []
+    all_time_change: Dict[str, Decimal] = defaultdict(lambda: ZERO)
+    for key in sorted(wanted):
+        row = current[key]
+        change = computed.get(key, ZERO) - row.value
+        if change:
+            values.append({"id": row.id, "value": row.value + change, "updated_at": now})
+            all_time_change[key[1]] += change
+    for metric, change in all_time_change.items():
+        row = current[(ALL_TIME, metric)]
+        values.append({"id": row.id, "value": row.value + change, "updated_at": now})
+    if values:
+        db.execute(update(DailyMetric), values)
+
+
+def rebuild_all_time(db: Session):
+    """Set every ALL_TIME row to the sum of its metric's day rows."""
+    totals = dict(db.execute(
+        select(DailyMetric.metric, func.sum(DailyMetric.value))
+        .where(DailyMetric.day != ALL_TIME)
+        .group_by(DailyMetric.metric)
+    ).all())
+    if not totals:
+        return
+    db.execute(
+        _insert_ignoring_conflicts(db),
+        [{"day": ALL_TIME, "metric": metric, "value": 0} for metric in sorted(totals)],
+    )
+    now = datetime.utcnow()
+    for metric, total in totals.items():
+        db.execute(
+            update(DailyMetric)
+            .where(DailyMetric.day == ALL_TIME, DailyMetric.metric == metric)
+            .values(value=_amount(total), updated_at=now)
+        )
+
+
+# ---- Reading ----
+
+def read_metrics(db: Session, days: Iterable[date], metrics: Iterable[str]) -> Dict[Tuple[date, str], Decimal]:
+    """{(day, metric): value} for the given days (ALL_TIME for all-time totals); missing rows read as zero."""
+    days, metrics = list(days), list(metrics)
+    values: Dict[Tuple[date, str], Decimal] = defaultdict(lambda: ZERO)
+    rows = db.execute(
+        select(DailyMetric.day, DailyMetric.metric, DailyMetric.value)
+        .where(DailyMetric.day.in_(days), DailyMetric.metric.in_(metrics))
+    )
+    for day, metric, value in rows:
+        values[(_as_day(day), metric)] = value
+    return values
@@ -0,0 +1,201 @@
+"""
+Transactional email outbox.
+
+Request handlers call queue_email() inside the transaction that creates the
+booking, so the email row commits (or rolls back) together with it and the
+request never waits on SMTP. A background thread in each worker drains the
+outbox in batches over one persistent, authenticated SMTP connection. Failed
+sends are retried with exponential backoff; rows are claimed with
+FOR UPDATE SKIP LOCKED so several workers never send the same email.
+"""
+import os
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from app.models.email_outbox import EmailOutbox
+from app.utils.email import build_message, get_smtp_config, open_smtp_connection, smtp_configured
+
+BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "20"))
+POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "5"))
+MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+# Close the SMTP connection after this long without sending
+IDLE_DISCONNECT_SECONDS = 60
+
+# Errors that mean the connection itself is unusable; the rest of the batch waits
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, smtplib.SMTPAuthenticationError)
+
+
+def _is_connection_error(error: Exception) -> bool:
+    # SMTPException subclasses OSError, so only non-SMTP OSErrors (socket errors) count here
+    return isinstance(error, CONNECTION_ERRORS) or (
+        isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+    )
+
+
+_wakeup = threading.Event()
+_sender_thread: Optional[threading.Thread] = None
+_sender_lock = threading.Lock()
+
+
+def queue_email(
+    db: Session,
+    to_email: str,
+    subject: str,
+    html_content: str,
+    to_name: Optional[str] = None,
+) -> EmailOutbox:
+    """Add an email to the outbox as part of the caller's transaction."""
+    row = EmailOutbox(to_email=to_email, to_name=to_name, subject=subject, html_content=html_content)
+    db.add(row)
+    db.info["email_queued"] = True
+    return row
+
+
+def notify_sender():
+    _wakeup.set()
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_sender_after_commit(session):
+    if session.info.pop("email_queued", False):
+        notify_sender()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_queued_email(session):
+    session.info.pop("email_queued", None)
+
+
+class SmtpSession:
+    """One SMTP connection reused across batches and reopened when it drops."""
+
+    def __init__(self):
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+    def _connection(self, config: dict) -> smtplib.SMTP:
+        if self._server is not None:
+            try:
+                self._server.noop()
+            except (smtplib.SMTPException, OSError):
+                self.close()
+        if self._server is None:
+            self._server = open_smtp_connection(config)
+        self._last_used = time.monotonic()
+        return self._server
+
+    def send(self, config: dict, row: EmailOutbox):
+        msg = build_message(config, row.to_email, row.subject, row.html_content, row.to_name)
+        self._connection(config).send_message(msg)
+
+    def close_if_idle(self):
+        if self._server is not None and time.monotonic() - self._last_used > IDLE_DISCONNECT_SECONDS:
+            self.close()
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._server = None
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def send_pending_batch(db: Session, smtp: SmtpSession, config: Optional[dict] = None) -> int:
+    """
+    Claim up to BATCH_SIZE due emails, send them and record the outcome.
+    Returns the number of rows claimed (0 when the outbox is drained).
+    """
+    config = config or get_smtp_config()
+    rows = (
+        db.query(EmailOutbox)
+        .filter(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= datetime.utcnow())
+        .order_by(EmailOutbox.id)
+        .limit(BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not rows:
+        db.rollback()
+        return 0
+
+    if not smtp_configured(config):
+        for row in rows:
+            print(f"[Email] SMTP not configured. Would send email to {row.to_email}: {row.subject}")
+            row.status = "skipped"
+            row.last_error = "SMTP not configured"
+        db.commit()
+        return len(rows)
+
+    claimed = len(rows)
+    for row in rows:
+        row.attempts += 1
+        try:
+            smtp.send(config, row)
+        except Exception as e:
+            row.last_error = str(e)
+            if isinstance(e, smtplib.SMTPRecipientsRefused) or row.attempts >= MAX_ATTEMPTS:
+                row.status = "failed"
+            else:
+                row.next_attempt_at = datetime.utcnow() + _backoff(row.attempts)
+            print(f"[Email] Failed to send email to {row.to_email} (attempt {row.attempts}/{MAX_ATTEMPTS}): {str(e)}")
+            if _is_connection_error(e):
+                # Leave the rest of the batch for the next run
+                smtp.close()
+                claimed = 0
+                break
+            continue
+        row.status = "sent"
+        row.sent_at = datetime.utcnow()
+        row.last_error = None
+        print(f"[Email] Successfully sent email to {row.to_email}: {row.subject}")
+    db.commit()
+    return claimed
+
+
+def outbox_counts(db: Session) -> Dict[str, int]:
+    return dict(db.query(EmailOutbox.status, func.count(EmailOutbox.id)).group_by(EmailOutbox.status).all())
+
+
+# ---- Background sender ----
+
+def _sender_loop():
+    from app.database import SessionLocal
+    smtp = SmtpSession()
+    while True:
+        _wakeup.wait(POLL_SECONDS)
+        _wakeup.clear()
+        db = SessionLocal()
+        try:
+            # Keep going while full batches come back
+            while send_pending_batch(db, smtp) >= BATCH_SIZE:
+                pass
+        except Exception as e:
+            db.rollback()
+            print(f"[Email] Outbox sender error: {str(e)}")
+        finally:
+            db.close()
+        smtp.close_if_idle()
+
+
+def start_email_sender():
+    """Start this worker's outbox sender thread (once)."""
+    global _sender_thread
+    with _sender_lock:
+        if _sender_thread is not None and _sender_thread.is_alive():
+            return
+        _sender_thread = threading.Thread(target=_sender_loop, name="email-outbox-sender", daemon=True)
+        _sender_thread.start()
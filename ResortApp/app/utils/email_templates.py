@@ -0,0 +1,162 @@
+"""
+Email rendering with compiled Jinja2 templates.
+
+Templates live in app/templates/email and are compiled once per worker
+(warm_email_templates() at startup) into the environment's LRU template
+cache; auto-reload is off so a render never touches the filesystem. The
+stylesheet and the header/footer fragments are static, so they are built
+once and injected as ready-made markup instead of being re-rendered for
+every message. Renderers take typed context objects (dataclasses below).
+"""
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import List, Optional
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+
+from app.utils.tax import BOOKING_QUOTE, money, tax_for, tax_rate
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "email")
+TEMPLATE_CACHE_SIZE = 64
+
+_EMAIL_CSS = """
+body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px; }
+.header { background: linear-gradient(135deg, #f59e0b, #d97706); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }
+.content { background: #f9fafb; padding: 30px; border-radius: 0 0 10px 10px; }
+.booking-details { background: white; padding: 20px; border-radius: 8px; margin: 20px 0; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
+.detail-row { padding: 10px 0; border-bottom: 1px solid #e5e7eb; }
+.detail-row:last-child { border-bottom: none; }
+.detail-label { font-weight: bold; color: #6b7280; display: inline-block; width: 150px; }
+.detail-value { color: #111827; }
+.rooms-list { list-style: none; padding: 0; }
+.rooms-list li { padding: 8px 0; border-bottom: 1px solid #e5e7eb; }
+.rooms-list li:last-child { border-bottom: none; }
+.footer { text-align: center; padding: 20px; color: #6b7280; font-size: 14px; }
+.highlight { background: #fef3c7; padding: 15px; border-left: 4px solid #f59e0b; margin: 20px 0; border-radius: 4px; }
+"""
+
+# Collapsed once at import; emails carry it inline
+EMAIL_CSS = Markup(re.sub(r"\s*\n\s*", "", _EMAIL_CSS))
+
+
+@lru_cache(maxsize=16)
+def email_header(subtitle: str) -> Markup:
+    return Markup(
+        '<div class="header"><h1>✨ Elysian Retreat</h1><p>{}</p></div>'
+    ).format(subtitle)
+
+
+@lru_cache(maxsize=4)
+def email_footer(year: int) -> Markup:
+    return Markup(
+        '<div class="footer">'
+        '<p>This is an automated confirmation email. Please do not reply to this email.</p>'
+        '<p>&copy; {} Elysian Retreat. All rights reserved.</p>'
+        '</div>'
+    ).format(year)
+
+
+def format_inr(amount) -> str:
+    return f"₹{amount or 0:,.2f}"
+
+
+def _current_year() -> int:
+    return datetime.now().year
+
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(["html"]),
+    cache_size=TEMPLATE_CACHE_SIZE,
+    auto_reload=False,
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+_env.filters["inr"] = format_inr
+_env.globals.update(
+    email_css=EMAIL_CSS,
+    email_header=email_header,
+    email_footer=email_footer,
+    current_year=_current_year,
+)
+
+
+# ---- Typed contexts ----
+
+@dataclass
+class RoomLine:
+    number: str = "N/A"
+    type: str = "N/A"
+    price: float = 0.0
+
+
+@dataclass
+class BookingConfirmationContext:
+    guest_name: str
+    booking_id: int
+    booking_type: str  # 'room' or 'package'
+    check_in: str
+    check_out: str
+    rooms: List[RoomLine] = field(default_factory=list)
+    total_amount: Optional[float] = None
+    package_name: Optional[str] = None
+    adults: Optional[int] = None
+    children: Optional[int] = None
+    guest_mobile: Optional[str] = None
+    room_charges: Optional[float] = None
+    package_charges: Optional[float] = None
+    stay_nights: Optional[int] = None
+
+    template = "booking_confirmation.html"
+
+    @property
+    def formatted_booking_id(self) -> str:
+        # Format booking ID (BK-000001 or PK-000001)
+        prefix = "BK" if self.booking_type == "room" else "PK"
+        return f"{prefix}-{str(self.booking_id).zfill(6)}"
+
+    @property
+    def booking_title(self) -> str:
+        return f"Package: {self.package_name}" if self.booking_type == "package" and self.package_name else "Room Booking"
+
+    @property
+    def total(self) -> Optional[float]:
+        """Total amount, derived from the charges when not given."""
+        if self.total_amount is not None:
+            return self.total_amount
+        if self.booking_type == "package" and self.package_charges:
+            return self.package_charges
+        if self.room_charges:
+            return self.room_charges
+        if self.rooms:
+            return sum(room.price * (self.stay_nights or 1) for room in self.rooms)
+        return None
+
+    @property
+    def tax(self) -> Decimal:
+        # The estimated tax line; its rate comes from the tax rules (app/utils/tax.py)
+        return tax_for(BOOKING_QUOTE, self.total)
+
+    @property
+    def tax_percent(self) -> str:
+        return f"{(tax_rate(BOOKING_QUOTE, self.total) * 100).normalize():f}"
+
+    @property
+    def grand_total(self) -> Decimal:
+        return money(self.total) + self.tax
+
+
+def render_email(ctx) -> str:
+    """Render `ctx` with its template (ctx.template) from the compiled cache."""
+    return _env.get_template(ctx.template).render(ctx=ctx)
+
+
+def warm_email_templates():
+    """Compile every email template into the cache (called once per worker at startup)."""
+    for name in _env.list_templates(extensions=["html"]):
+        _env.get_template(name)
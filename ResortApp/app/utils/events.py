@@ -0,0 +1,322 @@
+"""
+Live change events for the admin dashboard.
+
+Writes to bookings, package bookings, checkouts, food orders, assigned
+services and room statuses record a compact delta on the session (mapper
+events, plus explicit record_event() calls for bulk statements that bypass
+them). The deltas are published only after the transaction commits - a
+rolled-back write never reaches a client - to:
+
+- this worker's EventBus, which fans them out to every open
+  GET /api/events/stream (Server-Sent Events) connection, and
+- the other gunicorn workers through PostgreSQL NOTIFY on EVENT_CHANNEL
+  (app/utils/pg_listener.py), whose listener republishes them locally.
+
+Event ids are "<worker id>:<sequence>", numbered by each worker's bus. A
+client that falls behind (full queue), or reconnects with a Last-Event-ID
+from another worker or one this worker no longer remembers, gets a "resync"
+event and reloads its lists.
+"""
+import asyncio
+import itertools
+import json
+import threading
+from collections import deque
+from datetime import date, datetime
+from enum import Enum
+from typing import Iterable, List, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from app.models.booking import Booking
+from app.models.checkout import Checkout
+from app.models.foodorder import FoodOrder
+from app.models.Package import PackageBooking
+from app.models.room import Room
+from app.models.service import AssignedService
+from app.utils import pg_listener
+
+EVENT_CHANNEL = "resort_events"
+# Events kept for clients that reconnect with Last-Event-ID
+REPLAY_BUFFER_SIZE = 1000
+SUBSCRIBER_QUEUE_SIZE = 500
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+class EventBus:
+    """Per-worker fan-out of events to the connected SSE clients."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._sequence = itertools.count(1)
+        self._recent = deque(maxlen=REPLAY_BUFFER_SIZE)
+
+    def subscribe(self) -> "Subscription":
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: "Subscription"):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, events: Iterable[dict]):
+        """Deliver events to every subscriber; safe to call from any thread."""
+        with self._lock:
+            numbered = [(next(self._sequence), e) for e in events]
+            self._recent.extend(numbered)
+            subscribers = list(self._subscribers)
+        if not numbered:
+            return
+        for subscription in subscribers:
+            subscription.push(numbered)
+
+    def since(self, last_id: int) -> Optional[List[tuple]]:
+        """Events after `last_id`, or None when they are no longer buffered."""
+        with self._lock:
+            recent = list(self._recent)
+        latest = recent[-1][0] if recent else 0
+        if last_id == latest:
+            return []
+        # Ahead of us: an id this bus never issued
+        if last_id > latest or recent[0][0] > last_id + 1:
+            return None
+        return [item for item in recent if item[0] > last_id]
+
+
+class Subscription:
+    """One SSE connection's queue, fed from other threads via its event loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def push(self, numbered: List[tuple]):
+        try:
+            self.loop.call_soon_threadsafe(self._put, numbered)
+        except RuntimeError:
+            # Loop already closed; the stream is gone
+            pass
+
+    def _put(self, numbered: List[tuple]):
+        for item in numbered:
+            try:
+                self.queue.put_nowait(item)
+            except asyncio.QueueFull:
+                # Too slow to keep up: drop the backlog and tell it to reload
+                self.overflowed = True
+                return
+
+
+bus = EventBus()
+
+
+# ---- Recording ----
+
+def record_event(session: Session, event_type: str, **data):
+    """Queue an event on `session`; it is published when the transaction commits."""
+    session.info.setdefault("pending_events", []).append({"type": event_type, **data})
+
+
+def _record(target, event_type: str, **data):
+    session = object_session(target)
+    if session is not None:
+        record_event(session, event_type, **data)
+
+
+def _changed(target, *attributes) -> bool:
+    """True when any of `attributes` (default: any column) changed in this flush."""
+    state = inspect(target)
+    names = attributes or [attr.key for attr in state.mapper.column_attrs]
+    return any(state.attrs[name].history.has_changes() for name in names)
+
+
+def _booking_data(target) -> dict:
+    return {
+        "id": target.id,
+        "status": target.status,
+        "check_in": target.check_in,
+        "check_out": target.check_out,
+    }
+
+
+@event.listens_for(Booking, "after_insert")
+def _booking_created(mapper, connection, target):
+    _record(target, "booking.created", kind="room", **_booking_data(target))
+
+
+@event.listens_for(PackageBooking, "after_insert")
+def _package_booking_created(mapper, connection, target):
+    _record(target, "booking.created", kind="package", **_booking_data(target))
+
+
+@event.listens_for(Booking, "after_update")
+def _booking_updated(mapper, connection, target):
+    # Check-in, cancel, checkout and stay extensions; not every touched column
+    if _changed(target, "status", "check_in", "check_out"):
+        _record(target, "booking.updated", kind="room", **_booking_data(target))
+
+
+@event.listens_for(PackageBooking, "after_update")
+def _package_booking_updated(mapper, connection, target):
+    if _changed(target, "status", "check_in", "check_out"):
+        _record(target, "booking.updated", kind="package", **_booking_data(target))
+
+
+@event.listens_for(Booking, "after_delete")
+def _booking_deleted(mapper, connection, target):
+    _record(target, "booking.deleted", kind="room", id=target.id)
+
+
+@event.listens_for(PackageBooking, "after_delete")
+def _package_booking_deleted(mapper, connection, target):
+    _record(target, "booking.deleted", kind="package", id=target.id)
+
+
+@event.listens_for(Checkout, "after_insert")
+def _checkout_created(mapper, connection, target):
+    _record(
+        target,
+        "checkout.created",
+        id=target.id,
+        booking_id=target.booking_id,
+        package_booking_id=target.package_booking_id,
+        room_number=target.room_number,
+        grand_total=target.grand_total,
+    )
+
+
+def _food_order_data(target) -> dict:
+    return {
+        "id": target.id,
+        "room_id": target.room_id,
+        "amount": target.amount,
+        "status": target.status,
+        "billing_status": target.billing_status,
+    }
+
+
+@event.listens_for(FoodOrder, "after_insert")
+def _food_order_created(mapper, connection, target):
+    _record(target, "food_order.created", **_food_order_data(target))
+
+
+@event.listens_for(FoodOrder, "after_update")
+def _food_order_updated(mapper, connection, target):
+    if _changed(target):
+        _record(target, "food_order.updated", **_food_order_data(target))
+
+
+@event.listens_for(FoodOrder, "after_delete")
+def _food_order_deleted(mapper, connection, target):
+    _record(target, "food_order.deleted", id=target.id, room_id=target.room_id)
+
+
+def _service_data(target) -> dict:
+    return {
+        "id": target.id,
+        "service_id": target.service_id,
+        "employee_id": target.employee_id,
+        "room_id": target.room_id,
+        "status": target.status,
+        "billing_status": target.billing_status,
+    }
+
+
+@event.listens_for(AssignedService, "after_insert")
+def _service_assigned(mapper, connection, target):
+    _record(target, "service.assigned", **_service_data(target))
+
+
+@event.listens_for(AssignedService, "after_update")
+def _service_updated(mapper, connection, target):
+    if _changed(target):
+        _record(target, "service.updated", **_service_data(target))
+
+
+@event.listens_for(AssignedService, "after_delete")
+def _service_deleted(mapper, connection, target):
+    _record(target, "service.deleted", id=target.id, room_id=target.room_id)
+
+
+@event.listens_for(Room, "after_update")
+def _room_updated(mapper, connection, target):
+    if _changed(target, "status"):
+        _record(target, "room.status", id=target.id, status=target.status)
+
+
+def record_room_statuses(session: Session, changed: dict):
+    """Room status changes made by a bulk UPDATE ({room_id: status})."""
+    for room_id, status in changed.items():
+        record_event(session, "room.status", id=room_id, status=status)
+
+
+# ---- Publishing ----
+
+def _notify_other_workers(events: List[dict]):
+    # Split so every NOTIFY stays under PostgreSQL's payload limit
+    chunk: List[str] = []
+    size = 0
+    for e in events:
+        encoded = json.dumps(e, default=_json_default, separators=(",", ":"))
+        if chunk and size + len(encoded) > pg_listener.MAX_PAYLOAD_BYTES - 100:
+            _send(chunk)
+            chunk, size = [], 0
+        chunk.append(encoded)
+        size += len(encoded) + 1
+    if chunk:
+        _send(chunk)
+
+
+def _send(encoded_events: List[str]):
+    payload = '{"origin":%s,"events":[%s]}' % (json.dumps(pg_listener.WORKER_ID), ",".join(encoded_events))
+    pg_listener.notify(EVENT_CHANNEL, payload)
+
+
+def publish_events(events: List[dict]):
+    if not events:
+        return
+    # Round-trip through JSON so local and remote subscribers see the same values
+    events = json.loads(json.dumps(events, default=_json_default))
+    bus.publish(events)
+    _notify_other_workers(events)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session):
+    events = session.info.pop("pending_events", None)
+    if events:
+        try:
+            publish_events(events)
+        except Exception as e:
+            # Never fail a committed write because of the live feed
+            print(f"Failed to publish events: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_events(session):
+    session.info.pop("pending_events", None)
+
+
+def _on_notify(payload: str):
+    message = json.loads(payload)
+    if message.get("origin") == pg_listener.WORKER_ID:
+        return
+    bus.publish(message.get("events", []))
+
+
+def start_event_listener():
+    """Receive other workers' events (PostgreSQL only; a no-op on SQLite)."""
+    pg_listener.listen(EVENT_CHANNEL, _on_notify)
+    pg_listener.start_listener()
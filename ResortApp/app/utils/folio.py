@@ -0,0 +1,340 @@
+"""
+Running folio totals per booking.
+
+Every active regular or package booking has a BookingFolio row with its
+room, package, food and service subtotals, kept current in the transaction
+that changes them:
+
+- mapper events on food orders and their items, assigned services, bookings
+  and their room links, and on the prices of rooms, packages, food items and
+  services mark what they touched on the session; bulk statements, which
+  bypass mapper events, call mark_folio_rooms();
+- just before the session commits, the folio rows of the affected active
+  bookings are locked in id order and recomputed with grouped SUMs. Writers
+  for the same booking therefore serialise on the row, and the later one
+  sums every charge the earlier one committed.
+
+Recomputing a booking's sums in the database on each write, rather than
+adding deltas, keeps the totals exact whatever the write did (bulk deletes,
+price edits, moving an order to another room). A bill then reads one row
+(folio_totals()); nights past the booked check-out are added from the
+nightly rate at read time. Bookings without a row yet - created before
+folios existed, or by bulk inserts that fire no mapper events - get one on
+their first read.
+
+Cancelled food orders and services are not charged.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import Numeric, and_, cast, event, func, inspect, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, object_session
+
+from app.models.booking import Booking, BookingRoom
+from app.models.folio import BookingFolio
+from app.models.food_item import FoodItem
+from app.models.foodorder import FoodOrder, FoodOrderItem
+from app.models.Package import Package, PackageBooking, PackageBookingRoom
+from app.models.room import Room
+from app.models.service import AssignedService, Service, ServiceStatus
+from app.utils.availability import ACTIVE_BOOKING_STATUSES
+from app.utils.tax import ZERO, money
+
+# Charges still to be billed at checkout
+UNBILLED_FOOD = and_(
+    or_(FoodOrder.billing_status == "unbilled", FoodOrder.billing_status.is_(None)),
+    or_(FoodOrder.status.is_(None), FoodOrder.status != "cancelled"),
+)
+UNBILLED_SERVICE = and_(
+    AssignedService.billing_status == "unbilled",
+    or_(AssignedService.status.is_(None), AssignedService.status != ServiceStatus.cancelled),
+)
+
+# session.info keys of the marks; each holds a set of ids
+_ROOMS = "folio_rooms"
+_ORDERS = "folio_orders"
+_BOOKINGS = "folio_bookings"
+_PACKAGE_BOOKINGS = "folio_package_bookings"
+_PACKAGES = "folio_packages"
+_FOOD_ITEMS = "folio_food_items"
+_SERVICES = "folio_services"
+_MARKS = (_ROOMS, _ORDERS, _BOOKINGS, _PACKAGE_BOOKINGS, _PACKAGES, _FOOD_ITEMS, _SERVICES)
+
+
+def is_whole_property(package) -> bool:
+    """Whole-property packages are priced per stay, not per room and night."""
+    if not package:
+        return False
+    booking_type = getattr(package, 'booking_type', None)
+    if booking_type:
+        return booking_type.lower() in ['whole_property', 'whole property']
+    # Fallback: if no room_types specified, treat as whole_property (legacy packages)
+    room_types = getattr(package, 'room_types', None)
+    return not room_types or not room_types.strip()
+
+
+# ---- Marking ----
+
+def _mark(session: Optional[Session], key: str, ids: Iterable[Optional[int]]):
+    if session is not None:
+        session.info.setdefault(key, set()).update(i for i in ids if i is not None)
+
+
+def mark_folio_rooms(session: Session, room_ids: Iterable[int]):
+    """Charges of these rooms changed through a bulk statement."""
+    _mark(session, _ROOMS, room_ids)
+
+
+def mark_folio_bookings(session: Session, booking_ids: Iterable[int]):
+    """Regular bookings inserted or re-linked through a bulk statement."""
+    _mark(session, _BOOKINGS, booking_ids)
+
+
+def _values(target, attribute: str) -> List[Optional[int]]:
+    """Current and, if it changed in this flush, previous value of `attribute`."""
+    history = inspect(target).attrs[attribute].history
+    return [getattr(target, attribute)] + list(history.deleted or ())
+
+
+def _changed(target, *attributes) -> bool:
+    state = inspect(target)
+    return any(state.attrs[name].history.has_changes() for name in attributes)
+
+
+def _on_write(model, key: str, attribute: str, watched: tuple = ()):
+    """Mark `attribute` of inserted and deleted rows, and of updated rows when `watched` changed."""
+
+    def mark(mapper, connection, target):
+        _mark(object_session(target), key, _values(target, attribute))
+
+    def mark_if_changed(mapper, connection, target):
+        if not watched or _changed(target, *watched):
+            mark(mapper, connection, target)
+
+    event.listen(model, "after_insert", mark)
+    event.listen(model, "after_update", mark_if_changed)
+    event.listen(model, "after_delete", mark)
+
+
+_on_write(FoodOrder, _ROOMS, "room_id", ("room_id", "status", "billing_status"))
+_on_write(FoodOrderItem, _ORDERS, "order_id", ("order_id", "food_item_id", "quantity"))
+_on_write(AssignedService, _ROOMS, "room_id", ("room_id", "service_id", "status", "billing_status"))
+_on_write(Booking, _BOOKINGS, "id", ("status", "check_in", "check_out"))
+_on_write(PackageBooking, _PACKAGE_BOOKINGS, "id", ("status", "check_in", "check_out", "package_id"))
+_on_write(BookingRoom, _BOOKINGS, "booking_id", ("booking_id", "room_id"))
+_on_write(PackageBookingRoom, _PACKAGE_BOOKINGS, "package_booking_id", ("package_booking_id", "room_id"))
+
+
+def _on_price_change(model, key: str, *attributes):
+    def mark(mapper, connection, target):
+        if _changed(target, *attributes):
+            _mark(object_session(target), key, [target.id])
+
+    event.listen(model, "after_update", mark)
+
+
+_on_price_change(Room, _ROOMS, "price")
+_on_price_change(Package, _PACKAGES, "price", "booking_type", "room_types")
+_on_price_change(FoodItem, _FOOD_ITEMS, "price")
+_on_price_change(Service, _SERVICES, "charges")
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_marked_folios(session: Session):
+    # Pending changes fire the mapper events above before the marks are read
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    if not any(session.info.get(key) for key in _MARKS):
+        return
+    marks = {key: session.info.pop(key, set()) for key in _MARKS}
+    booking_ids, package_booking_ids = _affected_bookings(session, marks)
+    refresh_folios(session, booking_ids, package_booking_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_folio_marks(session: Session):
+    for key in _MARKS:
+        session.info.pop(key, None)
+
+
+def _affected_bookings(db: Session, marks: Dict[str, set]):
+    """Active (booking ids, package booking ids) whose folio the marked writes change."""
+    room_ids = set(marks[_ROOMS])
+    if marks[_ORDERS]:
+        room_ids.update(db.scalars(select(FoodOrder.room_id).where(FoodOrder.id.in_(marks[_ORDERS]))))
+    if marks[_FOOD_ITEMS]:
+        room_ids.update(db.scalars(
+            select(FoodOrder.room_id)
+            .join(FoodOrderItem, FoodOrderItem.order_id == FoodOrder.id)
+            .where(FoodOrderItem.food_item_id.in_(marks[_FOOD_ITEMS]), UNBILLED_FOOD)
+            .distinct()
+        ))
+    if marks[_SERVICES]:
+        room_ids.update(db.scalars(
+            select(AssignedService.room_id)
+            .where(AssignedService.service_id.in_(marks[_SERVICES]), UNBILLED_SERVICE)
+            .distinct()
+        ))
+    room_ids.discard(None)
+
+    booking_ids = set(marks[_BOOKINGS])
+    package_booking_ids = set(marks[_PACKAGE_BOOKINGS])
+    if room_ids:
+        booking_ids.update(db.scalars(
+            select(BookingRoom.booking_id)
+            .join(Booking, Booking.id == BookingRoom.booking_id)
+            .where(BookingRoom.room_id.in_(room_ids), Booking.status.in_(ACTIVE_BOOKING_STATUSES))
+        ))
+        package_booking_ids.update(db.scalars(
+            select(PackageBookingRoom.package_booking_id)
+            .join(PackageBooking, PackageBooking.id == PackageBookingRoom.package_booking_id)
+            .where(PackageBookingRoom.room_id.in_(room_ids), PackageBooking.status.in_(ACTIVE_BOOKING_STATUSES))
+        ))
+    if marks[_PACKAGES]:
+        package_booking_ids.update(db.scalars(
+            select(PackageBooking.id)
+            .where(PackageBooking.package_id.in_(marks[_PACKAGES]), PackageBooking.status.in_(ACTIVE_BOOKING_STATUSES))
+        ))
+    return booking_ids, package_booking_ids
+
+
+# ---- Recomputing ----
+
+def _insert_ignoring_conflicts(db: Session):
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(BookingFolio).on_conflict_do_nothing()
+
+
+def _sums_by_room(db: Session, room_ids: set):
+    """({room_id: unbilled food total}, {room_id: unbilled service total}) in two grouped queries."""
+    if not room_ids:
+        return {}, {}
+    food = db.execute(
+        select(FoodOrder.room_id, func.sum(cast(FoodOrderItem.quantity * FoodItem.price, Numeric(12, 2))))
+        .join(FoodOrderItem, FoodOrderItem.order_id == FoodOrder.id)
+        .join(FoodItem, FoodItem.id == FoodOrderItem.food_item_id)
+        .where(FoodOrder.room_id.in_(room_ids), UNBILLED_FOOD)
+        .group_by(FoodOrder.room_id)
+    )
+    services = db.execute(
+        select(AssignedService.room_id, func.sum(cast(Service.charges, Numeric(12, 2))))
+        .join(Service, Service.id == AssignedService.service_id)
+        .where(AssignedService.room_id.in_(room_ids), UNBILLED_SERVICE)
+        .group_by(AssignedService.room_id)
+    )
+    return dict(food.all()), dict(services.all())
+
+
+def _refresh(db: Session, is_package: bool, ids: set, now: datetime, active_only: bool):
+    model = PackageBooking if is_package else Booking
+    link = PackageBookingRoom if is_package else BookingRoom
+    link_booking_id = link.package_booking_id if is_package else link.booking_id
+    folio_booking_id = BookingFolio.package_booking_id if is_package else BookingFolio.booking_id
+
+    columns = [model.id, model.check_in, model.check_out]
+    if is_package:
+        columns += [Package.price, Package.booking_type, Package.room_types]
+    query = select(*columns).where(model.id.in_(ids))
+    if active_only:
+        query = query.where(model.status.in_(ACTIVE_BOOKING_STATUSES))
+    if is_package:
+        query = query.outerjoin(Package, Package.id == PackageBooking.package_id)
+    bookings = {row.id: row for row in db.execute(query)}
+    if not bookings:
+        return
+
+    # Create missing rows, then lock all of them in a fixed order
+    folio_key = "package_booking_id" if is_package else "booking_id"
+    db.execute(_insert_ignoring_conflicts(db), [{folio_key: booking_id} for booking_id in sorted(bookings)])
+    folio_ids = dict(db.execute(
+        select(folio_booking_id, BookingFolio.id)
+        .where(folio_booking_id.in_(bookings))
+        .order_by(BookingFolio.id)
+        .with_for_update()
+    ).all())
+
+    rooms: Dict[int, list] = {booking_id: [] for booking_id in bookings}
+    for booking_id, room_id, price in db.execute(
+        select(link_booking_id, Room.id, Room.price)
+        .join(Room, Room.id == link.room_id)
+        .where(link_booking_id.in_(bookings))
+    ):
+        rooms[booking_id].append((room_id, price))
+    food, services = _sums_by_room(db, {room_id for links in rooms.values() for room_id, _ in links})
+
+    values = []
+    for booking_id, row in bookings.items():
+        links = rooms[booking_id]
+        nights = max(1, (row.check_out - row.check_in).days)
+        room_rate = package_rate = ZERO
+        package_charges = ZERO
+        if is_package:
+            package_price = money(row.price)
+            if is_whole_property(row):
+                package_charges = package_price
+            else:
+                package_rate = package_price * len(links)
+                package_charges = package_rate * nights
+        else:
+            room_rate = sum((money(price) for _, price in links), ZERO)
+        values.append({
+            "id": folio_ids[booking_id],
+            "nights": nights,
+            "room_rate": room_rate,
+            "package_rate": package_rate,
+            "room_charges": room_rate * nights,
+            "package_charges": package_charges,
+            "food_charges": sum((money(food.get(room_id)) for room_id, _ in links), ZERO),
+            "service_charges": sum((money(services.get(room_id)) for room_id, _ in links), ZERO),
+            "updated_at": now,
+        })
+    db.execute(update(BookingFolio), values)
+
+
+def refresh_folios(
+    db: Session,
+    booking_ids: Iterable[int] = (),
+    package_booking_ids: Iterable[int] = (),
+    active_only: bool = True,
+):
+    """Recompute the folios of these bookings in the current transaction."""
+    now = datetime.utcnow()
+    if booking_ids:
+        _refresh(db, False, set(booking_ids), now, active_only)
+    if package_booking_ids:
+        _refresh(db, True, set(package_booking_ids), now, active_only)
+
+
+# ---- Reading ----
+
+@dataclass(frozen=True)
+class FolioTotals:
+    room_charges: Decimal
+    package_charges: Decimal
+    food_charges: Decimal
+    service_charges: Decimal
+
+
+def folio_totals(db: Session, booking, is_package: bool, stay_nights: int) -> FolioTotals:
+    """
+    A booking's subtotals for a stay of `stay_nights` nights, from its folio
+    row. A missing row is built in the current transaction; the caller's
+    commit keeps it.
+    """
+    folio_booking_id = BookingFolio.package_booking_id if is_package else BookingFolio.booking_id
+    folio = db.query(BookingFolio).filter(folio_booking_id == booking.id).first()
+    if folio is None:
+        ids = {"package_booking_ids" if is_package else "booking_ids": [booking.id]}
+        refresh_folios(db, active_only=False, **ids)
+        folio = db.query(BookingFolio).filter(folio_booking_id == booking.id).first()
+    # Late checkout: the nights after the booked check-out at the nightly rate
+    extra_nights = stay_nights - folio.nights
+    return FolioTotals(
+        room_charges=folio.room_charges + folio.room_rate * extra_nights,
+        package_charges=folio.package_charges + folio.package_rate * extra_nights,
+        food_charges=folio.food_charges,
+        service_charges=folio.service_charges,
+    )
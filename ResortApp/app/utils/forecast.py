@@ -0,0 +1,142 @@
+"""
+On-the-books pickup and occupancy forecast.
+
+For every night of the next HORIZON_DAYS and every room type:
+
+- on the books: room-nights already booked (not cancelled) for the night;
+- last year, on the books: room-nights booked for the same weekday a year
+  earlier (LAST_YEAR_DAYS back) by the same lead time, i.e. by as_of minus
+  LAST_YEAR_DAYS, judged by booking creation dates;
+- last year, actual: the final room-nights of that night.
+
+Together these are the night's pickup curve: last year's night gained
+(actual - on the books) between this lead time and arrival. The forecast
+adds that remaining pickup to this year's rooms on the books, never below
+what is already booked and never above the room type's capacity unless it
+is already overbooked.
+
+Stays come from stay_metrics.load_stays (one query per booking kind) and are
+expanded into room-nights and bincounted into (room type x night) grids with
+NumPy. Bookings made before booking creation times were recorded have them
+estimated (migrate_database.py), and cancellations count as never booked,
+since when a booking was cancelled is not recorded.
+
+The nightly scheduler stores each day's forecast in occupancy_forecasts;
+/api/analytics/forecast reads it and computes it on demand if it is missing.
+"""
+import asyncio
+from datetime import date, timedelta
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.forecast import OccupancyForecast
+from app.models.room import Room
+from app.utils.room_status import _seconds_until_midnight, property_today
+from app.utils.stay_metrics import EPOCH, UNSPECIFIED_ROOM_TYPE, expand_nights, load_stays
+
+HORIZON_DAYS = 90
+# 52 weeks, so last year's night falls on the same weekday
+LAST_YEAR_DAYS = 364
+# Stored forecasts older than this are purged by the nightly run
+KEEP_FORECASTS_DAYS = 400
+
+
+def _nights_grid(
+    db: Session, first: date, days: int, room_types: np.ndarray, booked_by: Optional[date] = None
+) -> np.ndarray:
+    """Room-nights per (room type, night) for the nights first..first+days, optionally only of bookings made by `booked_by`."""
+    stays = load_stays(db, first, first + timedelta(days=days))
+    start = (first - EPOCH).days
+    rows, nights = expand_nights(stays["check_in"], stays["check_out"], start, start + days)
+    if booked_by is not None:
+        made = stays["created"][rows] <= (booked_by - EPOCH).days
+        rows, nights = rows[made], nights[made]
+    stay_types = stays["room_type"][rows].astype(str)
+    type_index = np.searchsorted(room_types, stay_types)
+    # A room's type may change between the queries
+    known = (type_index < len(room_types)) & (room_types[np.minimum(type_index, len(room_types) - 1)] == stay_types)
+    cells = type_index[known] * days + (nights[known] - start)
+    return np.bincount(cells, minlength=len(room_types) * days).reshape(len(room_types), days)
+
+
+def build_forecast(db: Session, as_of: date, days: int = HORIZON_DAYS) -> List[dict]:
+    """OccupancyForecast rows (as dicts) for the nights as_of..as_of+days-1, per room type."""
+    types = [t or UNSPECIFIED_ROOM_TYPE for t in db.execute(select(Room.type)).scalars().all()]
+    if not types:
+        return []
+    room_types, capacity = np.unique(np.array(types, dtype=str), return_counts=True)
+
+    last_year = as_of - timedelta(days=LAST_YEAR_DAYS)
+    on_the_books = _nights_grid(db, as_of, days, room_types)
+    on_the_books_last_year = _nights_grid(db, last_year, days, room_types, booked_by=last_year)
+    actual_last_year = _nights_grid(db, last_year, days, room_types)
+
+    remaining_pickup = np.maximum(actual_last_year - on_the_books_last_year, 0)
+    ceiling = np.maximum(capacity[:, None], on_the_books)
+    forecast = np.minimum(on_the_books + remaining_pickup, ceiling)
+
+    return [
+        {
+            "as_of": as_of,
+            "stay_date": as_of + timedelta(days=night),
+            "room_type": str(room_types[t]),
+            "capacity": int(capacity[t]),
+            "on_the_books": int(on_the_books[t, night]),
+            "on_the_books_last_year": int(on_the_books_last_year[t, night]),
+            "actual_last_year": int(actual_last_year[t, night]),
+            "forecast": int(forecast[t, night]),
+        }
+        for t in range(len(room_types))
+        for night in range(days)
+    ]
+
+
+def store_forecast(db: Session, as_of: Optional[date] = None) -> int:
+    """Compute and store the forecast as of `as_of` (default: today); safe to run concurrently."""
+    as_of = as_of or property_today()
+    rows = build_forecast(db, as_of)
+    if rows:
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        insert = dialect.insert(OccupancyForecast)
+        db.execute(
+            insert.on_conflict_do_update(
+                index_elements=["as_of", "stay_date", "room_type"],
+                set_={
+                    column: insert.excluded[column]
+                    for column in ("capacity", "on_the_books", "on_the_books_last_year", "actual_last_year", "forecast", "created_at")
+                },
+            ),
+            rows,
+        )
+    db.execute(delete(OccupancyForecast).where(OccupancyForecast.as_of < as_of - timedelta(days=KEEP_FORECASTS_DAYS)))
+    db.commit()
+    return len(rows)
+
+
+# ---- Nightly scheduler ----
+
+def _run_forecast():
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        return store_forecast(db)
+    finally:
+        db.close()
+
+
+async def run_forecast_scheduler():
+    """
+    Background task: store today's forecast at startup and then after every
+    property-local midnight. Each worker runs it; the upsert makes
+    concurrent runs harmless.
+    """
+    while True:
+        try:
+            await asyncio.to_thread(_run_forecast)
+        except Exception as e:
+            print(f"Occupancy forecast failed: {e}")
+        await asyncio.sleep(_seconds_until_midnight())
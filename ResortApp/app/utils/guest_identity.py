@@ -0,0 +1,245 @@
+"""
+Guest identity: the user account a booking is linked to.
+
+Guests are keyed by a normalized email (trimmed, lower-case) and an E.164
+phone number, both held in uniquely indexed columns on users. A guest is
+upserted with INSERT ... ON CONFLICT DO NOTHING RETURNING, so creating a new
+guest is one round trip; on conflict the existing user is looked up by email
+first, then by phone, in one indexed query.
+
+Guests never log in, so they get UNUSABLE_PASSWORD instead of a bcrypt hash
+(verify_password() rejects it) and no hashing runs on the booking path.
+"""
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.user import Role, User
+
+# Country code assumed for numbers written without one (e.g. 98765 43210)
+DEFAULT_COUNTRY_CODE = os.getenv("DEFAULT_PHONE_COUNTRY_CODE", "91")
+
+# Never a valid bcrypt hash; see verify_password()
+UNUSABLE_PASSWORD = "!guest-no-login"
+
+_guest_role_id: Optional[int] = None
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    if not email or not isinstance(email, str):
+        return None
+    return email.strip().lower() or None
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """
+    E.164 form of `phone` (+919876543210), or None when it is not a plausible
+    phone number. National numbers get DEFAULT_COUNTRY_CODE.
+    """
+    if not phone or not isinstance(phone, str):
+        return None
+    phone = phone.strip()
+    digits = re.sub(r"\D", "", phone)
+    if phone.startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        digits = digits[2:]
+    elif len(digits) == 11 and digits.startswith("0"):
+        digits = DEFAULT_COUNTRY_CODE + digits[1:]
+    elif len(digits) == 10:
+        digits = DEFAULT_COUNTRY_CODE + digits
+    if not 8 <= len(digits) <= 15 or digits.startswith("0"):
+        return None
+    return "+" + digits
+
+
+@event.listens_for(User, "before_insert")
+@event.listens_for(User, "before_update")
+def _sync_email_normalized(mapper, connection, target):
+    # Every account is found by its normalized email, not only guests
+    target.email_normalized = normalize_email(target.email)
+
+
+def _normalize_identity(email, mobile, name) -> Tuple[Optional[str], Optional[str], str]:
+    email = email.strip() if email and isinstance(email, str) else None
+    mobile = mobile.strip() if mobile and isinstance(mobile, str) else None
+    name = name.strip() if name and isinstance(name, str) else "Guest User"
+    return email or None, mobile or None, name or "Guest User"
+
+
+def _account_email(email: Optional[str], mobile: Optional[str], phone_key: Optional[str]) -> str:
+    # Guests booked by phone only get a placeholder, mobile-based email
+    return email or f"guest_{(phone_key or mobile).lstrip('+')}@temp.com"
+
+
+def _role_id(db: Session) -> int:
+    """Id of the 'guest' role, created on first use; cached per process once committed."""
+    global _guest_role_id
+    if _guest_role_id is not None:
+        return _guest_role_id
+    guest_role = db.query(Role).filter(Role.name == "guest").first()
+    if guest_role:
+        _guest_role_id = guest_role.id
+        return guest_role.id
+    try:
+        with db.begin_nested():
+            guest_role = Role(name="guest", permissions="[]")
+            db.add(guest_role)
+    except IntegrityError:
+        # Created concurrently by another request
+        guest_role = db.query(Role).filter(Role.name == "guest").first()
+    return guest_role.id
+
+
+def _insert_ignoring_conflicts(db: Session):
+    # Same ON CONFLICT DO NOTHING clause on both supported databases
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(User).on_conflict_do_nothing()
+
+
+def _new_guest_values(db: Session, email: Optional[str], mobile: Optional[str], name: str) -> dict:
+    phone_key = normalize_phone(mobile)
+    account_email = _account_email(email, mobile, phone_key)
+    return {
+        "name": name,
+        "email": account_email,
+        "email_normalized": normalize_email(account_email),
+        "phone": mobile,
+        "phone_e164": phone_key,
+        "hashed_password": UNUSABLE_PASSWORD,
+        "role_id": _role_id(db),
+        "is_active": True,
+    }
+
+
+def _find_guest_users(db: Session, emails, phone_keys) -> Tuple[Dict[str, User], Dict[str, User]]:
+    """Existing users by normalized email and by E.164 phone, in one query."""
+    emails = {email for email in emails if email}
+    email_keys = {normalize_email(email) for email in emails}
+    phone_keys = {key for key in phone_keys if key}
+    by_email: Dict[str, User] = {}
+    by_phone: Dict[str, User] = {}
+    if not emails and not phone_keys:
+        return by_email, by_phone
+    users = (
+        db.query(User)
+        .options(joinedload(User.role))
+        .filter(or_(
+            User.email_normalized.in_(email_keys),
+            User.phone_e164.in_(phone_keys),
+            # Rows not yet backfilled by migrate_database.py
+            User.email.in_(emails),
+        ))
+        .order_by(User.id)
+        .all()
+    )
+    for user in users:
+        email_key = user.email_normalized or normalize_email(user.email)
+        if email_key:
+            by_email.setdefault(email_key, user)
+        if user.phone_e164:
+            by_phone.setdefault(user.phone_e164, user)
+    return by_email, by_phone
+
+
+def _match(by_email, by_phone, email, mobile) -> Optional[User]:
+    phone_key = normalize_phone(mobile)
+    return (
+        by_email.get(normalize_email(email))
+        or by_phone.get(phone_key)
+        or by_email.get(normalize_email(_account_email(email, mobile, phone_key)))
+    )
+
+
+def upsert_guest_user(db: Session, email: Optional[str], mobile: Optional[str], name: Optional[str]) -> User:
+    """
+    Find the guest user by email, then by mobile, or create one, inside the
+    caller's transaction. A changed name is updated on the existing user.
+    """
+    email, mobile, name = _normalize_identity(email, mobile, name)
+
+    # Need at least one identifier (email or mobile)
+    if not normalize_email(email) and not mobile:
+        raise ValueError("Either email or mobile number must be provided")
+
+    values = _new_guest_values(db, email, mobile, name)
+    user = db.scalars(_insert_ignoring_conflicts(db).values(**values).returning(User)).first()
+    if user is not None:
+        return user
+
+    # Email or phone already belongs to a user
+    by_email, by_phone = _find_guest_users(db, [email, values["email"]], [values["phone_e164"]])
+    user = _match(by_email, by_phone, email, mobile)
+    if user is None:
+        raise ValueError("Failed to create or find guest user")
+    if name and user.name != name:
+        user.name = name
+    return user
+
+
+def link_guest_user(db: Session, email: Optional[str], mobile: Optional[str], name: Optional[str]) -> Optional[User]:
+    """upsert_guest_user() for the booking endpoints: never fails the booking."""
+    if not email and not mobile:
+        return None
+    try:
+        return upsert_guest_user(db, email, mobile, name or "Guest User")
+    except Exception as e:
+        # Log error but don't fail the booking if user creation fails
+        print(f"Warning: Could not create/link guest user: {str(e)}")
+        return None
+
+
+def upsert_guest_users(
+    db: Session,
+    identities: Sequence[Tuple[Optional[str], Optional[str], Optional[str]]],
+) -> List[Optional[User]]:
+    """
+    Batch form of link_guest_user() for (email, mobile, name) tuples: one
+    lookup query for the whole batch and one multi-row INSERT for new users.
+    Identities repeated in the batch share a user; entries that identify
+    nobody get None.
+    """
+    normalized = [_normalize_identity(*identity) for identity in identities]
+    emails = set()
+    phone_keys = set()
+    for email, mobile, _ in normalized:
+        phone_key = normalize_phone(mobile)
+        phone_keys.add(phone_key)
+        if email or mobile:
+            emails.update((email, _account_email(email, mobile, phone_key)))
+    by_email, by_phone = _find_guest_users(db, emails, phone_keys)
+
+    users: List[Optional[User]] = []
+    new_values: Dict[str, dict] = {}
+    for email, mobile, name in normalized:
+        if not normalize_email(email) and not mobile:
+            users.append(None)
+            continue
+        user = _match(by_email, by_phone, email, mobile)
+        if user is not None:
+            if name and user.name != name:
+                user.name = name
+            users.append(user)
+            continue
+        values = _new_guest_values(db, email, mobile, name)
+        # Placeholder: the same new guest may appear more than once in the batch
+        new_values.setdefault(values["email_normalized"], values)
+        users.append(values["email_normalized"])
+
+    if new_values:
+        created = {
+            user.email_normalized: user
+            for user in db.scalars(_insert_ignoring_conflicts(db).returning(User), list(new_values.values())).all()
+        }
+        users = [created.get(user, user) if isinstance(user, str) else user for user in users]
+        # Rows skipped on conflict were created concurrently; resolve them one by one
+        users = [
+            link_guest_user(db, *identity) if isinstance(user, str) else user
+            for identity, user in zip(normalized, users)
+        ]
+    return users
@@ -0,0 +1,133 @@
+"""
+Response cache with ETag / 304 support for the public catalog lists.
+
+GET /rooms, /packages, /food-items, /food-categories and the frontend CMS
+lists serve the same JSON to every visitor. CatalogCacheMiddleware keeps
+the serialized response bytes per URL in a cache namespace (app/utils/cache.py)
+tied to the tables behind it, so any committed write to those tables - in
+this worker or, via NOTIFY, in another - drops them. While an entry is
+current, requests are answered from memory without opening a DB session, and
+a matching If-None-Match gets 304 with no body.
+
+The ETag is a hash of the response bytes. Namespace generations (the per-table
+version counters) decide whether the bytes are current; hashing the bytes
+gives every worker the same strong ETag for the same content.
+"""
+import hashlib
+from typing import Dict, Tuple
+
+from app.utils.cache import get_namespace
+
+CMS_PATHS = {
+    "header-banner": "header_banner",
+    "check-availability": "check_availability",
+    "gallery": "gallery",
+    "reviews": "reviews",
+    "resort-info": "resort_info",
+    "signature-experiences": "signature_experiences",
+    "plan-weddings": "plan_weddings",
+    "nearby-attractions": "nearby_attractions",
+    "nearby-attraction-banners": "nearby_attraction_banners",
+    "nearby-attraction-banner": "nearby_attraction_banners",
+}
+
+# Cacheable path (without trailing slash) -> tables its response is built from
+CACHEABLE_PATHS: Dict[str, Tuple[str, ...]] = {
+    "/api/rooms": ("rooms",),
+    "/api/packages": ("packages", "package_images"),
+    "/api/food-items": ("food_items", "food_item_images", "food_categories"),
+    "/api/food-categories": ("food_categories",),
+    **{f"/api/{path}": (table,) for path, table in CMS_PATHS.items()},
+}
+
+MAX_ENTRIES_PER_PATH = 64
+# Safety net for a missed invalidation from another worker
+TTL_SECONDS = 300
+
+# Created up front so every worker announces writes to these tables
+_namespaces = {
+    path: get_namespace(f"http:{path}", tables, maxsize=MAX_ENTRIES_PER_PATH, ttl=TTL_SECONDS)
+    for path, tables in CACHEABLE_PATHS.items()
+}
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in {tag[2:] if tag.startswith("W/") else tag for tag in tags}
+
+
+def _headers(scope) -> Dict[bytes, bytes]:
+    return {name.lower(): value for name, value in scope.get("headers", [])}
+
+
+class CatalogCacheMiddleware:
+    """ASGI middleware; add it inside CORSMiddleware so CORS headers stay per-request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        namespace = _namespaces.get(path.rstrip("/"))
+        if namespace is None:
+            return await self.app(scope, receive, send)
+
+        key = (path, scope.get("query_string", b""))
+        if_none_match = _headers(scope).get(b"if-none-match", b"").decode("latin-1")
+        cached = namespace.get(key, None)
+        if cached is not None:
+            etag, body = cached
+            return await _respond(send, etag, body, if_none_match, hit=True)
+
+        generation = namespace.generation
+        start = None
+        chunks = []
+
+        async def capture(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                if message["status"] != 200:
+                    await send(message)
+                return
+            if start["status"] != 200:
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body"):
+                return
+            body = b"".join(chunks)
+            etag = make_etag(body)
+            namespace.set(key, (etag, body), generation)
+            await _respond(send, etag, body, if_none_match, hit=False)
+
+        await self.app(scope, receive, capture)
+
+
+async def _respond(send, etag: str, body: bytes, if_none_match: str, hit: bool):
+    headers = [
+        (b"etag", etag.encode()),
+        # Browsers and proxies may keep it but must revalidate (cheap 304)
+        (b"cache-control", b"no-cache"),
+        (b"x-cache", b"HIT" if hit else b"MISS"),
+    ]
+    if if_none_match and etag_matches(if_none_match, etag):
+        await send({"type": "http.response.start", "status": 304, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
+        return
+    headers += [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,214 @@
+"""
+Idempotency-Key support for the public booking endpoints.
+
+The first request with a given key claims it by inserting an in-progress row
+(INSERT ... ON CONFLICT DO NOTHING) and runs normally; its response - or its
+4xx error - is then stored on the row. A retry with the same key gets the
+stored response back without running validation, availability checks or
+emails again. A duplicate that arrives while the first request is still
+running waits for it to finish instead of racing it. Keys expire after
+KEY_TTL and are purged by run_idempotency_cleanup().
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional, Type
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.idempotency import IdempotencyKey
+
+KEY_TTL = timedelta(hours=int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24")))
+MAX_KEY_LENGTH = 255
+# How long a duplicate waits for the first request to finish
+WAIT_SECONDS = 30
+# An in-progress claim this old belongs to a request that died
+STALE_CLAIM = timedelta(minutes=2)
+CLEANUP_INTERVAL_SECONDS = 3600
+
+
+def request_fingerprint(payload: Any) -> str:
+    raw = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _claim(db: Session, scope: str, key: str, request_hash: str) -> Optional[int]:
+    """Insert and commit the in-progress row; None when the key is already taken."""
+    now = datetime.utcnow()
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = (
+        dialect.insert(IdempotencyKey)
+        .values(
+            scope=scope,
+            key=key,
+            request_hash=request_hash,
+            status="in_progress",
+            created_at=now,
+            expires_at=now + KEY_TTL,
+        )
+        .on_conflict_do_nothing()
+        .returning(IdempotencyKey.id)
+    )
+    claim_id = db.execute(stmt).scalar()
+    db.commit()
+    return claim_id
+
+
+def _take_over(db: Session, row, request_hash: str) -> bool:
+    """Reclaim an expired key or an abandoned claim; False if another request got it first."""
+    now = datetime.utcnow()
+    updated = (
+        db.query(IdempotencyKey)
+        .filter(IdempotencyKey.id == row.id, IdempotencyKey.created_at == row.created_at)
+        .update({
+            "request_hash": request_hash,
+            "status": "in_progress",
+            "response_status": None,
+            "response_body": None,
+            "created_at": now,
+            "expires_at": now + KEY_TTL,
+        }, synchronize_session=False)
+    )
+    db.commit()
+    return updated == 1
+
+
+def _complete(db: Session, claim_id: int, status_code: int, body: Any):
+    db.query(IdempotencyKey).filter(IdempotencyKey.id == claim_id).update({
+        "status": "completed",
+        "response_status": status_code,
+        "response_body": json.dumps(body),
+    }, synchronize_session=False)
+    db.commit()
+
+
+def _release(db: Session, claim_id: int):
+    # Server errors are not stored; a retry runs the request again
+    db.query(IdempotencyKey).filter(IdempotencyKey.id == claim_id).delete(synchronize_session=False)
+    db.commit()
+
+
+def _replay(row) -> JSONResponse:
+    return JSONResponse(
+        status_code=row.response_status,
+        content=json.loads(row.response_body),
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def run_idempotent(
+    db: Session,
+    scope: str,
+    key: Optional[str],
+    payload: BaseModel,
+    response_model: Type[BaseModel],
+    handler: Callable[[], Any],
+):
+    """
+    Run `handler()` once per (scope, Idempotency-Key). Without a key the
+    handler simply runs. The response is serialized with `response_model`.
+    """
+    if key is None:
+        return handler()
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters.")
+    request_hash = request_fingerprint(payload)
+
+    deadline = time.monotonic() + WAIT_SECONDS
+    delay = 0.05
+    while True:
+        claim_id = _claim(db, scope, key, request_hash)
+        if claim_id is not None:
+            break
+        row = (
+            db.query(
+                IdempotencyKey.id,
+                IdempotencyKey.request_hash,
+                IdempotencyKey.status,
+                IdempotencyKey.response_status,
+                IdempotencyKey.response_body,
+                IdempotencyKey.created_at,
+                IdempotencyKey.expires_at,
+            )
+            .filter(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+            .first()
+        )
+        # End the read so the next poll sees the first request's commit
+        db.commit()
+        if row is None:
+            # Purged in between; claim again
+            continue
+        now = datetime.utcnow()
+        expired = row.expires_at <= now
+        abandoned = row.status == "in_progress" and row.created_at <= now - STALE_CLAIM
+        if expired or abandoned:
+            if _take_over(db, row, request_hash):
+                claim_id = row.id
+                break
+            continue
+        if row.request_hash != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request.")
+        if row.status == "completed":
+            return _replay(row)
+        if time.monotonic() >= deadline:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still being processed.")
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+    try:
+        result = handler()
+    except HTTPException as e:
+        db.rollback()
+        if e.status_code >= 500:
+            _release(db, claim_id)
+        else:
+            _complete(db, claim_id, e.status_code, {"detail": e.detail})
+        raise
+    except Exception:
+        db.rollback()
+        _release(db, claim_id)
+        raise
+
+    body = jsonable_encoder(response_model.model_validate(result))
+    _complete(db, claim_id, 200, body)
+    return JSONResponse(content=body)
+
+
+def purge_expired_keys(db: Session) -> int:
+    deleted = (
+        db.query(IdempotencyKey)
+        .filter(IdempotencyKey.expires_at < datetime.utcnow())
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
+
+
+def _run_cleanup():
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        return purge_expired_keys(db)
+    finally:
+        db.close()
+
+
+async def run_idempotency_cleanup():
+    """Background task: purge expired idempotency keys every hour."""
+    while True:
+        try:
+            deleted = await asyncio.to_thread(_run_cleanup)
+            if deleted:
+                print(f"Purged {deleted} expired idempotency keys")
+        except Exception as e:
+            print(f"Idempotency key cleanup failed: {e}")
+        await asyncio.sleep(CLEANUP_INTERVAL_SECONDS)
@@ -0,0 +1,143 @@
+"""
+Responsive WebP variants of uploaded images.
+
+Every public image gets thumb, medium and large WebP renditions next to it,
+named after the original: /static/media/ab/cd/<sha256>.png has
+/static/media/ab/cd/<sha256>.thumb.webp and so on. Because the names are
+derived from the image URL, no table stores them; schemas expose them through
+variant_urls(), which only lists variants that exist on disk.
+
+Resizing is CPU-bound, so it runs in a per-worker ProcessPoolExecutor rather
+than on the request's event loop or threadpool. The upload service
+(app/utils/uploads.py) generates the variants before it returns, so they exist
+by the time the row pointing at the image is committed and cached. Images
+uploaded before this are processed with generate_image_variants.py.
+"""
+import asyncio
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, Optional
+
+# ResortApp/, the directory image URLs are relative to
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Variant name -> maximum width in pixels; images are never upscaled
+VARIANT_WIDTHS = {"thumb": 320, "medium": 800, "large": 1600}
+WEBP_QUALITY = 80
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+# URL prefixes of the directories public images are served from
+PUBLIC_PREFIXES = ("/static/", "/uploads/packages/", "/uploads/food_items/")
+SOURCE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+
+# How long a missing variant is remembered before checking the disk again
+MISSING_TTL_SECONDS = 60
+
+
+def variant_path(source_path: str, name: str) -> str:
+    return f"{os.path.splitext(source_path)[0]}.{name}.webp"
+
+
+def is_variant(path: str) -> bool:
+    return any(path.endswith(f".{name}.webp") for name in VARIANT_WIDTHS)
+
+
+def render_variants(source_path: str) -> Dict[str, str]:
+    """
+    Write the missing variants of one image; returns {name: path}. Runs in a
+    worker process, so it imports Pillow there and touches nothing else.
+    """
+    from PIL import Image, ImageOps
+
+    targets = {name: variant_path(source_path, name) for name in VARIANT_WIDTHS}
+    missing = {name: path for name, path in targets.items() if not os.path.exists(path)}
+    if not missing:
+        return targets
+    with Image.open(source_path) as image:
+        # Apply the camera's EXIF rotation; WebP output drops the EXIF data
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        for name, path in missing.items():
+            width = VARIANT_WIDTHS[name]
+            variant = image.copy()
+            if variant.width > width:
+                variant.thumbnail((width, variant.height), Image.LANCZOS)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            try:
+                variant.save(tmp_path, "WEBP", quality=WEBP_QUALITY, method=4)
+                # Atomic, so a reader never sees a partly written variant
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+    return targets
+
+
+# ---- Worker pool ----
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a worker that has DB connections and threads is unsafe
+                _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=get_context("spawn"))
+    return _pool
+
+
+def _report(source_path: str, error: Exception):
+    # The original is already stored and valid; pages fall back to it
+    print(f"Failed to generate image variants for {source_path}: {error}")
+
+
+async def generate_variants(source_path: str):
+    """Generate the variants of a stored image in the pool, without blocking the event loop."""
+    try:
+        await asyncio.get_running_loop().run_in_executor(get_pool(), render_variants, source_path)
+    except Exception as e:
+        _report(source_path, e)
+
+
+def generate_variants_sync(source_path: str):
+    """Same as generate_variants(), for sync handlers running in the threadpool."""
+    try:
+        get_pool().submit(render_variants, source_path).result()
+    except Exception as e:
+        _report(source_path, e)
+
+
+# ---- URLs ----
+
+_known: Dict[str, Optional[Dict[str, str]]] = {}
+_missing_until: Dict[str, float] = {}
+
+
+def variant_urls(image_url: Optional[str]) -> Optional[Dict[str, str]]:
+    """{"thumb": url, "medium": url, "large": url} for a public image, or None until they exist."""
+    if not image_url or not image_url.startswith(PUBLIC_PREFIXES):
+        return None
+    base, ext = os.path.splitext(image_url)
+    if ext.lower() not in SOURCE_EXTENSIONS:
+        return None
+    urls = _known.get(image_url)
+    if urls is not None:
+        return urls
+    if _missing_until.get(image_url, 0) > time.monotonic():
+        return None
+    urls = {name: f"{base}.{name}.webp" for name in VARIANT_WIDTHS}
+    if all(os.path.isfile(os.path.join(BASE_DIR, url.lstrip("/"))) for url in urls.values()):
+        # Variants never change once written
+        _known[image_url] = urls
+        _missing_until.pop(image_url, None)
+        return urls
+    _missing_until[image_url] = time.monotonic() + MISSING_TTL_SECONDS
+    return None
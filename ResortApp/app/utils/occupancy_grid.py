@@ -0,0 +1,119 @@
+"""
+Rooms x days occupancy grid for the front-desk tape chart.
+
+All stays overlapping the window are loaded with one query and painted into a
+NumPy uint8 matrix (one row per room, one column per night). Finished grids
+are cached per window and dropped whenever a booking touching that window is
+written, with a short TTL as a safety net for writes made by other workers.
+"""
+import base64
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.room import Room
+from app.utils.availability import active_stays_query
+
+FREE = 0
+BOOKED = 1
+CHECKED_IN = 2
+MAINTENANCE = 3
+
+LEGEND = {FREE: "free", BOOKED: "booked", CHECKED_IN: "checked-in", MAINTENANCE: "maintenance"}
+
+CACHE_TTL_SECONDS = 60
+
+_cache: Dict[Tuple[date, int], Tuple[float, List[dict], np.ndarray]] = {}
+_cache_lock = threading.Lock()
+
+
+def _paint(grid: np.ndarray, rows: np.ndarray, starts: np.ndarray, ends: np.ndarray, code: int):
+    """Mark [start, end) columns of each row with `code` using a difference array."""
+    if not len(rows):
+        return
+    diff = np.zeros((grid.shape[0], grid.shape[1] + 1), dtype=np.int32)
+    np.add.at(diff, (rows, starts), 1)
+    np.add.at(diff, (rows, ends), -1)
+    covered = np.cumsum(diff[:, :-1], axis=1) > 0
+    grid[covered] = np.maximum(grid[covered], code)
+
+
+def build_grid(db: Session, start: date, days: int) -> Tuple[List[dict], np.ndarray]:
+    rooms = db.query(Room.id, Room.number, Room.type, Room.status).order_by(Room.number).all()
+    grid = np.zeros((len(rooms), days), dtype=np.uint8)
+    if not rooms:
+        return [], grid
+
+    row_of = {room.id: row for row, room in enumerate(rooms)}
+    end = start + timedelta(days=days)
+
+    stays = {BOOKED: ([], [], []), CHECKED_IN: ([], [], [])}
+    for stay in db.execute(active_stays_query(None, start, end)):
+        row = row_of.get(stay.room_id)
+        if row is None:
+            continue
+        status = (stay.status or "").lower().replace("_", "-")
+        rows, starts, ends = stays[CHECKED_IN if status == "checked-in" else BOOKED]
+        rows.append(row)
+        starts.append(max(0, (stay.check_in - start).days))
+        ends.append(min(days, (stay.check_out - start).days))
+
+    for code, (rows, starts, ends) in stays.items():
+        _paint(grid, np.array(rows, dtype=np.intp), np.array(starts, dtype=np.intp), np.array(ends, dtype=np.intp), code)
+
+    maintenance = np.array([(room.status or "").lower() == "maintenance" for room in rooms])
+    grid[maintenance] = MAINTENANCE
+    return [{"id": room.id, "number": room.number, "type": room.type} for room in rooms], grid
+
+
+def get_grid(db: Session, start: date, days: int) -> Tuple[List[dict], np.ndarray]:
+    key = (start, days)
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached and now - cached[0] < CACHE_TTL_SECONDS:
+        return cached[1], cached[2]
+
+    rooms, grid = build_grid(db, start, days)
+    grid.flags.writeable = False
+    with _cache_lock:
+        _cache[key] = (now, rooms, grid)
+    return rooms, grid
+
+
+def invalidate_occupancy_grid(check_in: Optional[date] = None, check_out: Optional[date] = None):
+    """
+    Drop cached grids whose window overlaps [check_in, check_out).
+    With no dates, every cached grid is dropped (e.g. rooms were added or edited).
+    """
+    with _cache_lock:
+        if check_in is None or check_out is None:
+            _cache.clear()
+            return
+        for key in list(_cache):
+            start, days = key
+            if start < check_out and start + timedelta(days=days) > check_in:
+                del _cache[key]
+
+
+def encode_rle(grid: np.ndarray) -> List[List[List[int]]]:
+    """Run-length encode each row as [[code, length], ...]."""
+    encoded = []
+    for row in grid:
+        if not len(row):
+            encoded.append([])
+            continue
+        boundaries = np.flatnonzero(np.diff(row)) + 1
+        starts = np.concatenate(([0], boundaries))
+        lengths = np.diff(np.concatenate((starts, [len(row)])))
+        encoded.append([[int(row[s]), int(n)] for s, n in zip(starts, lengths)])
+    return encoded
+
+
+def encode_base64(grid: np.ndarray) -> str:
+    """Row-major uint8 cells, base64 encoded."""
+    return base64.b64encode(np.ascontiguousarray(grid).tobytes()).decode("ascii")
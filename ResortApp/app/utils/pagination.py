@@ -0,0 +1,91 @@
+"""
+Keyset (cursor) pagination helpers and cached list totals.
+
+A cursor is an opaque, URL-safe token holding the sort key of the last row on
+the previous page, so the next page is a range scan on the ordering index
+instead of an OFFSET that reads and discards every earlier row.
+
+COUNT(*) on a growing table is the other per-page cost. CachedCount keeps the
+unfiltered total in memory, bumped in place when this worker inserts a row,
+and caches filtered totals briefly. A TTL resyncs with writes made by other
+workers.
+"""
+import base64
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+
+from fastapi import HTTPException
+
+
+def encode_cursor(order_by: str, *key) -> str:
+    raw = json.dumps([order_by, *key], default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: str) -> list:
+    """Return the sort key stored in `cursor`; 400 if it is malformed or for another ordering."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or not values or values[0] != order_by:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values[1:]
+
+
+class CachedCount:
+    """
+    In-process cache of list totals.
+
+    The unfiltered total (key None) is adjusted incrementally via `bump()`;
+    filtered totals are dropped on any write since a status change or date
+    extension can move rows in or out of a filter. Filters include free-text
+    search, so at most `max_filtered` filtered totals are kept, least recently
+    used first out, and expired ones are dropped when read.
+    """
+
+    def __init__(self, ttl_seconds: int = 300, filtered_ttl_seconds: int = 30, max_filtered: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.filtered_ttl_seconds = filtered_ttl_seconds
+        self.max_filtered = max_filtered
+        self._total: Optional[Tuple[float, int]] = None
+        self._filtered: "OrderedDict[Hashable, Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Optional[Hashable], count: Callable[[], int]) -> int:
+        ttl = self.ttl_seconds if key is None else self.filtered_ttl_seconds
+        now = time.monotonic()
+        with self._lock:
+            cached = self._total if key is None else self._filtered.get(key)
+            if cached and now - cached[0] < ttl:
+                if key is not None:
+                    self._filtered.move_to_end(key)
+                return cached[1]
+            if cached and key is not None:
+                del self._filtered[key]
+        total = count()
+        with self._lock:
+            if key is None:
+                self._total = (now, total)
+            else:
+                self._filtered[key] = (now, total)
+                self._filtered.move_to_end(key)
+                while len(self._filtered) > self.max_filtered:
+                    self._filtered.popitem(last=False)
+        return total
+
+    def bump(self, delta: int = 1):
+        """A row was inserted (or deleted, with a negative delta) and committed."""
+        with self._lock:
+            if self._total:
+                self._total = (self._total[0], max(self._total[1] + delta, 0))
+            self._filtered.clear()
+
+    def invalidate(self):
+        """Rows changed in a way that may move them across filters."""
+        with self._lock:
+            self._filtered.clear()
@@ -0,0 +1,143 @@
+"""
+Cross-worker messaging over PostgreSQL LISTEN/NOTIFY.
+
+Gunicorn workers share nothing in memory, so a worker that needs to tell the
+others about a write (live events, cache invalidation) sends a NOTIFY on a
+channel. Each worker runs ONE background thread holding ONE dedicated
+autocommit connection: it LISTENs on every subscribed channel, hands incoming
+payloads to the registered callbacks and sends this worker's queued NOTIFYs,
+so request threads never block on it. On SQLite (single process) notify() is
+a no-op and nothing is started.
+
+PostgreSQL limits payloads to ~8000 bytes and delivers a NOTIFY to the sender
+too; callers that must skip their own messages put WORKER_ID in the payload.
+"""
+import os
+import queue
+import select
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+# Identifies this worker process in payloads
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+RECONNECT_SECONDS = 5
+MAX_PAYLOAD_BYTES = 7900
+
+_callbacks: Dict[str, List[Callable[[str], None]]] = defaultdict(list)
+_outbox: "queue.Queue[tuple]" = queue.Queue(maxsize=10000)
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+_wake_r, _wake_w = os.pipe()
+os.set_blocking(_wake_r, False)
+os.set_blocking(_wake_w, False)
+
+
+def listen(channel: str, callback: Callable[[str], None]):
+    """Call `callback(payload)` in the listener thread for every NOTIFY on `channel`."""
+    with _lock:
+        _callbacks[channel].append(callback)
+    # The running connection picks up new channels on its next reconnect;
+    # nudge it so it LISTENs right away
+    _wake()
+
+
+def notify(channel: str, payload: str):
+    """Queue a NOTIFY for the other workers (best effort, dropped when not running)."""
+    if _thread is None or len(payload.encode()) > MAX_PAYLOAD_BYTES:
+        return
+    try:
+        _outbox.put_nowait((channel, payload))
+    except queue.Full:
+        return
+    _wake()
+
+
+def _wake():
+    try:
+        os.write(_wake_w, b"x")
+    except (BlockingIOError, OSError):
+        pass
+
+
+def _connect(database_url: str):
+    import psycopg2
+    from sqlalchemy.engine import make_url
+
+    url = make_url(database_url)
+    conn = psycopg2.connect(
+        dbname=url.database,
+        user=url.username,
+        password=url.password,
+        host=url.host,
+        port=url.port,
+        connect_timeout=10,
+    )
+    conn.set_session(autocommit=True)
+    return conn
+
+
+def _listen_loop(database_url: str):
+    while True:
+        conn = None
+        try:
+            conn = _connect(database_url)
+            listening = set()
+            while True:
+                with _lock:
+                    channels = set(_callbacks)
+                with conn.cursor() as cur:
+                    for channel in channels - listening:
+                        cur.execute(f'LISTEN "{channel}"')
+                        listening.add(channel)
+                    while True:
+                        try:
+                            channel, payload = _outbox.get_nowait()
+                        except queue.Empty:
+                            break
+                        cur.execute("SELECT pg_notify(%s, %s)", (channel, payload))
+
+                readable, _, _ = select.select([conn, _wake_r], [], [], 30)
+                if _wake_r in readable:
+                    try:
+                        os.read(_wake_r, 4096)
+                    except BlockingIOError:
+                        pass
+                conn.poll()
+                while conn.notifies:
+                    notification = conn.notifies.pop(0)
+                    with _lock:
+                        callbacks = list(_callbacks.get(notification.channel, ()))
+                    for callback in callbacks:
+                        try:
+                            callback(notification.payload)
+                        except Exception as e:
+                            print(f"[PG listener] Callback error on {notification.channel}: {e}")
+        except Exception as e:
+            print(f"[PG listener] Connection lost: {e}. Reconnecting in {RECONNECT_SECONDS}s")
+            time.sleep(RECONNECT_SECONDS)
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+
+def start_listener():
+    """Start this worker's LISTEN/NOTIFY thread (once, PostgreSQL only)."""
+    global _thread
+    from app.database import SQLALCHEMY_DATABASE_URL
+
+    if not SQLALCHEMY_DATABASE_URL.startswith("postgres"):
+        return
+    with _lock:
+        if _thread is not None and _thread.is_alive():
+            return
+        _thread = threading.Thread(
+            target=_listen_loop, args=(SQLALCHEMY_DATABASE_URL,), name="pg-listener", daemon=True
+        )
+        _thread.start()
@@ -0,0 +1,122 @@
+"""
+Keeps the room_reservations table in step with bookings.
+
+Every path that books, extends, cancels or checks out a booking updates the
+reservation rows in the same transaction. On PostgreSQL the exclusion
+constraint on room_reservations rejects overlapping stays at commit time, and
+commit_reservations() turns that rejection into the usual 400 response.
+"""
+import re
+from datetime import date
+from typing import List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.reservation import RoomReservation
+from app.models.room import Room
+
+# SQLSTATE raised by PostgreSQL for EXCLUDE constraint violations
+EXCLUSION_VIOLATION = "23P01"
+
+# Room id of the rejected key in the violation detail: "Key (int4range(room_id, ...), ...)=([7,8), [..."
+_CONFLICT_KEY = re.compile(r"=\(\[(\d+),")
+
+
+def reserve_rooms(
+    db: Session,
+    room_ids: List[int],
+    check_in: date,
+    check_out: date,
+    booking_id: Optional[int] = None,
+    package_booking_id: Optional[int] = None,
+):
+    db.add_all([
+        RoomReservation(
+            room_id=room_id,
+            booking_id=booking_id,
+            package_booking_id=package_booking_id,
+            check_in=check_in,
+            check_out=check_out,
+        )
+        for room_id in room_ids
+    ])
+
+
+def _reservations(db: Session, booking_id: Optional[int], package_booking_id: Optional[int]):
+    if booking_id is not None:
+        return db.query(RoomReservation).filter(RoomReservation.booking_id == booking_id)
+    return db.query(RoomReservation).filter(RoomReservation.package_booking_id == package_booking_id)
+
+
+def release_reservations(
+    db: Session,
+    booking_id: Optional[int] = None,
+    package_booking_id: Optional[int] = None,
+    room_ids: Optional[List[int]] = None,
+):
+    """Free a booking's rooms (all of them, or only `room_ids`) on cancel or checkout."""
+    query = _reservations(db, booking_id, package_booking_id)
+    if room_ids is not None:
+        query = query.filter(RoomReservation.room_id.in_(room_ids))
+    query.delete(synchronize_session=False)
+
+
+def extend_reservations(
+    db: Session,
+    new_check_out: date,
+    booking_id: Optional[int] = None,
+    package_booking_id: Optional[int] = None,
+):
+    _reservations(db, booking_id, package_booking_id).update(
+        {"check_out": new_check_out}, synchronize_session=False
+    )
+
+
+def _raise_if_unavailable(db: Session, error: IntegrityError, rooms: Optional[List[Room]]):
+    """Map an overlapping-reservation rejection to the standard 400; re-raise anything else."""
+    db.rollback()
+    if getattr(error.orig, "pgcode", None) != EXCLUSION_VIOLATION:
+        raise error
+    match = _CONFLICT_KEY.search(str(error.orig))
+    room_id = int(match.group(1)) if match else None
+    room = next((r for r in rooms or [] if r.id == room_id), None)
+    if room is None and room_id is not None:
+        room = db.query(Room).filter(Room.id == room_id).first()
+    if room is None and rooms:
+        room = rooms[0]
+    raise HTTPException(
+        status_code=400,
+        detail=f"Room {room.number if room else room_id} is not available for the selected dates."
+    )
+
+
+def flush_reservations(db: Session, rooms: Optional[List[Room]] = None):
+    """Flush pending reservations so later statements in the transaction can see them."""
+    try:
+        db.flush()
+    except IntegrityError as e:
+        _raise_if_unavailable(db, e, rooms)
+
+
+def insert_reservations(db: Session, rows: List[dict], rooms: Optional[List[Room]] = None):
+    """Batch form of reserve_rooms() + flush_reservations(): one executemany INSERT."""
+    if not rows:
+        return
+    try:
+        db.execute(insert(RoomReservation), rows)
+    except IntegrityError as e:
+        _raise_if_unavailable(db, e, rooms)
+
+
+def commit_reservations(db: Session, rooms: Optional[List[Room]] = None):
+    """
+    Commit the current transaction, mapping an overlapping-reservation rejection
+    to the standard 400 "Room X is not available" response.
+    """
+    try:
+        db.commit()
+    except IntegrityError as e:
+        _raise_if_unavailable(db, e, rooms)
@@ -1,116 +1,151 @@
-from sqlalchemy.orm import Session
+"""
+Room status rollover.
+
+A room's status follows today's stays: "Checked-in" when an active booking
+covering today is checked in, "Occupied" when it is only booked, otherwise
+"Available". Rooms under maintenance are left alone.
+
+The whole rollover is ONE set-based UPDATE over the rooms table. It runs at
+property-local midnight (see run_room_status_scheduler) and, scoped to the
+affected rooms, after booking, check-in, cancel and checkout writes - never
+from the read endpoints.
+"""
+import asyncio
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import case, exists, func, or_, select, update
 from sqlalchemy.exc import OperationalError, DisconnectionError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
 from app.models.room import Room
-from app.models.booking import Booking, BookingRoom
-from datetime import date
-import time
+from app.utils.availability import active_stays_query
+from app.utils.events import record_room_statuses
+
+# Timezone the property runs on; the nightly rollover fires at its midnight
+PROPERTY_TIMEZONE = ZoneInfo(os.getenv("PROPERTY_TIMEZONE", "Asia/Kolkata"))
 
-def update_room_statuses(db: Session):
+CHECKED_IN_STATUSES = ("checked-in", "checked_in")
+
+
+def property_today() -> date:
+    return datetime.now(PROPERTY_TIMEZONE).date()
+
+
+def _status_update(today: date, room_ids: Optional[list]):
+    stays = active_stays_query(room_ids, today, today + timedelta(days=1)).subquery()
+    stay_for_room = stays.c.room_id == Room.id
+    new_status = case(
+        (exists(select(stays.c.room_id).where(stay_for_room, stays.c.status.in_(CHECKED_IN_STATUSES))), "Checked-in"),
+        (exists(select(stays.c.room_id).where(stay_for_room)), "Occupied"),
+        else_="Available",
+    )
+    stmt = (
+        update(Room)
+        .values(status=new_status)
+        .where(
+            func.lower(func.coalesce(Room.status, "")) != "maintenance",
+            # Only rows whose status actually changes are written
+            or_(Room.status.is_(None), Room.status != new_status),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if room_ids is not None:
+        stmt = stmt.where(Room.id.in_(room_ids))
+    return stmt
+
+
+def update_room_statuses(db: Session, room_ids: Optional[Iterable[int]] = None, today: Optional[date] = None):
     """
-    Update room statuses based on current bookings.
-    Only shows current day status - not future bookings.
-    With improved error handling and retry logic.
+    Recompute room statuses from today's bookings with a single UPDATE and
+    commit. Pass `room_ids` to limit the rollover to the rooms a write touched.
+    Returns the number of rooms whose status changed.
     """
     max_retries = 3
     retry_delay = 1
-    
+    today = today or property_today()
+    if room_ids is not None:
+        room_ids = list(room_ids)
+        if not room_ids:
+            return 0
+
     for attempt in range(max_retries):
         try:
-            today = date.today()
-            
-            # Use with_for_update(nowait=True) to prevent deadlocks, but fallback if it fails
-            try:
-                rooms = db.query(Room).with_for_update(skip_locked=True).all()
-            except Exception:
-                # Fallback to regular query if row-level locking fails
-                rooms = db.query(Room).all()
-            
-            updated_count = 0
-            for room in rooms:
-                try:
-                    # Check if room has active bookings (currently occupied or checked-in)
-                    # Normalize status values to handle both formats
-                    active_booking = db.query(BookingRoom).join(Booking).filter(
-                        BookingRoom.room_id == room.id,
-                        Booking.status.in_(['booked', 'checked-in', 'checked_in']),
-                        Booking.check_in <= today,
-                        Booking.check_out > today
-                    ).first()
-                    
-                    # Check for active package bookings too
-                    from app.models.Package import PackageBooking, PackageBookingRoom
-                    active_package_booking = db.query(PackageBookingRoom).join(PackageBooking).filter(
-                        PackageBookingRoom.room_id == room.id,
-                        PackageBooking.status.in_(['booked', 'checked-in', 'checked_in']),
-                        PackageBooking.check_in <= today,
-                        PackageBooking.check_out > today
-                    ).first()
-                    
-                    new_status = None
-                    if active_booking or active_package_booking:
-                        # Check if the booking is actually checked-in (not just booked)
-                        is_checked_in = False
-                        if active_booking:
-                            normalized_status = active_booking.booking.status.lower().replace('-', '').replace('_', '').replace(' ', '')
-                            is_checked_in = normalized_status == 'checkedin'
-                        if not is_checked_in and active_package_booking:
-                            normalized_status = active_package_booking.package_booking.status.lower().replace('-', '').replace('_', '').replace(' ', '')
-                            is_checked_in = normalized_status == 'checkedin'
-                        
-                        # Set status based on whether booking is checked-in or just booked
-                        if is_checked_in:
-                            new_status = "Checked-in"
-                        else:
-                            new_status = "Occupied"
-                    else:
-                        # Check if booking has ended today or before
-                        past_booking = db.query(BookingRoom).join(Booking).filter(
-                            BookingRoom.room_id == room.id,
-                            Booking.status.in_(['booked', 'checked-in', 'checked_in']),
-                            Booking.check_out <= today
-                        ).first()
-                        
-                        # No active booking, make available
-                        new_status = "Available"
-                    
-                    # Only update if status changed to reduce unnecessary commits
-                    if room.status != new_status:
-                        room.status = new_status
-                        updated_count += 1
-                        
-                except Exception as room_error:
-                    # Log individual room errors but continue processing
-                    print(f"Error updating room {room.id}: {room_error}")
-                    continue
-            
-            try:
-                db.commit()
-            except Exception as commit_err:
-                # Roll back any failed commit to avoid pending transaction errors
-                db.rollback()
-                print(f"Commit failed during room status update: {commit_err}")
-                return 0
-            if updated_count > 0:
-                print(f"Updated room statuses for {updated_count} out of {len(rooms)} rooms")
+            changed = dict(db.execute(_status_update(today, room_ids).returning(Room.id, Room.status)).all())
+            updated_count = len(changed)
+            record_room_statuses(db, changed)
+            db.commit()
+            if updated_count:
+                print(f"Updated room statuses for {updated_count} rooms")
             return updated_count
-            
         except (OperationalError, DisconnectionError) as e:
             db.rollback()
             if attempt < max_retries - 1:
                 print(f"Database error (attempt {attempt + 1}/{max_retries}): {e}. Retrying...")
                 time.sleep(retry_delay * (attempt + 1))
-                # Try to refresh the session
-                db.expire_all()
                 continue
-            else:
-                print(f"Error updating room statuses after {max_retries} attempts: {e}")
-                # Don't raise - let the endpoint handle gracefully
-                return 0
+            print(f"Error updating room statuses after {max_retries} attempts: {e}")
+            return 0
         except Exception as e:
             db.rollback()
             print(f"Error updating room statuses: {e}")
-            print(f"Error type: {type(e)}")
-            # Don't raise - allow room fetching to continue even if status update fails
             return 0
-    
     return 0
+
+
+def apply_room_statuses(db: Session, rooms: List[Room], today: Optional[date] = None):
+    """
+    Same rollover for `rooms` inside the caller's transaction (no commit). The
+    loaded Room objects are updated in place from UPDATE ... RETURNING, so
+    they can be serialized after commit without reloading.
+    """
+    if not rooms:
+        return
+    stmt = _status_update(today or property_today(), [room.id for room in rooms]).returning(Room.id, Room.status)
+    changed = dict(db.execute(stmt).all())
+    record_room_statuses(db, changed)
+    for room in rooms:
+        if room.id in changed:
+            set_committed_value(room, "status", changed[room.id])
+
+
+def refresh_room_statuses(db: Session, room_ids: Iterable[int]):
+    """Roll the given rooms' statuses forward after a booking write has committed."""
+    update_room_statuses(db, room_ids=room_ids)
+    # The UPDATE bypasses the session, so reload the rooms on next access
+    db.expire_all()
+
+
+# ---- Nightly scheduler ----
+
+def _seconds_until_midnight() -> float:
+    now = datetime.now(PROPERTY_TIMEZONE)
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=PROPERTY_TIMEZONE)
+    return max((midnight - now).total_seconds(), 1)
+
+
+def _run_rollover():
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        return update_room_statuses(db)
+    finally:
+        db.close()
+
+
+async def run_room_status_scheduler():
+    """
+    Background task: roll statuses over once at startup and then at every
+    property-local midnight. Each worker runs it; the UPDATE is idempotent and
+    only touches rows whose status changes, so concurrent runs are harmless.
+    """
+    while True:
+        try:
+            await asyncio.to_thread(_run_rollover)
+        except Exception as e:
+            print(f"Room status rollover failed: {e}")
+        await asyncio.sleep(_seconds_until_midnight())
@@ -0,0 +1,109 @@
+"""
+Landing page content in one response.
+
+GET /api/site-content returns every active CMS section that the landing page
+and userend otherwise load with one request each. The payload is built once,
+serialized, and compressed ahead of time with gzip and, when the brotli
+package is installed, brotli. It lives in a cache namespace over the CMS
+tables, so any committed CMS write in any worker (app/utils/cache.py) makes
+the next request rebuild it. Concurrent requests after a write share a single
+rebuild.
+"""
+import gzip
+import json
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Type
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+import app.models.frontend as models
+import app.schemas.frontend as schemas
+from app.utils.cache import get_namespace
+from app.utils.http_cache import make_etag
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+# Payload key -> (model, schema). Check-availability rows are guest enquiries
+# (names, emails, phone numbers), not page content, so they are not included.
+SECTIONS: Dict[str, Tuple[type, Type[BaseModel]]] = {
+    "header_banner": (models.HeaderBanner, schemas.HeaderBanner),
+    "gallery": (models.Gallery, schemas.Gallery),
+    "reviews": (models.Review, schemas.Review),
+    "resort_info": (models.ResortInfo, schemas.ResortInfo),
+    "signature_experiences": (models.SignatureExperience, schemas.SignatureExperience),
+    "plan_weddings": (models.PlanWedding, schemas.PlanWedding),
+    "nearby_attractions": (models.NearbyAttraction, schemas.NearbyAttraction),
+    "nearby_attraction_banners": (models.NearbyAttractionBanner, schemas.NearbyAttractionBanner),
+}
+
+_namespace = get_namespace(
+    "site_content",
+    tables=[model.__tablename__ for model, _ in SECTIONS.values()],
+    maxsize=1,
+    ttl=3600,
+)
+_build_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class SiteContent:
+    etag: str
+    body: bytes
+    gzip_body: bytes
+    brotli_body: Optional[bytes]
+
+    def encoded(self, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+        """Body and Content-Encoding to send for a request's Accept-Encoding."""
+        accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+        if self.brotli_body is not None and "br" in accepted:
+            return self.brotli_body, "br"
+        if "gzip" in accepted:
+            return self.gzip_body, "gzip"
+        return self.body, None
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        """Strong ETag of the body sent with `encoding`; each content-coding needs its own."""
+        return self.etag if encoding is None else f'{self.etag[:-1]}-{encoding}"'
+
+
+def _section(db: Session, key: str, model, schema: Type[BaseModel]) -> List[dict]:
+    rows = db.query(model).filter(model.is_active.isnot(False)).order_by(model.id).all()
+    items = []
+    for row in rows:
+        try:
+            items.append(jsonable_encoder(schema.model_validate(row)))
+        except Exception as e:
+            # One incomplete CMS row must not take the whole landing page down
+            print(f"Skipping invalid {key} row {row.id}: {e}")
+    return items
+
+
+def build_site_content(db: Session) -> SiteContent:
+    payload = {key: _section(db, key, model, schema) for key, (model, schema) in SECTIONS.items()}
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    return SiteContent(
+        etag=make_etag(body),
+        body=body,
+        gzip_body=gzip.compress(body, compresslevel=9, mtime=0),
+        brotli_body=brotli.compress(body, quality=11) if brotli else None,
+    )
+
+
+def get_site_content(db: Session) -> SiteContent:
+    content = _namespace.get("payload", None)
+    if content is not None:
+        return content
+    with _build_lock:
+        # Another request may have rebuilt it while this one waited
+        content = _namespace.get("payload", None)
+        if content is None:
+            generation = _namespace.generation
+            content = build_site_content(db)
+            _namespace.set("payload", content, generation)
+    return content
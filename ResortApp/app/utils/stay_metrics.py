@@ -0,0 +1,256 @@
+"""
+Occupancy, ADR and RevPAR over a date range.
+
+Every regular and package booking that is not cancelled and overlaps the
+range is loaded with one query per kind, one row per booked room. NumPy
+expands the rows into room-nights inside the range (np.repeat plus offsets,
+no per-night Python loop). Each night is assigned to its group (day, ISO
+week, month or room type), and the figures are bincounts over the group
+index:
+
+- occupancy = rooms sold / rooms available (every room, every day);
+- ADR = room revenue / rooms sold;
+- RevPAR = room revenue / rooms available.
+
+Room revenue is the booked rate: the room's price per night, the package's
+price per room and night, or a whole-property package's price spread over
+its room-nights. Prices are the current ones, as bills use them.
+
+Length of stay covers the stays arriving in the range: the nights booked,
+bucketed by count, and the average per group.
+"""
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+import numpy as np
+from sqlalchemy import Date, DateTime, Integer, cast, func, literal, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking, BookingRoom
+from app.models.Package import Package, PackageBooking, PackageBookingRoom
+from app.models.room import Room
+from app.utils.folio import is_whole_property
+
+GROUP_BY = ("day", "week", "month", "room_type")
+UNSPECIFIED_ROOM_TYPE = "Unspecified"
+EPOCH = date(1970, 1, 1)
+
+
+def _days(values) -> np.ndarray:
+    """Dates as day numbers since 1970-01-01."""
+    return np.array(values, dtype="datetime64[D]").astype(np.int64)
+
+
+def _day_number(db: Session, column):
+    """A date column as its day number, computed by the database (building date objects is the slow part)."""
+    if db.get_bind().dialect.name == "postgresql":
+        if isinstance(column.type, DateTime):
+            column = cast(column, Date)
+        return column - literal(EPOCH)
+    return cast(func.julianday(column) - 2440587.5, Integer)
+
+
+def load_stays(db: Session, start: date, end: date) -> Dict[str, np.ndarray]:
+    """
+    One row per booked room of the stays with nights in [start, end) or
+    arriving in it: stay key, check-in, check-out, booking day (check-in if
+    unknown), room type and nightly rate, all days as day numbers.
+    """
+    columns: Dict[str, list] = {"stay": [], "check_in": [], "check_out": [], "created": [], "room_type": [], "rate": []}
+    # Plain rows from the connection: no ORM row processing for ~100k rows
+    connection = db.connection()
+
+    regular = connection.execute(
+        select(
+            Booking.id,
+            _day_number(db, Booking.check_in),
+            _day_number(db, Booking.check_out),
+            func.coalesce(_day_number(db, Booking.created_at), _day_number(db, Booking.check_in)),
+            Room.type,
+            Room.price,
+        )
+        .join(BookingRoom, BookingRoom.booking_id == Booking.id)
+        .join(Room, Room.id == BookingRoom.room_id)
+        .where(
+            or_(Booking.status.is_(None), Booking.status != "cancelled"),
+            Booking.check_in < end,
+            Booking.check_out >= start,
+        )
+    ).all()
+    if regular:
+        ids, check_ins, check_outs, created, types, prices = zip(*regular)
+        # Regular and package booking ids share a key space: even and odd
+        columns["stay"].append(np.array(ids, dtype=np.int64) * 2)
+        columns["check_in"].append(np.array(check_ins, dtype=np.int64))
+        columns["check_out"].append(np.array(check_outs, dtype=np.int64))
+        columns["created"].append(np.array(created, dtype=np.int64))
+        columns["room_type"].extend(types)
+        columns["rate"].append(np.array([price or 0 for price in prices], dtype=np.float64))
+
+    packaged = connection.execute(
+        select(
+            PackageBooking.id,
+            _day_number(db, PackageBooking.check_in),
+            _day_number(db, PackageBooking.check_out),
+            func.coalesce(_day_number(db, PackageBooking.created_at), _day_number(db, PackageBooking.check_in)),
+            Room.type,
+            PackageBooking.package_id,
+        )
+        .join(PackageBookingRoom, PackageBookingRoom.package_booking_id == PackageBooking.id)
+        .join(Room, Room.id == PackageBookingRoom.room_id)
+        .where(
+            or_(PackageBooking.status.is_(None), PackageBooking.status != "cancelled"),
+            PackageBooking.check_in < end,
+            PackageBooking.check_out >= start,
+        )
+    ).all()
+    if packaged:
+        ids, check_ins, check_outs, created, types, package_ids = zip(*packaged)
+        packages = {
+            package.id: (float(package.price or 0), is_whole_property(package))
+            for package in db.execute(
+                select(Package.id, Package.price, Package.booking_type, Package.room_types)
+                .where(Package.id.in_(set(package_ids)))
+            )
+        }
+        ids = np.array(ids, dtype=np.int64)
+        check_ins, check_outs = np.array(check_ins, dtype=np.int64), np.array(check_outs, dtype=np.int64)
+        price = np.array([packages.get(p, (0.0, False))[0] for p in package_ids], dtype=np.float64)
+        whole = np.array([packages.get(p, (0.0, False))[1] for p in package_ids], dtype=bool)
+        # A whole-property package is priced per stay: spread it over the stay's room-nights
+        _, booking_index, rooms_per_booking = np.unique(ids, return_inverse=True, return_counts=True)
+        room_nights = rooms_per_booking[booking_index] * np.maximum(check_outs - check_ins, 1)
+        columns["stay"].append(ids * 2 + 1)
+        columns["check_in"].append(check_ins)
+        columns["check_out"].append(check_outs)
+        columns["created"].append(np.array(created, dtype=np.int64))
+        columns["room_type"].extend(types)
+        columns["rate"].append(np.where(whole, price / room_nights, price))
+
+    if not columns["stay"]:
+        empty = np.zeros(0, dtype=np.int64)
+        return {
+            "stay": empty, "check_in": empty, "check_out": empty, "created": empty,
+            "room_type": np.zeros(0, dtype=object), "rate": np.zeros(0),
+        }
+    return {
+        "stay": np.concatenate(columns["stay"]),
+        "check_in": np.concatenate(columns["check_in"]),
+        "check_out": np.concatenate(columns["check_out"]),
+        "created": np.concatenate(columns["created"]),
+        "room_type": np.array([t or UNSPECIFIED_ROOM_TYPE for t in columns["room_type"]], dtype=object),
+        "rate": np.concatenate(columns["rate"]),
+    }
+
+
+def _period_keys(days: np.ndarray, group_by: str) -> np.ndarray:
+    """The first day of each day's group, as a day number."""
+    if group_by == "week":
+        return days - (days + 3) % 7  # day 0 was a Thursday; weeks start on Monday
+    if group_by == "month":
+        return days.astype("datetime64[D]").astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    return days
+
+
+def expand_nights(check_in: np.ndarray, check_out: np.ndarray, first: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(row index, night) of every booked night inside [first, end)."""
+    lo = np.maximum(check_in, first)
+    nights = np.clip(np.minimum(check_out, end) - lo, 0, None)
+    rows = np.repeat(np.arange(len(nights)), nights)
+    # Offset of each night within its row: position minus the row's first position
+    offsets = np.arange(len(rows)) - np.repeat(np.cumsum(nights) - nights, nights)
+    return rows, lo[rows] + offsets
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    return np.divide(numerator * scale, denominator, out=np.zeros(len(numerator)), where=denominator > 0)
+
+
+def _figures(labels, available, sold, revenue, arrivals, stay_nights) -> List[dict]:
+    occupancy = _ratio(sold, available, 100.0)
+    adr = _ratio(revenue, sold)
+    revpar = _ratio(revenue, available)
+    average_stay = _ratio(stay_nights, arrivals)
+    return [
+        {
+            "key": labels[i],
+            "rooms_available": int(available[i]),
+            "rooms_sold": int(sold[i]),
+            "occupancy": round(float(occupancy[i]), 2),
+            "room_revenue": round(float(revenue[i]), 2),
+            "adr": round(float(adr[i]), 2),
+            "revpar": round(float(revpar[i]), 2),
+            "arrivals": int(arrivals[i]),
+            "average_length_of_stay": round(float(average_stay[i]), 2),
+        }
+        for i in range(len(labels))
+    ]
+
+
+def stay_metrics(db: Session, start: date, end: date, group_by: str = "day") -> dict:
+    """Figures for the nights start..end (inclusive), grouped by `group_by` (one of GROUP_BY)."""
+    range_end = end + timedelta(days=1)
+    first, stop = int(_days([start])[0]), int(_days([range_end])[0])
+    stays = load_stays(db, start, range_end)
+
+    room_types = db.execute(select(Room.type)).scalars().all()
+    room_types = np.array([t or UNSPECIFIED_ROOM_TYPE for t in room_types], dtype=object)
+    range_days = np.arange(first, stop)
+
+    rows, nights = expand_nights(stays["check_in"], stays["check_out"], first, stop)
+    # Stays arriving in the range, once per stay (per stay and room type for room_type)
+    arriving = (stays["check_in"] >= first) & (stays["check_in"] < stop)
+
+    if group_by == "room_type":
+        labels, type_index = np.unique(np.concatenate([room_types, stays["room_type"]]).astype(str), return_inverse=True)
+        room_type_index, stay_type_index = type_index[: len(room_types)], type_index[len(room_types):]
+        groups = len(labels)
+        available = np.bincount(room_type_index, minlength=groups) * len(range_days)
+        night_group = stay_type_index[rows]
+        arrival_key = stays["stay"] * groups + stay_type_index
+        arrival_group = stay_type_index
+        labels = labels.tolist()
+    else:
+        period_keys, day_group = np.unique(_period_keys(range_days, group_by), return_inverse=True)
+        groups = len(period_keys)
+        available = np.bincount(day_group, minlength=groups) * len(room_types)
+        night_group = day_group[nights - first]
+        arrival_key = stays["stay"]
+        arrival_group = day_group[np.clip(stays["check_in"] - first, 0, max(len(range_days) - 1, 0))]
+        unit = "datetime64[M]" if group_by == "month" else "datetime64[D]"
+        labels = [str(key) for key in period_keys.astype("datetime64[D]").astype(unit)]
+
+    sold = np.bincount(night_group, minlength=groups)
+    revenue = np.bincount(night_group, weights=stays["rate"][rows], minlength=groups)
+
+    stay_length = np.maximum(stays["check_out"] - stays["check_in"], 0)
+    _, first_rows = np.unique(arrival_key[arriving], return_index=True)
+    arrival_rows = np.flatnonzero(arriving)[first_rows]
+    arrivals = np.bincount(arrival_group[arrival_rows], minlength=groups)
+    arrival_nights = np.bincount(arrival_group[arrival_rows], weights=stay_length[arrival_rows], minlength=groups)
+
+    # Length-of-stay distribution over the stays themselves, whatever the grouping
+    _, stay_rows = np.unique(stays["stay"][arriving], return_index=True)
+    lengths = stay_length[np.flatnonzero(arriving)[stay_rows]]
+    distribution = np.bincount(lengths) if len(lengths) else np.zeros(0, dtype=np.int64)
+
+    totals = _figures(
+        ["total"],
+        np.array([len(range_days) * len(room_types)]),
+        np.array([len(nights)]),
+        np.array([stays["rate"][rows].sum()]),
+        np.array([len(lengths)]),
+        np.array([lengths.sum()]),
+    )[0]
+    del totals["key"]
+    return {
+        "from": start,
+        "to": end,
+        "group_by": group_by,
+        "totals": totals,
+        "groups": _figures(labels, available, sold, revenue, arrivals, arrival_nights),
+        "length_of_stay": {
+            "distribution": [{"nights": n, "stays": int(count)} for n, count in enumerate(distribution) if count],
+            "median": float(np.median(lengths)) if len(lengths) else 0.0,
+        },
+    }
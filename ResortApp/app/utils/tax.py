@@ -0,0 +1,185 @@
+"""
+GST rules and tax computation.
+
+All tax rates live in one versioned rule table. Each rule set applies from
+its effective date until the next one starts, and gives every charge
+category a list of slabs: the slab is picked by the charge for the whole
+stay ("per_stay") or by the charge per night ("per_night"), and its rate
+applies to the whole charge. The built-in table below can be replaced by a
+JSON file of the same shape (TAX_RULES_FILE), e.g. when rates change.
+
+The table is parsed once per worker into frozen dataclasses and tuples, so
+picking a rule is two bisects and nothing is re-read per bill. Money is
+Decimal throughout: amounts are converted from their decimal text, each tax
+is rounded half-up to the paisa, and sums never drift the way floats do.
+compute_taxes() handles a whole batch of line items in one pass; checkout,
+the bill previews, booking emails and the GST report all go through it.
+"""
+import json
+import os
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+# Charge categories
+ROOM = "room"
+PACKAGE = "package"
+FOOD = "food"
+SERVICE = "service"
+# The estimated tax line of booking confirmation emails
+BOOKING_QUOTE = "booking_quote"
+
+PER_STAY = "per_stay"
+PER_NIGHT = "per_night"
+
+PAISA = Decimal("0.01")
+ZERO = Decimal("0")
+_NO_LIMIT = Decimal("Infinity")
+
+TAX_RULES_FILE = os.getenv("TAX_RULES_FILE")
+
+# Slabs are [upper bound (inclusive, null for no limit), rate]
+BUILTIN_RULES = [
+    {
+        "version": "gst-2017",
+        "effective_from": "2017-07-01",
+        "categories": {
+            # 12% up to ₹7,500, 18% above, judged on the stay's total as before
+            ROOM: {"basis": PER_STAY, "slabs": [[7500, "0.12"], [None, "0.18"]]},
+            PACKAGE: {"basis": PER_STAY, "slabs": [[7500, "0.12"], [None, "0.18"]]},
+            FOOD: {"slabs": [[None, "0.05"]]},
+            SERVICE: {"slabs": [[None, "0"]]},
+            BOOKING_QUOTE: {"slabs": [[None, "0.05"]]},
+        },
+    },
+]
+
+
+def money(value: Any) -> Decimal:
+    """`value` as Decimal; floats go through their shortest repr, so 0.1 stays 0.1."""
+    if isinstance(value, Decimal):
+        return value
+    if value is None:
+        return ZERO
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    return Decimal(value)
+
+
+@dataclass(frozen=True)
+class CategoryRule:
+    basis: str
+    bounds: Tuple[Decimal, ...]  # inclusive upper bound of each slab; the last is Infinity
+    rates: Tuple[Decimal, ...]
+
+    def rate(self, amount: Decimal, nights: int = 1) -> Decimal:
+        if self.basis == PER_NIGHT and nights > 1:
+            amount = amount / nights
+        return self.rates[bisect_left(self.bounds, amount)]
+
+
+@dataclass(frozen=True)
+class TaxRuleSet:
+    version: str
+    effective_from: date
+    categories: Mapping[str, CategoryRule]
+
+    def rule(self, category: str) -> CategoryRule:
+        try:
+            return self.categories[category]
+        except KeyError:
+            raise ValueError(f"Tax rules {self.version} have no rate for '{category}'")
+
+
+@dataclass(frozen=True)
+class RuleTable:
+    starts: Tuple[date, ...]
+    rule_sets: Tuple[TaxRuleSet, ...]
+
+    def on(self, day: date) -> TaxRuleSet:
+        index = bisect_right(self.starts, day) - 1
+        if index < 0:
+            raise ValueError(f"No tax rules in effect on {day}")
+        return self.rule_sets[index]
+
+
+def _parse_category(name: str, spec: dict) -> CategoryRule:
+    basis = spec.get("basis", PER_STAY)
+    if basis not in (PER_STAY, PER_NIGHT):
+        raise ValueError(f"Unknown slab basis '{basis}' for '{name}'")
+    slabs = spec["slabs"]
+    bounds = tuple(_NO_LIMIT if bound is None else Decimal(str(bound)) for bound, _ in slabs)
+    if bounds[-1] != _NO_LIMIT or list(bounds) != sorted(set(bounds)):
+        raise ValueError(f"Slabs for '{name}' must ascend and end with no limit")
+    return CategoryRule(basis=basis, bounds=bounds, rates=tuple(Decimal(str(rate)) for _, rate in slabs))
+
+
+def _parse_rules(raw: list) -> RuleTable:
+    rule_sets = sorted(
+        (
+            TaxRuleSet(
+                version=entry["version"],
+                effective_from=date.fromisoformat(entry["effective_from"]),
+                categories=MappingProxyType(
+                    {name: _parse_category(name, spec) for name, spec in entry["categories"].items()}
+                ),
+            )
+            for entry in raw
+        ),
+        key=lambda rule_set: rule_set.effective_from,
+    )
+    return RuleTable(starts=tuple(r.effective_from for r in rule_sets), rule_sets=tuple(rule_sets))
+
+
+@lru_cache(maxsize=1)
+def rule_table() -> RuleTable:
+    """The rule table, loaded once per worker."""
+    if TAX_RULES_FILE:
+        with open(TAX_RULES_FILE, encoding="utf-8") as f:
+            return _parse_rules(json.load(f))
+    return _parse_rules(BUILTIN_RULES)
+
+
+class TaxLine(NamedTuple):
+    category: str
+    amount: Any  # int, float or Decimal
+    nights: int = 1
+    on: Optional[date] = None  # date the charge is billed; selects the rule set
+
+
+def compute_taxes(lines: Iterable[TaxLine], on: Optional[date] = None) -> List[Decimal]:
+    """
+    Tax of every line, in order, rounded to the paisa. Lines without their
+    own date are taxed under the rules in effect on `on` (default: today).
+    """
+    table = rule_table()
+    default_rules = table.on(on or date.today())
+    rules_by_day = {}
+    taxes = []
+    for category, amount, nights, day in lines:
+        amount = money(amount)
+        if amount <= 0:
+            taxes.append(ZERO)
+            continue
+        if day is None:
+            rules = default_rules
+        else:
+            rules = rules_by_day.get(day)
+            if rules is None:
+                rules = rules_by_day[day] = table.on(day)
+        rate = rules.rule(category).rate(amount, nights or 1)
+        taxes.append((amount * rate).quantize(PAISA, rounding=ROUND_HALF_UP))
+    return taxes
+
+
+def tax_rate(category: str, amount: Any = ZERO, nights: int = 1, on: Optional[date] = None) -> Decimal:
+    """The rate that applies to one charge, e.g. for a "Tax (5%)" label."""
+    return rule_table().on(on or date.today()).rule(category).rate(money(amount), nights or 1)
+
+
+def tax_for(category: str, amount: Any, nights: int = 1, on: Optional[date] = None) -> Decimal:
+    return compute_taxes([TaxLine(category, amount, nights)], on=on)[0]
@@ -0,0 +1,238 @@
+"""
+Shared upload service for images.
+
+Uploads are streamed to disk in chunks (aiofiles in async handlers, plain
+file writes in sync handlers, which already run in the threadpool) while
+their SHA-256 is computed, so no file is ever held in memory whole. Size and
+type limits are enforced as the bytes arrive: the type is sniffed from the
+file's magic bytes rather than trusted from the client's filename or
+Content-Type.
+
+Files are stored content-addressed, as <root>/ab/cd/<sha256>.<ext>. The same
+image uploaded twice is stored once, and a stored file never changes, so
+UploadStaticFiles serves content-addressed files with immutable, year-long
+cache headers. Because one file may back several rows, replacing or deleting a row
+must not delete its content-addressed file; discard_upload() only removes the
+legacy per-upload files written before this service existed.
+"""
+import hashlib
+import os
+import re
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException, UploadFile
+from fastapi.staticfiles import StaticFiles
+
+from app.utils.image_variants import VARIANT_WIDTHS, generate_variants, generate_variants_sync, variant_path
+
+# ResortApp/, the working directory the static mounts are relative to
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CHUNK_SIZE = 1024 * 1024
+MAX_IMAGE_BYTES = int(os.getenv("UPLOAD_MAX_MB", "10")) * 1024 * 1024
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# <sha256>.<ext>, or <sha256>.<variant>.webp for its image variants
+_STORED_NAME = re.compile(r"^[0-9a-f]{64}(\.[a-z]+)?\.[a-z0-9]+$")
+
+
+def _sniff_image(head: bytes) -> Optional[tuple]:
+    """(extension, content type) from an image's first bytes, or None."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpg", "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png", "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif", "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp", "image/webp"
+    return None
+
+
+@dataclass(frozen=True)
+class StoredFile:
+    name: str  # <sha256>.<ext>; what check-in proofs store on the booking
+    relative: str  # ab/cd/<name>, relative to the store's root
+    path: str
+    url: Optional[str]  # None for stores that are not publicly mounted
+    sha256: str
+    size: int
+    content_type: str
+    deduplicated: bool
+
+
+class _Digest:
+    """Validates and hashes an upload chunk by chunk."""
+
+    def __init__(self, upload: UploadFile, max_bytes: int):
+        self.upload = upload
+        self.max_bytes = max_bytes
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.kind = None
+
+    def feed(self, chunk: bytes):
+        if self.kind is None:
+            self.kind = _sniff_image(chunk)
+            if self.kind is None:
+                raise HTTPException(
+                    status_code=415,
+                    detail=f"Unsupported file type for {self.upload.filename or 'upload'}; use JPEG, PNG, GIF or WebP",
+                )
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"{self.upload.filename or 'Upload'} is larger than {self.max_bytes // (1024 * 1024)} MB",
+            )
+        self.hash.update(chunk)
+
+    def finish(self):
+        if self.size == 0:
+            raise HTTPException(status_code=400, detail=f"{self.upload.filename or 'Upload'} is empty")
+
+
+class ContentStore:
+    """A directory of content-addressed files, optionally published at `url_prefix`."""
+
+    def __init__(
+        self,
+        root: str,
+        url_prefix: Optional[str] = None,
+        max_bytes: int = MAX_IMAGE_BYTES,
+        variants: bool = False,
+    ):
+        self.root = root if os.path.isabs(root) else os.path.join(BASE_DIR, root)
+        self.url_prefix = url_prefix
+        self.variants = variants  # generate responsive WebP variants (app/utils/image_variants.py)
+        self.max_bytes = max_bytes
+        self.tmp_dir = os.path.join(self.root, ".tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def _relative(self, name: str) -> str:
+        return f"{name[:2]}/{name[2:4]}/{name}"
+
+    def locate(self, name: str) -> Optional[str]:
+        """
+        Path of a stored file by the name saved on a row, or None. Names
+        without a hash are legacy flat files in the root; anything that could
+        escape the root is rejected.
+        """
+        if not name or name != os.path.basename(name) or name.startswith("."):
+            return None
+        path = os.path.join(self.root, self._relative(name)) if _STORED_NAME.match(name) else os.path.join(self.root, name)
+        return path if os.path.isfile(path) else None
+
+    def _tmp_path(self) -> str:
+        return os.path.join(self.tmp_dir, uuid.uuid4().hex)
+
+    def _destination(self, digest: _Digest) -> tuple:
+        digest.finish()
+        name = f"{digest.hash.hexdigest()}.{digest.kind[0]}"
+        relative = self._relative(name)
+        return name, relative, os.path.join(self.root, relative)
+
+    def _result(self, digest: _Digest, name: str, relative: str, path: str, deduplicated: bool) -> StoredFile:
+        return StoredFile(
+            name=name,
+            relative=relative,
+            path=path,
+            url=f"{self.url_prefix}/{relative}" if self.url_prefix else None,
+            sha256=name.split(".")[0],
+            size=digest.size,
+            content_type=digest.kind[1],
+            deduplicated=deduplicated,
+        )
+
+    async def save(self, upload: UploadFile) -> StoredFile:
+        """Stream `upload` into the store without blocking the event loop."""
+        digest = _Digest(upload, self.max_bytes)
+        tmp_path = self._tmp_path()
+        try:
+            await upload.seek(0)
+            async with aiofiles.open(tmp_path, "wb") as out:
+                while True:
+                    chunk = await upload.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.feed(chunk)
+                    await out.write(chunk)
+            name, relative, path = self._destination(digest)
+            deduplicated = await aiofiles.os.path.exists(path)
+            if not deduplicated:
+                await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Atomic, so a reader never sees a partly written file
+                await aiofiles.os.replace(tmp_path, path)
+            if self.variants:
+                await generate_variants(path)
+            return self._result(digest, name, relative, path, deduplicated)
+        finally:
+            if await aiofiles.os.path.exists(tmp_path):
+                await aiofiles.os.remove(tmp_path)
+
+    def save_sync(self, upload: UploadFile) -> StoredFile:
+        """Same as save(), for sync handlers (which FastAPI runs in its threadpool)."""
+        digest = _Digest(upload, self.max_bytes)
+        tmp_path = self._tmp_path()
+        try:
+            upload.file.seek(0)
+            with open(tmp_path, "wb") as out:
+                while True:
+                    chunk = upload.file.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.feed(chunk)
+                    out.write(chunk)
+            name, relative, path = self._destination(digest)
+            deduplicated = os.path.exists(path)
+            if not deduplicated:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+            if self.variants:
+                generate_variants_sync(path)
+            return self._result(digest, name, relative, path, deduplicated)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def is_content_addressed(path: str) -> bool:
+    return bool(_STORED_NAME.match(os.path.basename(path or "")))
+
+
+# Public images: rooms, packages, CMS sections and food items store the URL
+media_store = ContentStore(os.path.join("static", "media"), "/static/media", variants=True)
+# Food categories store the path under /static/food_categories, as before
+food_category_store = ContentStore(os.path.join("static", "food_categories"), "/static/food_categories")
+# Guest ID cards and photos; served only through the check-in image endpoints
+checkin_store = ContentStore(os.path.join("uploads", "checkin_proofs"))
+
+
+def discard_upload(url: Optional[str]):
+    """
+    Delete the file behind a replaced or deleted image URL, if it is a legacy
+    per-upload file. Content-addressed files may back other rows and are kept.
+    """
+    if not url or is_content_addressed(url):
+        return
+    path = os.path.join(BASE_DIR, url.lstrip("/"))
+    for file_path in [path] + [variant_path(path, name) for name in VARIANT_WIDTHS]:
+        if os.path.isfile(file_path):
+            try:
+                os.remove(file_path)
+            except OSError as e:
+                print(f"Failed to remove old upload {file_path}: {e}")
+
+
+class UploadStaticFiles(StaticFiles):
+    """StaticFiles that marks content-addressed files immutable: their URL changes with their content."""
+
+    async def get_response(self, path: str, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code == 200 and is_content_addressed(path):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
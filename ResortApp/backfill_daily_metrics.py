@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Build the dashboard's daily_metrics rollup (app/utils/daily_metrics.py) from
+existing checkouts, bookings and food orders. Days are recomputed from the
+source tables, so it is safe to re-run, and the all-time totals are re-derived
+from the day rows at the end.
+
+Usage:
+    cd ResortApp
+    source venv/bin/activate
+    python3 backfill_daily_metrics.py [--from YYYY-MM-DD] [--to YYYY-MM-DD] [--chunk-days N]
+
+The range defaults to the earliest and latest dates in the source tables.
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sqlalchemy import func, select
+
+from app.database import SessionLocal
+from app.models.booking import Booking
+from app.models.checkout import Checkout
+from app.models.foodorder import FoodOrder
+from app.models.Package import PackageBooking
+from app.utils.daily_metrics import GROUP_METRICS, _as_day, rebuild_all_time, refresh_daily_metrics
+
+
+def source_range(db):
+    """Earliest and latest day any metric can fall on."""
+    bounds = [
+        db.execute(select(func.min(Checkout.checkout_date), func.max(Checkout.checkout_date))).one(),
+        db.execute(select(func.min(FoodOrder.created_at), func.max(FoodOrder.created_at))).one(),
+        db.execute(select(func.min(Booking.check_in), func.max(Booking.check_out))).one(),
+        db.execute(select(func.min(PackageBooking.check_in), func.max(PackageBooking.check_out))).one(),
+    ]
+    firsts = [_as_day(first) for first, _ in bounds if first is not None]
+    lasts = [_as_day(last) for _, last in bounds if last is not None]
+    if not firsts:
+        return None, None
+    return min(firsts), max(lasts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the daily metrics rollup.")
+    parser.add_argument("--from", dest="from_date", type=date.fromisoformat)
+    parser.add_argument("--to", dest="to_date", type=date.fromisoformat)
+    parser.add_argument("--chunk-days", type=int, default=31, help="days recomputed per transaction")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        first, last = source_range(db)
+        first = args.from_date or first
+        last = args.to_date or last
+        if first is None or last is None or first > last:
+            print("Nothing to backfill")
+            return
+
+        print(f"Backfilling daily metrics from {first} to {last}")
+        started = time.monotonic()
+        day = first
+        while day <= last:
+            chunk_end = min(last, day + timedelta(days=args.chunk_days - 1))
+            days = [day + timedelta(days=i) for i in range((chunk_end - day).days + 1)]
+            refresh_daily_metrics(db, {group: days for group in GROUP_METRICS})
+            db.commit()
+            print(f"  {day} .. {chunk_end}")
+            day = chunk_end + timedelta(days=1)
+
+        rebuild_all_time(db)
+        db.commit()
+        print(f"✓ Backfilled {(last - first).days + 1} day(s) in {time.monotonic() - started:.1f}s")
+    except Exception as e:
+        db.rollback()
+        print(f"✗ Backfill failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
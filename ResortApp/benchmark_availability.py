@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Room availability search benchmark.
+Times the NOT EXISTS availability query and GET /rooms/availability on a
+property of 500 rooms and 200k bookings, over stay windows in the past,
+today and the future. Target: a few milliseconds per search.
+
+Usage:
+    cd ResortApp
+    source venv/bin/activate
+    BENCHMARK_DATABASE_URL=postgresql+psycopg2://postgres@localhost/resort_benchmark \\
+        python3 benchmark_availability.py [searches]
+
+BENCHMARK_DATABASE_URL is emptied first; see benchmark_database.py.
+"""
+
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from benchmark_database import seed_bookings, seed_rooms, timed, use_benchmark_database
+
+use_benchmark_database()
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import app.main as main
+from app.database import SessionLocal, engine
+from app.utils.availability import get_available_rooms
+
+ROOMS = 500
+BOOKINGS = 200000
+SPAN_DAYS = 1200
+
+
+def _windows(count):
+    """`count` stay windows of 1-7 nights over the booked-ahead half of the seeded span."""
+    for i in range(count):
+        check_in = date.today() + timedelta(days=i * 37 % (SPAN_DAYS // 2 - 7))
+        yield check_in, check_in + timedelta(days=i % 7 + 1)
+
+
+def _report(label, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<34} p50 {statistics.median(timings) * 1000:7.2f} ms  p95 {p95 * 1000:7.2f} ms")
+
+
+def run_benchmark(searches=200):
+    print("=" * 60)
+    print(f"Availability search - {ROOMS} rooms, {BOOKINGS} bookings, {searches} searches")
+    print("=" * 60)
+
+    db = SessionLocal()
+    try:
+        room_ids = timed(f"Seed {ROOMS} rooms", seed_rooms, db, ROOMS)
+        timed(
+            f"Seed {BOOKINGS} bookings",
+            seed_bookings, db, room_ids, BOOKINGS, date.today() - timedelta(days=SPAN_DAYS // 2), SPAN_DAYS,
+        )
+        if engine.dialect.name == "postgresql":
+            db.execute(text("ANALYZE"))
+            db.commit()
+
+        windows = list(_windows(searches))
+        free = []
+        timings = []
+        for check_in, check_out in windows:
+            start = time.perf_counter()
+            free.append(len(get_available_rooms(db, check_in, check_out)))
+            timings.append(time.perf_counter() - start)
+        _report("get_available_rooms()", timings)
+
+        timings = []
+        for check_in, check_out in windows:
+            start = time.perf_counter()
+            get_available_rooms(db, check_in, check_out, room_type="Suite")
+            timings.append(time.perf_counter() - start)
+        _report("get_available_rooms(type=Suite)", timings)
+    finally:
+        db.close()
+
+    client = TestClient(main.app)
+    timings = []
+    for check_in, check_out in windows:
+        start = time.perf_counter()
+        response = client.get(
+            "/api/rooms/availability",
+            params={"check_in": str(check_in), "check_out": str(check_out), "adults": 5, "children": 1},
+        )
+        timings.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            print(f"GET /api/rooms/availability failed: {response.status_code} {response.text[:300]}")
+            sys.exit(1)
+    _report("GET /api/rooms/availability", timings)
+
+    print("-" * 60)
+    print(f"Free rooms per search: {min(free)} - {max(free)} (median {statistics.median(free):.0f})")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
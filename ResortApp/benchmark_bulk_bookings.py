@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Bulk group booking benchmark.
+Times POST /api/bookings/bulk end to end (validation, guest upsert, inserts,
+room statuses, outbox and commit) for a tour operator's batch of bookings,
+on a property that already holds a history of bookings. Target: 500
+bookings well under a second against local PostgreSQL.
+
+Usage:
+    cd ResortApp
+    source venv/bin/activate
+    BENCHMARK_DATABASE_URL=postgresql+psycopg2://postgres@localhost/resort_benchmark \\
+        python3 benchmark_bulk_bookings.py [bookings] [rounds]
+
+BENCHMARK_DATABASE_URL is emptied first; see benchmark_database.py.
+"""
+
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from benchmark_database import api_client, seed_bookings, seed_rooms, timed, use_benchmark_database
+
+use_benchmark_database()
+
+from app.database import SessionLocal
+
+ROOMS = 600
+HISTORY_BOOKINGS = 50000
+
+
+def _batch(room_ids, count, check_in):
+    """`count` bookings of one to three rooms each, for distinct rooms of a four-night window."""
+    bookings = []
+    room = 0
+    for i in range(count):
+        rooms = room_ids[room:room + i % 3 + 1]
+        room += len(rooms)
+        if room >= len(room_ids):
+            room = 0
+            check_in += timedelta(days=4)
+        bookings.append({
+            "room_ids": rooms,
+            "guest_name": f"Tour Guest {i}",
+            "guest_mobile": f"97{i:08d}",
+            "guest_email": f"tour.guest{i}@example.com",
+            "check_in": str(check_in),
+            "check_out": str(check_in + timedelta(days=1 + i % 3)),
+            "adults": 2,
+            "children": 0,
+        })
+    return bookings
+
+
+def run_benchmark(count=500, rounds=5):
+    print("=" * 60)
+    print(f"Bulk booking - {count} bookings per request, {rounds} rounds")
+    print("=" * 60)
+
+    db = SessionLocal()
+    try:
+        room_ids = timed(f"Seed {ROOMS} rooms", seed_rooms, db, ROOMS)
+        timed(
+            f"Seed {HISTORY_BOOKINGS} past and future bookings",
+            seed_bookings, db, room_ids, HISTORY_BOOKINGS, date.today() - timedelta(days=365), 600,
+        )
+    finally:
+        db.close()
+    client = api_client()
+
+    timings = []
+    # Future windows clear of the seeded bookings, a fresh one per round
+    check_in = date.today() + timedelta(days=300)
+    for round_number in range(rounds):
+        bookings = _batch(room_ids, count, check_in + timedelta(days=30 * round_number))
+        start = time.perf_counter()
+        response = client.post("/api/bookings/bulk", json=bookings)
+        elapsed = time.perf_counter() - start
+        result = response.json()
+        if response.status_code != 200 or result["failed"]:
+            print(f"Round {round_number + 1} failed: {response.status_code} {str(result)[:300]}")
+            sys.exit(1)
+        timings.append(elapsed)
+        print(f"Round {round_number + 1:<39} {elapsed * 1000:9.1f} ms  {result['created']} created")
+
+    print("-" * 60)
+    print(f"Median: {statistics.median(timings) * 1000:.1f} ms  "
+          f"({statistics.median(timings) / count * 1e6:.0f} µs/booking), best: {min(timings) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    run_benchmark(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5,
+    )
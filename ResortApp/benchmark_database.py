@@ -0,0 +1,175 @@
+"""
+Scratch database and synthetic data for the benchmark_*.py scripts.
+
+The benchmarks fill the database with thousands of rooms and bookings, so
+they never touch DATABASE_URL. They run against BENCHMARK_DATABASE_URL
+instead: a local PostgreSQL database whose public schema is dropped and
+recreated, or a SQLite file that is replaced. use_benchmark_database() must
+run before any app module is imported, since app.database reads
+DATABASE_URL on import.
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+ROOM_TYPES = ("Deluxe", "Cottage", "Suite", "Family")
+
+
+def use_benchmark_database():
+    """Point the app at an emptied BENCHMARK_DATABASE_URL and create the tables."""
+    url = os.getenv("BENCHMARK_DATABASE_URL")
+    if not url:
+        print("Set BENCHMARK_DATABASE_URL to a scratch database; everything in it is deleted.")
+        print("  e.g. BENCHMARK_DATABASE_URL=postgresql+psycopg2://postgres@localhost/resort_benchmark")
+        sys.exit(2)
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("PROPERTY_TIMEZONE", "UTC")
+
+    from sqlalchemy import create_engine, text
+    if url.startswith("postgresql"):
+        engine = create_engine(url)
+        with engine.begin() as connection:
+            connection.execute(text("DROP SCHEMA public CASCADE; CREATE SCHEMA public"))
+        engine.dispose()
+    elif url.startswith("sqlite:///") and os.path.exists(url[len("sqlite:///"):]):
+        os.remove(url[len("sqlite:///"):])
+
+    # Creates every table, the PostgreSQL exclusion constraint included
+    import app.main  # noqa: F401
+
+
+def timed(label, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    print(f"{label:<44} {(time.perf_counter() - start) * 1000:9.1f} ms")
+    return result
+
+
+def api_client():
+    """A TestClient for the app, logged in as a seeded admin."""
+    from fastapi.testclient import TestClient
+    import app.main as main
+    from app.database import SessionLocal
+    from app.models import Role, User
+    from app.utils.auth import get_current_user
+
+    db = SessionLocal()
+    try:
+        role = Role(name="admin", permissions="[]")
+        db.add(role)
+        db.flush()
+        admin = User(name="Benchmark", email="benchmark@example.com", hashed_password="x", role_id=role.id)
+        db.add(admin)
+        db.commit()
+        db.refresh(admin)
+        db.expunge(admin)
+    finally:
+        db.close()
+    main.app.dependency_overrides[get_current_user] = lambda: admin
+    return TestClient(main.app)
+
+
+def seed_rooms(db, count):
+    """`count` rooms of ROOM_TYPES with varied prices and capacities; returns their ids."""
+    from sqlalchemy import insert
+    from app.models.room import Room
+
+    rows = [
+        {
+            "number": str(1001 + i),
+            "type": ROOM_TYPES[i % len(ROOM_TYPES)],
+            "price": 2000.0 + 500 * (i % 6),
+            "adults": 2 + i % 2,
+            "children": i % 3,
+            "status": "Available",
+        }
+        for i in range(count)
+    ]
+    room_ids = db.connection().execute(
+        insert(Room.__table__).returning(Room.__table__.c.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+    db.commit()
+    return room_ids
+
+
+def seed_bookings(db, room_ids, count, first_day, span_days, seed=42):
+    """
+    About `count` regular bookings spread evenly over the rooms and the days
+    first_day .. first_day + span_days, never overlapping on a room. Past stays
+    are checked out, current ones checked in, later ones booked, and about 4%
+    are cancelled. Active stays hold their room reservations. Returns the
+    number of bookings written.
+    """
+    from sqlalchemy import insert
+    from app.models.booking import Booking, BookingRoom
+    from app.models.reservation import RoomReservation
+
+    rng = random.Random(seed)
+    today = date.today()
+    per_room = max(1, count // len(room_ids))
+    if per_room > span_days:
+        raise ValueError(f"{per_room} bookings per room do not fit in {span_days} days")
+
+    connection = db.connection()
+    written = 0
+    batch = []
+
+    def flush():
+        nonlocal written
+        booking_ids = connection.execute(
+            insert(Booking.__table__).returning(Booking.__table__.c.id, sort_by_parameter_order=True),
+            [values for values, _ in batch],
+        ).scalars().all()
+        links, reservations = [], []
+        for booking_id, (values, room_id) in zip(booking_ids, batch):
+            links.append({"booking_id": booking_id, "room_id": room_id})
+            if values["status"] in ("booked", "checked-in"):
+                reservations.append({
+                    "room_id": room_id,
+                    "booking_id": booking_id,
+                    "check_in": values["check_in"],
+                    "check_out": values["check_out"],
+                })
+        connection.execute(insert(BookingRoom.__table__), links)
+        if reservations:
+            connection.execute(insert(RoomReservation.__table__), reservations)
+        written += len(batch)
+        batch.clear()
+
+    for room_id in room_ids:
+        for i in range(per_room):
+            # Each booking gets its own slice of the span, so stays on a room never overlap
+            slot_start = i * span_days // per_room
+            slot_end = (i + 1) * span_days // per_room
+            nights = rng.randint(1, max(1, min(slot_end - slot_start, 5)))
+            check_in = first_day + timedelta(days=slot_start)
+            check_out = check_in + timedelta(days=nights)
+            if rng.random() < 0.04:
+                status = "cancelled"
+            elif check_out <= today:
+                status = "checked-out"
+            elif check_in <= today:
+                status = "checked-in"
+            else:
+                status = "booked"
+            batch.append(({
+                "status": status,
+                "guest_name": f"Guest {written + len(batch)}",
+                "guest_mobile": f"98{rng.randrange(10 ** 8):08d}",
+                "guest_email": None,
+                "check_in": check_in,
+                "check_out": check_out,
+                "adults": 2,
+                "children": 0,
+                "total_amount": 0.0,
+                "created_at": datetime.combine(check_in - timedelta(days=rng.randint(0, 90)), datetime.min.time()),
+            }, room_id))
+            if len(batch) >= 5000:
+                flush()
+    if batch:
+        flush()
+    db.commit()
+    return written
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Email rendering micro-benchmark.
+Measures the per-message cost of rendering booking emails from the compiled
+template cache, as when queueing a large batch of reminder emails.
+
+Usage:
+    cd ResortApp
+    source venv/bin/activate
+    python3 benchmark_email_templates.py [count]
+"""
+
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from app.utils.email import create_booking_confirmation_email
+from app.utils.email_templates import BookingConfirmationContext, RoomLine, render_email, warm_email_templates
+
+
+def _contexts(count):
+    check_in = date.today()
+    for i in range(count):
+        nights = i % 5 + 1
+        rooms = [RoomLine(number=str(101 + j), type="Deluxe", price=4500.0 + 500 * j) for j in range(i % 3 + 1)]
+        yield BookingConfirmationContext(
+            guest_name=f"Guest {i}",
+            booking_id=i + 1,
+            booking_type="room",
+            check_in=str(check_in),
+            check_out=str(check_in + timedelta(days=nights)),
+            rooms=rooms,
+            adults=2,
+            children=i % 3,
+            guest_mobile=f"98765{i:05d}",
+            stay_nights=nights,
+        )
+
+
+def _report(label, count, elapsed):
+    print(f"{label:<34} {elapsed * 1000:9.1f} ms  {elapsed / count * 1e6:8.1f} µs/email")
+
+
+def run_benchmark(count=5000):
+    print("=" * 60)
+    print(f"Email template rendering - {count} messages")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    warm_email_templates()
+    print(f"Template compile (once per worker) {(time.perf_counter() - start) * 1000:9.1f} ms")
+
+    contexts = list(_contexts(count))
+
+    start = time.perf_counter()
+    total_bytes = sum(len(render_email(ctx)) for ctx in contexts)
+    _report("render_email(context)", count, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for ctx in contexts:
+        create_booking_confirmation_email(
+            guest_name=ctx.guest_name,
+            booking_id=ctx.booking_id,
+            booking_type=ctx.booking_type,
+            check_in=ctx.check_in,
+            check_out=ctx.check_out,
+            rooms=[{"number": r.number, "type": r.type, "price": r.price} for r in ctx.rooms],
+            guests={"adults": ctx.adults, "children": ctx.children},
+            guest_mobile=ctx.guest_mobile,
+            stay_nights=ctx.stay_nights,
+        )
+    _report("create_booking_confirmation_email", count, time.perf_counter() - start)
+
+    print("-" * 60)
+    print(f"Average message size: {total_bytes / count / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Folio and GST benchmark.
+Times a bill of 100k food order line items: recomputing the booking's folio
+row, GET /bill/{room} with and without line items, the checkout itself,
+and compute_taxes() over 100k mixed line items against per-line tax_for().
+
+Usage:
+    cd ResortApp
+    source venv/bin/activate
+    BENCHMARK_DATABASE_URL=postgresql+psycopg2://postgres@localhost/resort_benchmark \\
+        python3 benchmark_folio_tax.py [line_items]
+
+BENCHMARK_DATABASE_URL is emptied first; see benchmark_database.py.
+"""
+
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from benchmark_database import api_client, seed_rooms, timed, use_benchmark_database
+
+use_benchmark_database()
+
+from sqlalchemy import insert
+
+from app.database import SessionLocal
+from app.models.booking import Booking, BookingRoom
+from app.models.employee import Employee
+from app.models.folio import BookingFolio
+from app.models.food_category import FoodCategory
+from app.models.food_item import FoodItem
+from app.models.foodorder import FoodOrder, FoodOrderItem
+from app.models.reservation import RoomReservation
+from app.models.room import Room
+from app.models.service import AssignedService, Service
+from app.utils.folio import refresh_folios
+from app.utils.tax import FOOD, PACKAGE, ROOM, SERVICE, TaxLine, compute_taxes, tax_for
+
+ITEMS_PER_ORDER = 20
+FOOD_ITEMS = 60
+SERVICES = 500
+
+
+def _seed_stay(db, line_items):
+    """A checked-in booking of two rooms holding `line_items` unbilled food order items and SERVICES services."""
+    room_ids = seed_rooms(db, 2)
+    today = date.today()
+    booking = Booking(
+        status="checked-in", guest_name="Banquet Guest", guest_mobile="9876543210",
+        check_in=today - timedelta(days=3), check_out=today + timedelta(days=1), adults=2, children=0,
+    )
+    booking.booking_rooms = [BookingRoom(room_id=room_id) for room_id in room_ids]
+    db.add(booking)
+    db.flush()
+    db.add_all([
+        RoomReservation(room_id=room_id, booking_id=booking.id, check_in=booking.check_in, check_out=booking.check_out)
+        for room_id in room_ids
+    ])
+    db.query(Room).filter(Room.id.in_(room_ids)).update({"status": "Checked-in"}, synchronize_session=False)
+
+    employee = Employee(name="Waiter", role="staff", salary=1)
+    category = FoodCategory(name="Banquet")
+    db.add_all([employee, category])
+    db.flush()
+    food_items = [FoodItem(name=f"Dish {i}", price=50 + 10 * i, category_id=category.id, available="1") for i in range(FOOD_ITEMS)]
+    services = [Service(name="Spa", charges=1500.5)]
+    db.add_all(food_items + services)
+    db.commit()
+
+    connection = db.connection()
+    orders = line_items // ITEMS_PER_ORDER
+    order_ids = connection.execute(
+        insert(FoodOrder.__table__).returning(FoodOrder.__table__.c.id, sort_by_parameter_order=True),
+        [
+            {
+                "room_id": room_ids[i % 2], "amount": 0, "assigned_employee_id": employee.id,
+                "status": "completed", "billing_status": "unbilled",
+                "created_at": datetime.utcnow() - timedelta(minutes=i),
+            }
+            for i in range(orders)
+        ],
+    ).scalars().all()
+    connection.execute(insert(FoodOrderItem.__table__), [
+        {"order_id": order_id, "food_item_id": food_items[(i + j) % FOOD_ITEMS].id, "quantity": 1 + j % 3}
+        for i, order_id in enumerate(order_ids)
+        for j in range(ITEMS_PER_ORDER)
+    ])
+    connection.execute(insert(AssignedService.__table__), [
+        {"service_id": services[0].id, "employee_id": employee.id, "room_id": room_ids[i % 2], "billing_status": "unbilled"}
+        for i in range(SERVICES)
+    ])
+    db.commit()
+    return booking.id, orders * ITEMS_PER_ORDER
+
+
+def _tax_lines(count):
+    """Mixed room, package, food and service lines; two in three are billed on a day up to 400 days back."""
+    today = date.today()
+    categories = (ROOM, PACKAGE, FOOD, SERVICE)
+    return [
+        TaxLine(categories[i % 4], 500 + (i * 37) % 12000, 1 + i % 4, today - timedelta(days=i % 400) if i % 3 else None)
+        for i in range(count)
+    ]
+
+
+def run_benchmark(line_items=100000):
+    print("=" * 60)
+    print(f"Folio and GST - {line_items} line items")
+    print("=" * 60)
+
+    db = SessionLocal()
+    try:
+        booking_id, line_items = timed(f"Seed {line_items} food order items", _seed_stay, db, line_items)
+        timed("refresh_folios(booking)", refresh_folios, db, [booking_id])
+        db.commit()
+        folio = db.query(BookingFolio).filter(BookingFolio.booking_id == booking_id).one()
+        print(f"  food charges {folio.food_charges}, service charges {folio.service_charges}")
+    finally:
+        db.close()
+
+    client = api_client()
+    # The first request through the client pays one-off startup costs
+    client.get("/api/rooms")
+    for label, params in (("GET /bill/1001?detail=false", {"detail": "false"}), ("GET /bill/1001 (all line items)", {})):
+        response = timed(label, client.get, "/api/bill/1001", params=params)
+        if response.status_code != 200:
+            print(f"{label} failed: {response.status_code} {response.text[:300]}")
+            sys.exit(1)
+    response = timed(
+        "POST /bill/checkout/1001 (whole booking)",
+        client.post, "/api/bill/checkout/1001", json={"payment_method": "cash", "checkout_mode": "multiple"},
+    )
+    if response.status_code != 200:
+        print(f"Checkout failed: {response.status_code} {response.text[:300]}")
+        sys.exit(1)
+    print(f"  grand total {response.json()['grand_total']}")
+
+    print("-" * 60)
+    lines = _tax_lines(line_items)
+    start = time.perf_counter()
+    taxes = compute_taxes(lines)
+    elapsed = time.perf_counter() - start
+    print(f"{'compute_taxes()':<44} {elapsed * 1000:9.1f} ms  {elapsed / len(lines) * 1e6:6.2f} µs/line")
+    start = time.perf_counter()
+    per_line = [tax_for(line.category, line.amount, line.nights, line.on) for line in lines]
+    elapsed = time.perf_counter() - start
+    print(f"{'tax_for() per line':<44} {elapsed * 1000:9.1f} ms  {elapsed / len(lines) * 1e6:6.2f} µs/line")
+    assert taxes == per_line
+    print(f"Total tax: {sum(taxes)}")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
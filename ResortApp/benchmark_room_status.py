@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Room list load benchmark: status refresh on read vs. set-based rollover.
+GET /rooms used to recompute every room's status (two queries per room and
+a commit) on each request; statuses are now rolled over by one UPDATE at
+midnight and after booking writes, so the list is a plain read. This runs
+50 concurrent clients against both: the current GET /api/rooms, and the
+same listing preceded by the old per-room refresh (kept below for
+comparison only). It also times the set-based rollover itself.
+
+Usage:
+    cd ResortApp
+    source venv/bin/activate
+    BENCHMARK_DATABASE_URL=postgresql+psycopg2://postgres@localhost/resort_benchmark \\
+        python3 benchmark_room_status.py [clients] [requests_per_client]
+
+BENCHMARK_DATABASE_URL is emptied first; see benchmark_database.py.
+"""
+
+import os
+import statistics
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from benchmark_database import seed_bookings, seed_rooms, timed, use_benchmark_database
+
+use_benchmark_database()
+
+from fastapi import Depends
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+import app.main as main
+from app.api.room import _get_rooms_impl, get_db
+from app.database import SessionLocal
+from app.models.booking import Booking, BookingRoom
+from app.models.Package import PackageBooking, PackageBookingRoom
+from app.models.room import Room
+from app.utils.room_status import update_room_statuses
+
+ROOMS = 100
+BOOKINGS = 20000
+
+
+def _per_room_refresh(db: Session):
+    """The status refresh GET /rooms ran before the set-based rollover."""
+    today = date.today()
+    rooms = db.query(Room).with_for_update(skip_locked=True).all()
+    for room in rooms:
+        active_booking = db.query(BookingRoom).join(Booking).filter(
+            BookingRoom.room_id == room.id,
+            Booking.status.in_(['booked', 'checked-in', 'checked_in']),
+            Booking.check_in <= today,
+            Booking.check_out > today
+        ).first()
+        active_package_booking = db.query(PackageBookingRoom).join(PackageBooking).filter(
+            PackageBookingRoom.room_id == room.id,
+            PackageBooking.status.in_(['booked', 'checked-in', 'checked_in']),
+            PackageBooking.check_in <= today,
+            PackageBooking.check_out > today
+        ).first()
+        if active_booking or active_package_booking:
+            booking = active_booking.booking if active_booking else active_package_booking.package_booking
+            new_status = "Checked-in" if booking.status in ("checked-in", "checked_in") else "Occupied"
+        else:
+            new_status = "Available"
+        if room.status != new_status:
+            room.status = new_status
+    db.commit()
+
+
+@main.app.get("/benchmark/rooms-refreshing")
+def _rooms_refreshing(db: Session = Depends(get_db), skip: int = 0, limit: int = 20):
+    _per_room_refresh(db)
+    return _get_rooms_impl(db, skip, limit)
+
+
+def _load(path, clients, requests_per_client):
+    """Latencies (s) of `clients` threads each sending `requests_per_client` GETs, and the wall time."""
+    latencies = []
+    errors = []
+    barrier = threading.Barrier(clients)
+
+    def client_loop():
+        client = TestClient(main.app)
+        barrier.wait()
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            response = client.get(path)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+
+    threads = [threading.Thread(target=client_loop) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - start, errors
+
+
+def _report(label, latencies, wall, errors):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<28} p50 {statistics.median(latencies) * 1000:8.1f} ms  p95 {p95 * 1000:8.1f} ms  "
+          f"{len(latencies) / wall:7.1f} req/s" + (f"  {len(errors)} errors" if errors else ""))
+
+
+def run_benchmark(clients=50, requests_per_client=10):
+    print("=" * 60)
+    print(f"GET /rooms under load - {clients} clients x {requests_per_client} requests")
+    print("=" * 60)
+
+    db = SessionLocal()
+    try:
+        room_ids = timed(f"Seed {ROOMS} rooms", seed_rooms, db, ROOMS)
+        timed(f"Seed {BOOKINGS} bookings", seed_bookings, db, room_ids, BOOKINGS, date.today() - timedelta(days=300), 400)
+        timed("Set-based rollover (all rooms)", update_room_statuses, db)
+        timed("Set-based rollover (no changes)", update_room_statuses, db)
+        timed("Per-room refresh (before)", _per_room_refresh, db)
+    finally:
+        db.close()
+
+    print("-" * 60)
+    _report("Refresh on read (before)", *_load("/benchmark/rooms-refreshing", clients, requests_per_client))
+    _report("GET /api/rooms (after)", *_load("/api/rooms", clients, requests_per_client))
+
+
+if __name__ == "__main__":
+    run_benchmark(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10,
+    )
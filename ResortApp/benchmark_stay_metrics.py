@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Stay metrics benchmark.
+Times occupancy, ADR and RevPAR (app/utils/stay_metrics.py) over two years
+of 100k bookings, for every grouping, directly and through
+GET /api/analytics/stay-metrics. Target: under a second.
+
+Usage:
+    cd ResortApp
+    source venv/bin/activate
+    BENCHMARK_DATABASE_URL=postgresql+psycopg2://postgres@localhost/resort_benchmark \\
+        python3 benchmark_stay_metrics.py [bookings]
+
+BENCHMARK_DATABASE_URL is emptied first; see benchmark_database.py.
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from benchmark_database import api_client, seed_bookings, seed_rooms, timed, use_benchmark_database
+
+use_benchmark_database()
+
+from app.database import SessionLocal
+from app.utils.stay_metrics import GROUP_BY, stay_metrics
+
+ROOMS = 300
+SPAN_DAYS = 730
+
+
+def run_benchmark(bookings=100000):
+    print("=" * 60)
+    print(f"Stay metrics - {bookings} bookings over {SPAN_DAYS} days, {ROOMS} rooms")
+    print("=" * 60)
+
+    first = date.today() - timedelta(days=SPAN_DAYS // 2)
+    last = first + timedelta(days=SPAN_DAYS - 1)
+    db = SessionLocal()
+    try:
+        room_ids = timed(f"Seed {ROOMS} rooms", seed_rooms, db, ROOMS)
+        timed(f"Seed {bookings} bookings", seed_bookings, db, room_ids, bookings, first, SPAN_DAYS)
+        print("-" * 60)
+        for group_by in GROUP_BY:
+            result = timed(f"stay_metrics(group_by={group_by})", stay_metrics, db, first, last, group_by)
+        totals = result["totals"]
+    finally:
+        db.close()
+
+    client = api_client()
+    for group_by in GROUP_BY:
+        response = timed(
+            f"GET /api/analytics/stay-metrics ({group_by})",
+            client.get, "/api/analytics/stay-metrics",
+            params={"from": str(first), "to": str(last), "group_by": group_by},
+        )
+        if response.status_code != 200:
+            print(f"GET /api/analytics/stay-metrics failed: {response.status_code} {response.text[:300]}")
+            sys.exit(1)
+
+    print("-" * 60)
+    print(f"Rooms sold {totals['rooms_sold']} of {totals['rooms_available']} "
+          f"({totals['occupancy']}%), ADR {totals['adr']}, RevPAR {totals['revpar']}")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Generate the responsive WebP variants (thumb, medium, large) of images that
+were uploaded before variants were generated at upload time. Images that
+already have all their variants are skipped, so it is safe to re-run.
+
+Usage:
+    cd ResortApp
+    source venv/bin/activate
+    python3 generate_image_variants.py [--workers N] [directory ...]
+
+Directories default to static/, uploads/packages/ and uploads/food_items/.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from app.utils.image_variants import SOURCE_EXTENSIONS, VARIANT_WIDTHS, is_variant, render_variants, variant_path
+
+DEFAULT_DIRECTORIES = ["static", os.path.join("uploads", "packages"), os.path.join("uploads", "food_items")]
+
+
+def find_images(directories):
+    for directory in directories:
+        for root, dirs, files in os.walk(directory):
+            # Skip in-progress uploads
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for filename in files:
+                path = os.path.join(root, filename)
+                if not filename.lower().endswith(SOURCE_EXTENSIONS) or is_variant(path):
+                    continue
+                if all(os.path.exists(variant_path(path, name)) for name in VARIANT_WIDTHS):
+                    continue
+                yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate WebP variants for existing images.")
+    parser.add_argument("directories", nargs="*", default=DEFAULT_DIRECTORIES)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    images = list(find_images([d for d in args.directories if os.path.isdir(d)]))
+    print(f"{len(images)} image(s) need variants; using {args.workers} worker process(es)")
+    started = time.monotonic()
+    done = failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(render_variants, path): path for path in images}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                done += 1
+            except Exception as e:
+                failed += 1
+                print(f"✗ {futures[future]}: {e}")
+            if (done + failed) % 50 == 0:
+                print(f"  {done + failed}/{len(images)}")
+
+    print(f"✓ Generated variants for {done} image(s) in {time.monotonic() - started:.1f}s; {failed} failed")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
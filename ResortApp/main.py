@@ -18,7 +18,9 @@ from app.api import (
     booking,
     checkout,
     dashboard,
+    email_outbox,
     employee,
+    events,
     expenses,
     food_category,
     food_item,
@@ -29,6 +31,7 @@ from app.api import (
     role,
     service,
     attendance,
+    analytics,
 )
 from app.database import engine, Base
 
@@ -80,6 +83,11 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"detail": f"Internal server error: {str(exc)}"}
     )
 
+# Cached catalog responses with ETag/304; added first so CORS wraps it
+from app.utils.http_cache import CatalogCacheMiddleware
+from app.utils.uploads import UploadStaticFiles
+app.add_middleware(CatalogCacheMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -90,8 +98,9 @@ app.add_middleware(
 )
 
 # Static file directories
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Content-addressed uploads get immutable cache headers (app/utils/uploads.py)
+app.mount("/uploads", UploadStaticFiles(directory="uploads"), name="uploads")
+app.mount("/static", UploadStaticFiles(directory="static"), name="static")
 
 # Mount landing page static files
 landing_page_path = Path("../landingpage")
@@ -136,6 +145,61 @@ app.include_router(reports.router, prefix="/api", tags=["Reports"])
 app.include_router(role.router, prefix="/api", tags=["Role"])
 app.include_router(service.router, prefix="/api", tags=["Service"])
 app.include_router(attendance.router, prefix="/api", tags=["Attendance"])
+app.include_router(email_outbox.router, prefix="/api", tags=["Email Outbox"])
+app.include_router(events.router, prefix="/api", tags=["Events"])
+app.include_router(analytics.router, prefix="/api", tags=["Analytics"])
+
+
+# Nightly room status rollover at property-local midnight
+@app.on_event("startup")
+async def start_room_status_scheduler():
+    import asyncio
+    from app.utils.room_status import run_room_status_scheduler
+    app.state.room_status_task = asyncio.create_task(run_room_status_scheduler())
+
+
+# Nightly occupancy forecast for the next 90 nights
+@app.on_event("startup")
+async def start_forecast_scheduler():
+    import asyncio
+    from app.utils.forecast import run_forecast_scheduler
+    app.state.forecast_task = asyncio.create_task(run_forecast_scheduler())
+
+
+# Hourly purge of expired Idempotency-Key records
+@app.on_event("startup")
+async def start_idempotency_cleanup():
+    import asyncio
+    from app.utils.idempotency import run_idempotency_cleanup
+    app.state.idempotency_cleanup_task = asyncio.create_task(run_idempotency_cleanup())
+
+
+# Background delivery of queued emails
+@app.on_event("startup")
+def start_email_outbox_sender():
+    from app.utils.email_outbox import start_email_sender
+    start_email_sender()
+
+
+# Compile email templates before the first booking needs them
+@app.on_event("startup")
+def warm_email_templates():
+    from app.utils.email_templates import warm_email_templates as warm
+    warm()
+
+
+# Live events from the other workers (PostgreSQL LISTEN/NOTIFY)
+@app.on_event("startup")
+def start_event_listener():
+    from app.utils.events import start_event_listener as start
+    start()
+
+
+# Cache invalidations from the other workers (PostgreSQL LISTEN/NOTIFY)
+@app.on_event("startup")
+def start_cache_listener():
+    from app.utils.cache import start_cache_listener as start
+    start()
 
 
 # Root route - Landing Page
@@ -20,7 +20,7 @@ sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 from app.database import SQLALCHEMY_DATABASE_URL
 
 def migrate_database():
-    """Add missing columns to packages and rooms tables."""
+    """Add missing columns and indexes."""
     engine = create_engine(SQLALCHEMY_DATABASE_URL)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     db = SessionLocal()
@@ -32,7 +32,7 @@ def migrate_database():
         print()
 
         # Migrate packages table
-        print("Step 1/2: Migrating 'packages' table...")
+        print("Step 1/7: Migrating 'packages' table...")
         print("-" * 60)
         
         try:
@@ -51,7 +51,7 @@ def migrate_database():
         print()
 
         # Migrate rooms table
-        print("Step 2/2: Migrating 'rooms' table...")
+        print("Step 2/7: Migrating 'rooms' table...")
         print("-" * 60)
         
         room_features = [
@@ -76,6 +76,155 @@ def migrate_database():
             except Exception as e:
                 print(f"⚠️  {column_name} column: {e}")
         
+        db.commit()
+        print()
+
+        # Indexes used by room availability checks and the bookings list
+        print("Step 3/7: Adding booking availability and listing indexes...")
+        print("-" * 60)
+
+        availability_indexes = [
+            ("ix_booking_rooms_room_id", "booking_rooms (room_id)"),
+            ("ix_booking_rooms_booking_id", "booking_rooms (booking_id)"),
+            ("ix_bookings_check_in_check_out", "bookings (check_in, check_out)"),
+            ("ix_bookings_check_in_id", "bookings (check_in, id)"),
+            ("ix_package_booking_rooms_room_id", "package_booking_rooms (room_id)"),
+            ("ix_package_booking_rooms_package_booking_id", "package_booking_rooms (package_booking_id)"),
+            ("ix_package_bookings_check_in_check_out", "package_bookings (check_in, check_out)"),
+        ]
+
+        for index_name, target in availability_indexes:
+            try:
+                db.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {target}"))
+                print(f"✓ Added '{index_name}' index")
+            except Exception as e:
+                print(f"⚠️  {index_name} index: {e}")
+
+        db.commit()
+        print()
+
+        # Room reservations (database-enforced no-double-booking)
+        print("Step 4/7: Creating and backfilling 'room_reservations' table...")
+        print("-" * 60)
+
+        from app.models.reservation import RoomReservation
+        RoomReservation.__table__.create(bind=engine, checkfirst=True)
+        print("✓ 'room_reservations' table and no-overlap constraint are in place")
+
+        # Existing overlapping stays (if any) cannot satisfy the constraint; the first one wins
+        regular = db.execute(text("""
+            INSERT INTO room_reservations (room_id, booking_id, check_in, check_out)
+            SELECT br.room_id, b.id, b.check_in, b.check_out
+            FROM booking_rooms br JOIN bookings b ON b.id = br.booking_id
+            WHERE b.status IN ('booked', 'checked-in', 'checked_in')
+              AND b.check_out > b.check_in
+              AND NOT EXISTS (SELECT 1 FROM room_reservations rr WHERE rr.booking_id = b.id AND rr.room_id = br.room_id)
+            ORDER BY b.id
+            ON CONFLICT DO NOTHING
+        """))
+        package = db.execute(text("""
+            INSERT INTO room_reservations (room_id, package_booking_id, check_in, check_out)
+            SELECT pbr.room_id, pb.id, pb.check_in, pb.check_out
+            FROM package_booking_rooms pbr JOIN package_bookings pb ON pb.id = pbr.package_booking_id
+            WHERE pb.status IN ('booked', 'checked-in', 'checked_in')
+              AND pb.check_out > pb.check_in
+              AND NOT EXISTS (SELECT 1 FROM room_reservations rr WHERE rr.package_booking_id = pb.id AND rr.room_id = pbr.room_id)
+            ORDER BY pb.id
+            ON CONFLICT DO NOTHING
+        """))
+        db.commit()
+        print(f"✓ Backfilled {regular.rowcount} booking and {package.rowcount} package booking reservations")
+        print()
+
+        # Guest identity keys (normalized email, E.164 phone)
+        print("Step 5/7: Adding and backfilling user identity keys...")
+        print("-" * 60)
+
+        from app.utils.guest_identity import normalize_email, normalize_phone
+
+        for column_name in ("email_normalized", "phone_e164"):
+            db.execute(text(f"ALTER TABLE users ADD COLUMN IF NOT EXISTS {column_name} VARCHAR"))
+            print(f"✓ Added '{column_name}' column to users table")
+
+        # The oldest account keeps a key shared by several users; the others stay NULL
+        taken_emails, taken_phones = set(), set()
+        for row in db.execute(text("SELECT email_normalized, phone_e164 FROM users")):
+            taken_emails.add(row.email_normalized)
+            taken_phones.add(row.phone_e164)
+        updates = []
+        rows = db.execute(text(
+            "SELECT id, email, phone, email_normalized, phone_e164 FROM users "
+            "WHERE email_normalized IS NULL OR (phone_e164 IS NULL AND phone IS NOT NULL) ORDER BY id"
+        )).fetchall()
+        for row in rows:
+            email_key = row.email_normalized or normalize_email(row.email)
+            phone_key = row.phone_e164 or normalize_phone(row.phone)
+            if not row.email_normalized:
+                email_key = email_key if email_key not in taken_emails else None
+                taken_emails.add(email_key)
+            if not row.phone_e164:
+                phone_key = phone_key if phone_key not in taken_phones else None
+                taken_phones.add(phone_key)
+            updates.append({"id": row.id, "email_normalized": email_key, "phone_e164": phone_key})
+        if updates:
+            db.execute(
+                text("UPDATE users SET email_normalized = :email_normalized, phone_e164 = :phone_e164 WHERE id = :id"),
+                updates,
+            )
+        print(f"✓ Backfilled identity keys for {len(updates)} users")
+
+        for index_name, column_name in (("ix_users_email_normalized", "email_normalized"), ("ix_users_phone_e164", "phone_e164")):
+            db.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON users ({column_name})"))
+            print(f"✓ Added unique '{index_name}' index")
+
+        db.commit()
+        print()
+
+        # Duplicate checkouts are rejected by a unique index instead of a date scan
+        print("Step 6/7: Adding the unique checkout index...")
+        print("-" * 60)
+
+        duplicates = db.execute(text("""
+            SELECT room_number, checkout_date, COUNT(*) AS n FROM checkouts
+            WHERE room_number <> ''
+            GROUP BY room_number, checkout_date HAVING COUNT(*) > 1
+        """)).fetchall()
+        if duplicates:
+            # Billing records are never deleted here; resolve them by hand and re-run
+            print(f"⚠️  {len(duplicates)} room/date pair(s) already have several checkouts; index not created:")
+            for row in duplicates:
+                print(f"   room {row.room_number} on {row.checkout_date}: {row.n} checkouts")
+        else:
+            db.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_checkouts_room_number_checkout_date "
+                "ON checkouts (room_number, checkout_date) WHERE room_number <> ''"
+            ))
+            print("✓ Added unique 'uq_checkouts_room_number_checkout_date' index")
+
+        db.commit()
+        print()
+
+        # Booking creation times, for pickup curves and the occupancy forecast
+        print("Step 7/7: Adding and backfilling booking creation times...")
+        print("-" * 60)
+
+        for table in ("bookings", "package_bookings"):
+            db.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS created_at TIMESTAMP"))
+            print(f"✓ Added 'created_at' column to {table} table")
+            # Ids are issued in booking order and a booking is made by its check-in, so a
+            # booking was made by the earliest check-in (or creation) of itself and every
+            # later booking; that latest possible time is the estimate
+            result = db.execute(text(f"""
+                UPDATE {table} AS t SET created_at = estimate.made_by
+                FROM (
+                    SELECT id, MIN(LEAST(check_in::timestamp, COALESCE(created_at, check_in::timestamp)))
+                               OVER (ORDER BY id DESC) AS made_by
+                    FROM {table}
+                ) AS estimate
+                WHERE estimate.id = t.id AND t.created_at IS NULL
+            """))
+            print(f"✓ Estimated creation times for {result.rowcount} existing {table}")
+
         db.commit()
         print()
         print("=" * 60)
@@ -0,0 +1,109 @@
+"""
+Test fixtures.
+
+The suite runs against a throwaway SQLite file, or against the PostgreSQL
+database in TEST_DATABASE_URL (its public schema is dropped for every test,
+so never point it at real data). Tests of PostgreSQL-only locking and
+constraints are skipped on SQLite.
+
+Usage:
+    cd ResortApp
+    source venv/bin/activate
+    python3 -m pytest tests
+    TEST_DATABASE_URL=postgresql+psycopg2://postgres@localhost/resort_test python3 -m pytest tests
+"""
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+# app.database reads DATABASE_URL on import: never the one in .env
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+)
+os.environ.setdefault("PROPERTY_TIMEZONE", "UTC")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import app.main as main
+from app.api.booking import booking_totals
+from app.api.dashboard import _kpi_cache
+from app.database import Base, SessionLocal, engine
+from app.models import Role, Room, User
+from app.utils.auth import get_current_user
+from app.utils import guest_identity
+from app.utils.cache import invalidate_tables
+from app.utils.occupancy_grid import invalidate_occupancy_grid
+
+IS_POSTGRES = engine.dialect.name == "postgresql"
+
+postgres_only = pytest.mark.skipif(not IS_POSTGRES, reason="needs TEST_DATABASE_URL=postgresql://...")
+
+
+def _reset_schema():
+    engine.dispose()
+    if IS_POSTGRES:
+        with engine.begin() as connection:
+            connection.execute(text("DROP SCHEMA public CASCADE; CREATE SCHEMA public"))
+    else:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    # Nothing cached from the previous test's data
+    invalidate_tables(Base.metadata.tables)
+    invalidate_occupancy_grid()
+    booking_totals.invalidate()
+    _kpi_cache.clear()
+    guest_identity._guest_role_id = None
+
+
+@pytest.fixture
+def db():
+    """A fresh schema with rooms 101-105 (odd: Deluxe, even: Cottage; price 1000 x n) and an admin."""
+    _reset_schema()
+    session = SessionLocal()
+    role = Role(name="admin", permissions="[]")
+    session.add(role)
+    session.flush()
+    session.add(User(name="Admin", email="admin@example.com", hashed_password="x", role_id=role.id))
+    for n in range(1, 6):
+        session.add(Room(
+            number=f"10{n}",
+            type="Deluxe" if n % 2 else "Cottage",
+            price=1000 * n,
+            adults=2,
+            children=1,
+            status="Available",
+        ))
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(db):
+    """An API client logged in as the admin; safe to share between threads."""
+    admin = db.query(User).filter(User.email == "admin@example.com").one()
+    db.expunge(admin)
+    main.app.dependency_overrides[get_current_user] = lambda: admin
+    yield TestClient(main.app)
+    main.app.dependency_overrides.pop(get_current_user, None)
+
+
+def booking_body(room_ids, check_in=0, check_out=2, **fields):
+    """A BookingCreate body for the given room ids, dates in days from today."""
+    today = date.today()
+    body = {
+        "room_ids": room_ids,
+        "guest_name": "Guest",
+        "guest_mobile": "9876543210",
+        "guest_email": "guest@example.com",
+        "check_in": str(today + timedelta(days=check_in)),
+        "check_out": str(today + timedelta(days=check_out)),
+        "adults": 2,
+        "children": 0,
+    }
+    body.update(fields)
+    return body
@@ -0,0 +1,37 @@
+from datetime import date, timedelta
+
+from conftest import booking_body
+
+from app.models.room import Room
+
+
+def _available(client, check_in, check_out, **params):
+    today = date.today()
+    response = client.get("/api/rooms/availability", params={
+        "check_in": str(today + timedelta(days=check_in)),
+        "check_out": str(today + timedelta(days=check_out)),
+        **params,
+    })
+    assert response.status_code == 200, response.text
+    return [room["number"] for room in response.json()["rooms"]]
+
+
+def test_booked_rooms_are_unavailable_for_overlapping_stays(db, client):
+    booking = client.post("/api/bookings", json=booking_body([1, 4], check_in=2, check_out=5))
+    assert booking.status_code == 200, booking.text
+
+    assert _available(client, 0, 3) == ["102", "103", "105"]
+    assert _available(client, 4, 6) == ["102", "103", "105"]
+    # Check-out day is free for the next arrival
+    assert _available(client, 5, 7) == ["101", "102", "103", "104", "105"]
+    assert _available(client, 0, 2) == ["101", "102", "103", "104", "105"]
+    assert _available(client, 3, 4, type="Deluxe") == ["103", "105"]
+
+    assert client.put(f"/api/bookings/{booking.json()['id']}/cancel").status_code == 200
+    assert _available(client, 0, 3) == ["101", "102", "103", "104", "105"]
+
+
+def test_rooms_under_maintenance_are_never_available(db, client):
+    db.query(Room).filter_by(number="103").update({"status": "Maintenance"})
+    db.commit()
+    assert _available(client, 0, 1) == ["101", "102", "104", "105"]
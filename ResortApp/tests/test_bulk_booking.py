@@ -0,0 +1,54 @@
+from datetime import date, timedelta
+
+from conftest import booking_body
+
+from app.models.booking import Booking
+from app.models.folio import BookingFolio
+from app.models.reservation import RoomReservation
+
+
+def _folio(db, booking_id):
+    return db.query(BookingFolio).filter(BookingFolio.booking_id == booking_id).one()
+
+
+def test_bulk_bookings_are_written_like_single_ones(db, client):
+    single = client.post("/api/bookings", json=booking_body([1, 2], check_in=0, check_out=3))
+    bulk = client.post("/api/bookings/bulk", json=[
+        booking_body([3, 4], check_in=0, check_out=3),
+        booking_body([5], check_in=1, check_out=2, guest_email="other@example.com"),
+    ])
+    assert single.status_code == 200, single.text
+    assert bulk.status_code == 200, bulk.text
+    assert bulk.json()["created"] == 2 and bulk.json()["failed"] == 0
+    bulk_ids = [item["booking_id"] for item in bulk.json()["results"]]
+
+    db.expire_all()
+    assert db.query(Booking).count() == 3
+    assert db.query(RoomReservation).count() == 5
+
+    # The folios are kept by mapper events, which the bulk INSERTs do not fire
+    single_folio = _folio(db, single.json()["id"])
+    assert (single_folio.nights, single_folio.room_rate, single_folio.room_charges) == (3, 3000, 9000)
+    folio = _folio(db, bulk_ids[0])
+    assert (folio.nights, folio.room_rate, folio.room_charges) == (3, 7000, 21000)
+    folio = _folio(db, bulk_ids[1])
+    assert (folio.nights, folio.room_rate, folio.room_charges) == (1, 5000, 5000)
+
+
+def test_bulk_booking_reports_unavailable_items(db, client):
+    assert client.post("/api/bookings", json=booking_body([1], check_in=0, check_out=3)).status_code == 200
+    response = client.post("/api/bookings/bulk", json=[
+        booking_body([1], check_in=2, check_out=4),
+        booking_body([2], check_in=2, check_out=4),
+        booking_body([2], check_in=3, check_out=5),
+    ])
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["created"], result["failed"]) == (1, 2)
+    assert [item["success"] for item in result["results"]] == [False, True, False]
+
+    db.expire_all()
+    today = date.today()
+    assert {(r.room_id, r.check_in) for r in db.query(RoomReservation)} == {
+        (1, today), (2, today + timedelta(days=2)),
+    }
@@ -0,0 +1,84 @@
+import threading
+
+from conftest import booking_body, postgres_only
+
+from app.models.booking import Booking
+from app.models.checkout import Checkout
+from app.models.employee import Employee
+from app.models.food_category import FoodCategory
+from app.models.food_item import FoodItem
+from app.models.foodorder import FoodOrder, FoodOrderItem
+from app.models.room import Room
+
+
+def _checked_in_with_orders(db, client, room_ids):
+    """A checked-in booking of `room_ids` with an unbilled order of two Rs 20 teas per room."""
+    response = client.post("/api/bookings", json=booking_body(room_ids, check_in=-2, check_out=0))
+    assert response.status_code == 200, response.text
+    booking = db.get(Booking, response.json()["id"])
+    booking.status = "checked-in"
+    for room in db.query(Room).filter(Room.id.in_(room_ids)):
+        room.status = "Checked-in"
+
+    employee = Employee(name="Waiter", role="staff", salary=1)
+    category = FoodCategory(name="Drinks")
+    db.add_all([employee, category])
+    db.flush()
+    tea = FoodItem(name="Tea", price=20, category_id=category.id, available="1")
+    db.add(tea)
+    db.flush()
+    for room_id in room_ids:
+        order = FoodOrder(room_id=room_id, amount=0, billing_status="unbilled", assigned_employee_id=employee.id)
+        db.add(order)
+        db.flush()
+        db.add(FoodOrderItem(order_id=order.id, food_item_id=tea.id, quantity=2))
+    db.commit()
+    return booking.id
+
+
+def _checkout_concurrently(client, room_number, mode, requests=6):
+    barrier = threading.Barrier(requests)
+    statuses = []
+
+    def checkout():
+        barrier.wait()
+        response = client.post(
+            f"/api/bill/checkout/{room_number}",
+            json={"payment_method": "cash", "checkout_mode": mode},
+        )
+        statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=checkout) for _ in range(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(statuses)
+
+
+@postgres_only
+def test_concurrent_checkouts_of_a_booking_bill_it_once(db, client):
+    booking_id = _checked_in_with_orders(db, client, [1, 2])
+
+    assert _checkout_concurrently(client, "101", "multiple") == [200] + [409] * 5
+
+    db.expire_all()
+    checkouts = db.query(Checkout).all()
+    assert len(checkouts) == 1
+    assert checkouts[0].booking_id == booking_id
+    assert checkouts[0].food_total == 80
+    assert {order.billing_status for order in db.query(FoodOrder)} == {"billed"}
+    assert db.get(Booking, booking_id).status == "checked_out"
+
+
+@postgres_only
+def test_concurrent_single_room_checkouts_bill_the_room_once(db, client):
+    booking_id = _checked_in_with_orders(db, client, [3, 5])
+
+    assert _checkout_concurrently(client, "103", "single") == [200] + [409] * 5
+
+    db.expire_all()
+    checkouts = db.query(Checkout).all()
+    assert [(checkout.room_number, checkout.food_total) for checkout in checkouts] == [("103", 40)]
+    assert {order.room_id: order.billing_status for order in db.query(FoodOrder)} == {3: "billed", 5: "unbilled"}
+    assert db.get(Booking, booking_id).status == "checked-in"
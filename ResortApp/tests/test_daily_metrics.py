@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+
+from conftest import booking_body
+
+from app.utils.daily_metrics import STAY_METRICS, _stay_metrics, read_metrics
+
+
+def _rollup_matches_source(db, first, last):
+    days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+    db.expire_all()
+    rollup = {key: value for key, value in read_metrics(db, days, STAY_METRICS).items() if value}
+    source = {key: value for key, value in _stay_metrics(db, first, last).items() if value}
+    assert rollup == source
+    return rollup
+
+
+def test_bulk_bookings_reach_the_stay_rollup(db, client):
+    response = client.post("/api/bookings/bulk", json=[
+        booking_body([1, 2], check_in=0, check_out=2),
+        booking_body([3], check_in=1, check_out=4, guest_email="other@example.com"),
+    ])
+    assert response.status_code == 200, response.text
+    assert response.json()["created"] == 2
+
+    today = date.today()
+    rollup = _rollup_matches_source(db, today - timedelta(days=1), today + timedelta(days=5))
+    assert rollup[(today, "rooms_sold")] == 2
+    assert rollup[(today + timedelta(days=1), "rooms_sold")] == 3
+    assert rollup[(today + timedelta(days=3), "rooms_sold")] == 1
+    assert rollup[(today, "arrivals")] == 1
+    assert rollup[(today + timedelta(days=4), "departures")] == 1
+
+
+def test_single_and_bulk_bookings_roll_up_alike(db, client):
+    assert client.post("/api/bookings", json=booking_body([1], check_in=0, check_out=3)).status_code == 200
+    assert client.post("/api/bookings/bulk", json=[booking_body([2], check_in=0, check_out=3)]).status_code == 200
+
+    today = date.today()
+    rollup = _rollup_matches_source(db, today, today + timedelta(days=3))
+    for night in range(3):
+        assert rollup[(today + timedelta(days=night), "rooms_sold")] == 2
+    assert rollup[(today + timedelta(days=3), "departures")] == 2
@@ -0,0 +1,58 @@
+import asyncio
+
+from app.api import events as events_api
+from app.utils.events import EventBus
+from app.utils.pg_listener import WORKER_ID
+
+
+class _Request:
+    async def is_disconnected(self):
+        return False
+
+
+def _frames(monkeypatch, last_event_id, count):
+    """The first `count` frames of a stream over a bus holding events 1-3, and the bus."""
+    bus = EventBus()
+    monkeypatch.setattr(events_api, "bus", bus)
+
+    async def read():
+        bus.publish([{"type": "room.status", "id": n, "status": "Occupied"} for n in (1, 2, 3)])
+        stream = events_api._event_stream(_Request(), (), events_api._parse_last_event_id(last_event_id))
+        frames = [await stream.__anext__() for _ in range(count)]
+        await stream.aclose()
+        return frames
+
+    return asyncio.run(read()), bus
+
+
+def test_reconnect_to_the_same_worker_replays_the_missed_events(monkeypatch):
+    frames, _ = _frames(monkeypatch, f"{WORKER_ID}:1", 4)
+    assert frames[1].startswith(f"id: {WORKER_ID}:2\nevent: room.status\n")
+    assert frames[2].startswith(f"id: {WORKER_ID}:3\n")
+    assert frames[3].startswith("event: ready\n")
+
+
+def test_reconnect_with_another_workers_id_resyncs(monkeypatch):
+    # Caught up on another worker whose sequence is behind this one's
+    for last_event_id in ("4321-0a1b2c3d:1", "3", "not an id"):
+        frames, _ = _frames(monkeypatch, last_event_id, 3)
+        assert frames[1].startswith("event: resync\n")
+        assert frames[2].startswith("event: ready\n")
+
+
+def test_streams_subscribe_when_iterated_and_always_unsubscribe(monkeypatch):
+    bus = EventBus()
+    monkeypatch.setattr(events_api, "bus", bus)
+
+    async def read():
+        # A client gone before the body is sent never starts the generator
+        events_api._event_stream(_Request(), (), None)
+        assert not bus._subscribers
+
+        stream = events_api._event_stream(_Request(), (), None)
+        await stream.__anext__()
+        assert len(bus._subscribers) == 1
+        await stream.aclose()
+
+    asyncio.run(read())
+    assert not bus._subscribers
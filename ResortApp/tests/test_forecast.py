@@ -0,0 +1,17 @@
+from app.api import analytics
+
+
+def test_forecast_is_stored_once_whatever_the_room_type(db, client, monkeypatch):
+    stores = []
+    store_forecast = analytics.store_forecast
+    monkeypatch.setattr(analytics, "store_forecast", lambda *args: stores.append(args) or store_forecast(*args))
+
+    for params in ({"room_type": "Treehouse"}, {"room_type": "Treehouse"}, {"days": 7}, {"room_type": "Deluxe"}):
+        response = client.get("/api/analytics/forecast", params=params)
+        assert response.status_code == 200, response.text
+    assert len(stores) == 1
+
+    forecast = response.json()
+    assert [entry["room_type"] for entry in forecast["room_types"]] == ["Deluxe"]
+    assert forecast["room_types"][0]["capacity"] == 3
+    assert client.get("/api/analytics/forecast", params={"room_type": "Treehouse"}).json()["room_types"] == []
@@ -0,0 +1,54 @@
+import pytest
+from fastapi import HTTPException
+
+from app.utils import pagination
+from app.utils.pagination import CachedCount, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("check_in", "2026-10-18", 42)
+    assert decode_cursor(cursor, "check_in") == ["2026-10-18", 42]
+    with pytest.raises(HTTPException):
+        decode_cursor(cursor, "id")
+    with pytest.raises(HTTPException):
+        decode_cursor("not a cursor", "check_in")
+
+
+def test_filtered_totals_are_bounded_least_recently_used_first():
+    totals = CachedCount(max_filtered=3)
+    for key in ("a", "b", "c"):
+        assert totals.get(key, lambda: 1) == 1
+    totals.get("a", lambda: pytest.fail("cached"))
+    totals.get("d", lambda: 4)
+
+    assert list(totals._filtered) == ["c", "a", "d"]
+    assert totals.get("b", lambda: 2) == 2
+
+
+def test_expired_totals_are_recounted_and_dropped(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(pagination.time, "monotonic", lambda: now[0])
+    totals = CachedCount(ttl_seconds=300, filtered_ttl_seconds=30)
+    totals.get(None, lambda: 10)
+    totals.get("search", lambda: 3)
+
+    now[0] += 31
+    assert totals.get(None, lambda: pytest.fail("cached")) == 10
+    assert totals.get("search", lambda: 5) == 5
+
+    now[0] += 300
+    assert totals.get(None, lambda: 12) == 12
+
+
+def test_writes_keep_the_unfiltered_total_and_drop_filtered_ones():
+    totals = CachedCount()
+    totals.get(None, lambda: 10)
+    totals.get("booked", lambda: 4)
+
+    totals.bump(2)
+    assert totals.get(None, lambda: pytest.fail("cached")) == 12
+    assert totals.get("booked", lambda: 5) == 5
+
+    totals.invalidate()
+    assert totals.get(None, lambda: pytest.fail("cached")) == 12
+    assert totals.get("booked", lambda: 6) == 6
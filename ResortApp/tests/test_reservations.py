@@ -0,0 +1,61 @@
+import threading
+from datetime import date, timedelta
+
+import pytest
+from conftest import booking_body, postgres_only
+from fastapi import HTTPException
+
+from app.models.booking import Booking
+from app.models.reservation import RoomReservation
+from app.models.room import Room
+from app.utils.reservations import _CONFLICT_KEY, flush_reservations, reserve_rooms
+
+# As raised by PostgreSQL for room_reservations_no_overlap
+VIOLATION = (
+    'conflicting key value violates exclusion constraint "room_reservations_no_overlap"\n'
+    "DETAIL:  Key (int4range(room_id, room_id, '[]'::text), daterange(check_in, check_out, '[)'::text))"
+    "=([17,18), [2026-10-19,2026-10-20)) conflicts with existing key "
+    "(int4range(room_id, room_id, '[]'::text), daterange(check_in, check_out, '[)'::text))"
+    "=([17,18), [2026-10-18,2026-10-21)).\n"
+)
+
+
+def test_conflict_key_reads_the_room_id():
+    assert _CONFLICT_KEY.search(VIOLATION).group(1) == "17"
+
+
+@postgres_only
+def test_exclusion_violation_names_the_conflicting_room(db):
+    rooms = db.query(Room).filter(Room.id.in_([1, 3])).order_by(Room.id).all()
+    today = date.today()
+    reserve_rooms(db, [3], today, today + timedelta(days=3))
+    db.commit()
+
+    reserve_rooms(db, [1, 3], today + timedelta(days=1), today + timedelta(days=2))
+    with pytest.raises(HTTPException) as error:
+        flush_reservations(db, rooms)
+    assert error.value.status_code == 400
+    assert error.value.detail == "Room 103 is not available for the selected dates."
+
+
+@postgres_only
+def test_concurrent_overlapping_bookings_book_the_room_once(db, client):
+    for attempt, room_id in enumerate([1, 2, 3, 4, 5]):
+        barrier = threading.Barrier(2)
+        statuses = []
+
+        def book(guest):
+            barrier.wait()
+            body = booking_body([room_id], check_in=guest, check_out=guest + 2, guest_email=f"guest{guest}@example.com")
+            statuses.append(client.post("/api/bookings", json=body).status_code)
+
+        threads = [threading.Thread(target=book, args=(guest,)) for guest in (attempt, attempt + 1)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(statuses) == [200, 400]
+        db.expire_all()
+        assert db.query(RoomReservation).filter(RoomReservation.room_id == room_id).count() == 1
+    assert db.query(Booking).count() == 5
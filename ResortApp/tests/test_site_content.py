@@ -0,0 +1,16 @@
+def test_each_content_coding_has_its_own_etag(db, client):
+    identity = client.get("/api/site-content", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/api/site-content", headers={"Accept-Encoding": "gzip"})
+    assert identity.status_code == gzipped.status_code == 200
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert identity.json() == gzipped.json()
+    assert identity.headers["etag"] != gzipped.headers["etag"]
+
+    for encoding, etag in (("identity", identity.headers["etag"]), ("gzip", gzipped.headers["etag"])):
+        same = client.get("/api/site-content", headers={"Accept-Encoding": encoding, "If-None-Match": etag})
+        assert same.status_code == 304
+        assert same.headers["etag"] == etag
+    # A validator of the other encoding does not revalidate this one
+    other = client.get("/api/site-content", headers={"Accept-Encoding": "gzip", "If-None-Match": identity.headers["etag"]})
+    assert other.status_code == 200
+    assert other.headers["etag"] == gzipped.headers["etag"]